@@ -1,5 +1,6 @@
 import argparse
 import logging
+import re
 from database.neo4j_driver import neo4j_driver
 from config import (
     VECTOR_NODE_LABEL,
@@ -7,10 +8,19 @@ from config import (
     EMBEDDING_DIMENSION,
 )
 from neo4j.exceptions import ClientError
+from logging_config import configure_logging
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Index names cannot be bound as parameters, so only plain identifiers are interpolated
+_INDEX_NAME_RE = re.compile(r"^[A-Za-z0-9_]+$")
+
+SHOW_MATCHING_INDEXES = """
+SHOW INDEXES YIELD name, labelsOrTypes, properties, type
+WHERE $label IN labelsOrTypes AND $prop IN properties
+RETURN name, type
+"""
+
 def get_neo4j_version():
     try:
         result = neo4j_driver.execute_query("CALL dbms.components() YIELD name, versions RETURN name, versions")
@@ -23,23 +33,32 @@ def get_neo4j_version():
 
 def drop_all_indexes_on_label_property(node_label, property_name):
     try:
-        indexes = neo4j_driver.execute_query("SHOW INDEXES YIELD name, labelsOrTypes, properties, type")
-        if not indexes:
-            logger.warning("SHOW INDEXES returned no results or failed. Cannot drop property indexes.")
-            return
-        for idx in indexes:
-            labels = idx.get("labelsOrTypes", [])
-            properties = idx.get("properties", [])
-            if not labels or not properties:
-                continue
-            if node_label in labels and property_name in properties:
-                index_name = idx["name"]
-                logger.info(f"Dropping index '{index_name}' on :{node_label}({property_name}) (type: {idx.get('type')})")
-                try:
-                    neo4j_driver.execute_query(f"DROP INDEX {index_name}")
-                    logger.info(f"Dropped index '{index_name}'")
-                except Exception as e:
-                    logger.error(f"Failed to drop index '{index_name}': {str(e)}")
+        # One session (and so one pooled Bolt connection) for the listing and every drop
+        with neo4j_driver.session() as session:
+            # Filter server-side so only the matching indexes cross the wire
+            indexes = [record.data() for record in session.run(SHOW_MATCHING_INDEXES, label=node_label, prop=property_name)]
+            if not indexes:
+                logger.info(f"No existing indexes found on :{node_label}({property_name}).")
+                return
+
+            # Only names taken from SHOW INDEXES are dropped, so a DROP cannot fail on an unknown name
+            index_names = []
+            for idx in indexes:
+                if not _INDEX_NAME_RE.match(idx["name"]):
+                    logger.warning(f"Skipping index with unexpected name {idx['name']!r}")
+                    continue
+                logger.info(f"Dropping index '{idx['name']}' on :{node_label}({property_name}) (type: {idx.get('type')})")
+                index_names.append(idx["name"])
+
+            # Drop everything in a single transaction: one commit instead of one per index
+            try:
+                with session.begin_transaction() as tx:
+                    for index_name in index_names:
+                        tx.run(f"DROP INDEX `{index_name}` IF EXISTS").consume()
+                    tx.commit()
+                logger.info(f"Dropped {len(index_names)} index(es): {', '.join(index_names)}")
+            except Exception as e:
+                logger.error(f"Failed to drop indexes {index_names}: {str(e)}")
     except Exception as e:
         logger.error(f"Error listing/dropping indexes: {str(e)}")
 
@@ -57,6 +76,9 @@ def main(node_label, property_name, dimension):
         logger.info("Attempting to create vector index...")
         result = vector_search.create_vector_index(node_label=node_label, property_name=property_name, dimension=dimension)
         logger.info(f"Vector index creation result: {result}")
+        # Wait once for every pending index to come online instead of polling per index
+        neo4j_driver.execute_query("CALL db.awaitIndexes(300)")
+        logger.info("All indexes are online")
     except ClientError as ce:
         if "ProcedureNotFound" in str(ce) or "no procedure with the name" in str(ce) or "There is no such procedure" in str(ce):
             logger.error("Vector index procedures are not available on this Neo4j instance.")
@@ -76,4 +98,5 @@ if __name__ == "__main__":
     parser.add_argument("--property_name", type=str, default=VECTOR_PROPERTY, help="Property name for the vector index")
     parser.add_argument("--dimension", type=int, default=EMBEDDING_DIMENSION, help="Embedding dimension for the vector index")
     args = parser.parse_args()
+    configure_logging()
     main(args.node_label, args.property_name, args.dimension)
\ No newline at end of file
@@ -1,42 +1,71 @@
 import streamlit as st
 import time
 import logging
-import json
 import os
-from orchestrator import Orchestrator
+import threading
+from orchestrator import get_orchestrator
 from utils import monitoring_dashboard
 from utils.monitoring import monitoring
+from utils import metrics
 from utils.error_handler import error_handler
-from typing import Dict, Any
+from logging_config import configure_logging
+import json_utils
+from typing import Dict, Any, Iterator, Optional, Tuple
 
-HISTORY_FILE = "chat_history.json"
+logger = logging.getLogger(__name__)
+
+HISTORY_FILE = "chat_history.jsonl"
+LEGACY_HISTORY_FILE = "chat_history.json"
+# Number of history entries rendered in the sidebar per "Show more" page
+HISTORY_PAGE_SIZE = 20
+
+@st.cache_resource
+def get_history_lock() -> threading.Lock:
+    """Lock serializing appends to the history file across reruns and sessions."""
+    return threading.Lock()
 
 def load_history():
-    if os.path.exists(HISTORY_FILE):
-        try:
-            with open(HISTORY_FILE, "r") as f:
-                st.session_state.history = json.load(f)
-        except Exception as e:
-            error_resp = error_handler.handle_error(e, {"action": "load_history"})
-            logging.error(f"Failed to load chat history: {error_resp['error_message']}")
-            st.session_state.history = []
-    else:
-        st.session_state.history = []
+    history = []
+    try:
+        if os.path.exists(HISTORY_FILE):
+            with open(HISTORY_FILE, "rb") as f:
+                history = [json_utils.loads(line) for line in f if line.strip()]
+        elif os.path.exists(LEGACY_HISTORY_FILE):
+            # One-time migration from the old single-document format
+            with open(LEGACY_HISTORY_FILE, "rb") as f:
+                history = json_utils.loads(f.read())
+            with open(HISTORY_FILE, "wb") as f:
+                f.writelines(json_utils.dumps(entry) + b"\n" for entry in history)
+    except Exception as e:
+        error_resp = error_handler.handle_error(e, {"action": "load_history"})
+        logger.error(f"Failed to load chat history: {error_resp['error_message']}")
+        history = []
+    st.session_state.history = history
 
-def save_history():
+def _append_history(entry: Dict[str, Any], lock: threading.Lock):
     try:
-        with open(HISTORY_FILE, "w") as f:
-            json.dump(st.session_state.history, f)
+        line = json_utils.dumps(entry) + b"\n"
+        with lock:
+            with open(HISTORY_FILE, "ab") as f:
+                f.write(line)
     except Exception as e:
         error_resp = error_handler.handle_error(e, {"action": "save_history"})
-        logging.error(f"Failed to save chat history: {error_resp['error_message']}")
+        logger.error(f"Failed to save chat history: {error_resp['error_message']}")
 
-# Setup logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+def save_history(entry: Dict[str, Any]):
+    """Append one history entry to the JSON-Lines file on a background thread."""
+    threading.Thread(target=_append_history, args=(entry, get_history_lock()), daemon=True).start()
 
-# Initialize the orchestrator
-orchestrator = Orchestrator()
+@st.cache_resource
+def start_metrics_server() -> bool:
+    """Start the Prometheus endpoint once per process (reruns reuse the cached result)."""
+    return metrics.start_metrics_server()
+
+@st.cache_resource
+def get_data_ingestion():
+    """Build the data ingestion component once per process instead of on every "Load Data" click."""
+    from data_ingestion.ingest import DataIngestion
+    return DataIngestion()
 
 # Set page configuration
 st.set_page_config(
@@ -45,65 +74,145 @@ st.set_page_config(
     layout="wide"
 )
 
+# Configure logging once per session rather than on every rerun
+if 'logging_configured' not in st.session_state:
+    configure_logging()
+    st.session_state.logging_configured = True
+
+start_metrics_server()
+
+# The process-wide orchestrator, shared across reruns and sessions
+orchestrator = get_orchestrator()
+
 # Initialize or load session state for history
 if 'history' not in st.session_state:
     load_history()
 
-def process_question(question: str) -> Dict[str, Any]:
+def _record_history(question: str, result: Dict[str, Any]):
+    """Append a question/answer pair to the session history and persist it."""
+    entry = {
+        "question": question,
+        "answer": result["answer"],
+        "cypher_query": result["cypher_query"],
+        "query_results": result["query_results"]
+    }
+    st.session_state.history.append(entry)
+    save_history(entry)
+
+def process_question(question: str) -> Tuple[Dict[str, Any], Optional[Iterator[str]]]:
     """Process a user question through the orchestrator.
     
     Args:
         question: The natural language question from the user
         
     Returns:
-        Dict containing the answer and additional information
+        Tuple of (result, answer stream). For cache hits and errors the stream is None
+        and the result is complete. Otherwise the stream yields the answer as the LLM
+        generates it; once it is exhausted the result holds the answer (or the error).
     """
     start_time = time.time()
     try:
+        # Fast path: serve cache hits without entering the orchestrator pipeline. Exact
+        # hits need no embedding; otherwise it is computed once, for the semantic lookup
+        # and, on a miss, for the pipeline.
+        question_embedding = None
+        cached = orchestrator.cache.get_exact(question)
+        if not cached:
+            question_embedding = orchestrator.embed_question(question)
+            cached = orchestrator.cache.get_similar(question, question_embedding)
+        if cached:
+            _record_history(question, cached)
+            elapsed_time = time.time() - start_time
+            metrics.REQ_LATENCY.labels(cache="hit").observe(elapsed_time)
+            metrics.CACHE_HIT.inc()
+            monitoring_dashboard.update_metrics("response_time", elapsed_time)
+            monitoring_dashboard.update_metrics("cache_hit", 1)
+            monitoring_dashboard.log_activity("cache_hit", {"question": question})
+            return {**cached, "cache_hit": True}, None
+        
         # Log the activity
         monitoring.log_activity("ui_question_submitted", {"question": question})
         monitoring_dashboard.log_activity("question_submitted", {"question": question})
         
-        # Process the question through the orchestrator
-        result = orchestrator.process_question(question)
-        
-        # Add to history
-        st.session_state.history.append({
-            "question": question,
-            "answer": result["answer"],
-            "cypher_query": result["cypher_query"],
-            "query_results": result["query_results"]
-        })
-        save_history()
-        
-        # Update dashboard metrics
-        elapsed_time = time.time() - start_time
-        monitoring_dashboard.update_metrics("response_time", elapsed_time)
-        if "cache_hit" in result and result["cache_hit"]:
-            monitoring_dashboard.update_metrics("cache_hit", 1)
-        else:
-            monitoring_dashboard.update_metrics("cache_miss", 1)
-        
-        monitoring_dashboard.log_activity("answer_generated", {
-            "question": question,
-            "response_time": elapsed_time
-        })
-        
-        return result
+        # Process the question through the orchestrator (the cache was already checked above);
+        # the answer is generated while the stream is rendered
+        result, answer_stream = orchestrator.process_question_stream(
+            question, check_cache=False, question_embedding=question_embedding)
+        return result, _finish_answer(question, result, answer_stream, start_time)
     except Exception as e:
-        error_resp = error_handler.handle_error(e, {"question": question})
-        logger.error(f"Error processing question: {error_resp['error_message']}")
-        monitoring_dashboard.update_metrics("error", 1)
-        monitoring_dashboard.log_activity("error", {
-            "error_type": error_resp["error_type"],
-            "error_message": error_resp["error_message"],
-            "question": question
-        })
-        return {
-            "status": "error",
-            "error_message": error_resp["user_message"],
-            "question": question
-        }
+        return _error_result(e, question), None
+
+def _finish_answer(question: str, result: Dict[str, Any], answer_stream: Iterator[str],
+                   start_time: float) -> Iterator[str]:
+    """Yield the streamed answer, then record the completed question.
+    
+    An error while streaming is recorded and turns the result into an error response.
+    """
+    try:
+        yield from answer_stream
+    except Exception as e:
+        result.update(_error_result(e, question))
+        return
+    
+    # Add to history
+    _record_history(question, result)
+    
+    # Update dashboard metrics
+    elapsed_time = time.time() - start_time
+    metrics.REQ_LATENCY.labels(cache="miss").observe(elapsed_time)
+    metrics.CACHE_MISS.inc()
+    monitoring_dashboard.update_metrics("response_time", elapsed_time)
+    monitoring_dashboard.update_metrics("cache_miss", 1)
+    
+    monitoring_dashboard.log_activity("answer_generated", {
+        "question": question,
+        "response_time": elapsed_time
+    })
+
+def _error_result(e: Exception, question: str) -> Dict[str, Any]:
+    """Log and count a failed question, returning the error response shown to the user."""
+    error_resp = error_handler.handle_error(e, {"question": question})
+    logger.error(f"Error processing question: {error_resp['error_message']}")
+    metrics.ERRORS.inc()
+    monitoring_dashboard.update_metrics("error", 1)
+    monitoring_dashboard.log_activity("error", {
+        "error_type": error_resp["error_type"],
+        "error_message": error_resp["error_message"],
+        "question": question
+    })
+    return {
+        "status": "error",
+        "error_message": error_resp["user_message"],
+        "question": question
+    }
+
+def _show_more_history():
+    st.session_state.history_window = st.session_state.get("history_window", HISTORY_PAGE_SIZE) + HISTORY_PAGE_SIZE
+
+@st.fragment
+def render_history():
+    """Render the most recent history entries.
+
+    Runs as a fragment so paging through history reruns only this block,
+    and only the newest `history_window` entries are turned into widgets.
+    """
+    history = st.session_state.history
+    if not history:
+        st.write("No queries yet. Ask a question to get started!")
+        return
+
+    window = st.session_state.get("history_window", HISTORY_PAGE_SIZE)
+    for item in history[-window:][::-1]:
+        with st.expander(f"Q: {item['question'][:50]}..."):
+            st.write(f"**Question:** {item['question']}")
+            if item.get("status") == "error":
+                st.error(f"Error: {item['error_message']}")
+            else:
+                st.write(f"**Answer:** {item['answer']}")
+                st.write(f"**Cypher Query:**\n```\n{item['cypher_query']}\n```")
+
+    if len(history) > window:
+        st.button(f"Show more ({len(history) - window} older)", on_click=_show_more_history)
 
 # Main UI layout
 st.title("GraphRAG - Graph-based Retrieval-Augmented Generation")
@@ -142,27 +251,25 @@ with st.sidebar:
         else:
             try:
                 import logging as pylogging
-                from data_ingestion.ingest import DataIngestion
 
-                if verbose:
-                    pylogging.getLogger().setLevel(pylogging.DEBUG)
-                else:
-                    pylogging.getLogger().setLevel(pylogging.INFO)
+                level = pylogging.DEBUG if verbose else pylogging.INFO
+                if pylogging.getLogger().level != level:
+                    pylogging.getLogger().setLevel(level)
 
                 st.info(f"Starting data ingestion from: {selected_path}")
 
-                ingestion = DataIngestion()
+                ingestion = get_data_ingestion()
 
                 if clear_existing:
                     st.info("Clearing existing data before ingestion...")
                     ingestion.clear_existing_data()
 
-                ingestion.preprocessor.chunk_size = chunk_size
-                ingestion.preprocessor.chunk_overlap = chunk_overlap
+                # Both setters are no-ops when the values are already applied, so
+                # repeated clicks neither touch the preprocessor nor reload the model
+                ingestion.preprocessor.configure(chunk_size, chunk_overlap)
 
                 if embedding_model:
-                    ingestion.embedding_generator.model_name = embedding_model
-                    ingestion.embedding_generator._load_model()
+                    ingestion.embedding_generator.set_model(embedding_model)
 
                 ingestion.ingest_data(
                     data_path=selected_path,
@@ -175,17 +282,7 @@ with st.sidebar:
                 st.error(error_resp["user_message"])
     
     st.header("Query History")
-    if st.session_state.history:
-        for i, item in enumerate(reversed(st.session_state.history)):
-            with st.expander(f"Q: {item['question'][:50]}..."):
-                st.write(f"**Question:** {item['question']}")
-                if item.get("status") == "error":
-                    st.error(f"Error: {item['error_message']}")
-                else:
-                    st.write(f"**Answer:** {item['answer']}")
-                    st.write(f"**Cypher Query:**\n```\n{item['cypher_query']}\n```")
-    else:
-        st.write("No queries yet. Ask a question to get started!")
+    render_history()
 
 # Initialize session state for button state if not exists
 if 'processing' not in st.session_state:
@@ -200,22 +297,29 @@ if st.button("Submit", type="primary", disabled=st.session_state.processing):
         try:
             st.session_state.processing = True
             with st.spinner("Processing your question..."):
-                # Process the question
-                result = process_question(question)
-                
-                if "status" in result and result["status"] == "error":
-                    st.error(result["error_message"])
-                else:
+                # Process the question; a freshly generated answer is streamed below
+                result, answer_stream = process_question(question)
+            
+            if answer_stream is not None:
+                # Display the answer as it is generated
+                st.header("Answer")
+                st.write_stream(answer_stream)
+            
+            if "status" in result and result["status"] == "error":
+                st.error(result["error_message"])
+            else:
+                if answer_stream is None:
                     # Display the answer
                     st.header("Answer")
                     st.write(result["answer"])
-                    
-                    # Display additional information in expandable sections
-                    with st.expander("Cypher Query"):
-                        st.code(result["cypher_query"], language="cypher")
-                    
-                    with st.expander("Query Results"):
-                        st.json(result["query_results"])
+                
+                # Display additional information in expandable sections
+                with st.expander("Cypher Query"):
+                    st.code(result["cypher_query"], language="cypher")
+                
+                with st.expander("Query Results"):
+                    # Pre-serialized text renders much faster than st.json's tree view
+                    st.code(json_utils.dumps(result["query_results"], indent=True).decode("utf-8"), language="json")
         except Exception as e:
             error_resp = error_handler.handle_error(e, {"question": question})
             st.error(error_resp["user_message"])
@@ -225,8 +329,9 @@ if st.button("Submit", type="primary", disabled=st.session_state.processing):
         st.warning("Please enter a question.")
 
 # Monitoring dashboard
-# Render the monitoring dashboard using the dedicated component
-monitoring_dashboard.render_dashboard()
+# Charts are only rebuilt when requested; Prometheus scrapes the same metrics out of band
+if st.sidebar.toggle("Show monitoring dashboard", value=False):
+    monitoring_dashboard.render_dashboard()
 
 # Footer
 st.markdown("---")
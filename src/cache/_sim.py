@@ -0,0 +1,89 @@
+"""Similarity kernels for the in-memory embedding indexes.
+
+Rows are L2-normalized vectors quantized to int8 (see SemanticIndex), so cosine
+similarity is a plain dot product with a unit-length query. The fastest available
+kernel is used:
+
+- SimSIMD compares the int8 rows with an int8-quantized query using the CPU's
+  integer dot-product instructions (AVX-512 VNNI, NEON, SVE).
+- numba computes the dot products in one fused, parallel pass over the int8 matrix.
+- Otherwise rows are widened to float32 block by block and multiplied with NumPy.
+"""
+import threading
+import numpy as np
+
+try:
+    import simsimd
+except ImportError:  # simsimd is optional
+    simsimd = None
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional; fall back to NumPy
+    njit = None
+
+# Rows widened to float32 per NumPy matmul, bounding the temporary buffer
+_SCORE_BLOCK = 8192
+# Per-thread float32 buffer the NumPy kernel widens blocks into, reused across lookups
+_scratch = threading.local()
+
+if njit is not None:
+    @njit(fastmath=True, parallel=True, cache=True)
+    def _dot_rows_numba(rows, query):
+        out = np.empty(rows.shape[0], dtype=np.float32)
+        for i in prange(rows.shape[0]):
+            acc = np.float32(0.0)
+            for j in range(rows.shape[1]):
+                acc += np.float32(rows[i, j]) * query[j]
+            out[i] = acc
+        return out
+
+def _scratch_block(rows: int, dim: int) -> np.ndarray:
+    """Return this thread's widening buffer, grown to hold `rows` rows (up to one block)."""
+    rows = min(rows, _SCORE_BLOCK)
+    buf = getattr(_scratch, "block", None)
+    if buf is None or buf.shape[0] < rows or buf.shape[1] != dim:
+        buf = _scratch.block = np.empty((rows, dim), dtype=np.float32)
+    return buf
+
+def _dot_rows_numpy(rows: np.ndarray, query: np.ndarray) -> np.ndarray:
+    out = np.empty(rows.shape[0], dtype=np.float32)
+    buf = _scratch_block(rows.shape[0], rows.shape[1])
+    for start in range(0, rows.shape[0], _SCORE_BLOCK):
+        block = rows[start:start + _SCORE_BLOCK]
+        widened = buf[:block.shape[0]]
+        np.copyto(widened, block)
+        np.matmul(widened, query, out=out[start:start + _SCORE_BLOCK])
+    return out
+
+def dot_rows(rows: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """Dot product of every row of an int8 matrix with a float32 query.
+
+    Args:
+        rows: Array of shape (N, dim) and dtype int8
+        query: Array of shape (dim,) and dtype float32
+
+    Returns:
+        Float32 array of shape (N,)
+    """
+    query = np.ascontiguousarray(query, dtype=np.float32)
+    if njit is not None:
+        return _dot_rows_numba(np.ascontiguousarray(rows), query)
+    return _dot_rows_numpy(rows, query)
+
+def cosine_scores(rows: np.ndarray, query: np.ndarray, scale: float) -> np.ndarray:
+    """Cosine similarity of a unit-length query against quantized unit-length rows.
+
+    Args:
+        rows: Array of shape (N, dim) and dtype int8, holding unit vectors times `scale`
+        query: Unit-length array of shape (dim,)
+        scale: Quantization scale of the rows
+
+    Returns:
+        Float32 array of shape (N,)
+    """
+    if simsimd is not None and len(rows):
+        query8 = np.rint(np.asarray(query, dtype=np.float32) * scale).astype(np.int8)
+        distances = np.asarray(simsimd.cdist(query8[None, :], np.ascontiguousarray(rows), metric="cos"))
+        return (1.0 - distances.reshape(-1)).astype(np.float32)
+    return dot_rows(rows, np.asarray(query, dtype=np.float32) / scale)
@@ -1,135 +1,469 @@
+import atexit
+import gzip
+import hashlib
 import logging
-import json
 import os
+import queue
+import sqlite3
+import threading
 import time
-from typing import Dict, Any, Optional, Union
+from collections import OrderedDict
+from typing import Callable, Dict, Any, List, Optional, Sequence, Tuple, Union
 from pathlib import Path
-from config import CACHE_TTL
+import numpy as np
+from config import (
+    CACHE_TTL,
+    CACHE_L1_SIZE,
+    EMBEDDING_DIMENSION,
+    SEMANTIC_CACHE_ENABLED,
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_SIZE
+)
+from cache.semantic_index import SemanticIndex
+import json_utils
+
+logger = logging.getLogger(__name__)
+
+# Payloads larger than this (in bytes) are gzip-compressed before being stored
+COMPRESSION_THRESHOLD = 4096
+# Seconds the semantic tier stops embedding after a failure, doubling per consecutive failure
+EMBED_RETRY_BACKOFF = 1.0
+EMBED_RETRY_BACKOFF_MAX = 300.0
+# One-byte header identifying how a stored payload is encoded
+_RAW = b"\x00"
+_GZIP = b"\x01"
+
+def _encode_payload(response: Dict[str, Any]) -> bytes:
+    """Serialize a response for storage, compressing it when it is large."""
+    blob = json_utils.dumps(response)
+    if len(blob) > COMPRESSION_THRESHOLD:
+        return _GZIP + gzip.compress(blob, compresslevel=1)
+    return _RAW + blob
+
+def _decode_payload(payload: Union[bytes, str]) -> Dict[str, Any]:
+    """Inverse of _encode_payload; plain JSON text rows are accepted as well."""
+    if isinstance(payload, str):
+        return json_utils.loads(payload)
+    header, blob = payload[:1], payload[1:]
+    if header == _GZIP:
+        blob = gzip.decompress(blob)
+    return json_utils.loads(blob)
 
 class ResponseCache:
     """Cache for storing and retrieving responses to avoid redundant LLM calls.
-    
-    This class implements a simple file-based cache system that stores responses
-    with TTL (Time To Live) functionality.
+
+    This class implements a two-tier cache with TTL (Time To Live) functionality:
+    an in-process LRU (L1) in front of a single SQLite database (L2), so hot
+    questions are served from memory without touching the filesystem. When an
+    exact lookup misses, a semantic tier compares the question's embedding with
+    the embeddings of previously cached questions so paraphrases share an entry.
+    The semantic tier holds at most `semantic_size` questions and evicts with
+    GDSF (Greedy-Dual-Size-Frequency): the entry with the lowest
+    clock + hits * cost / size goes first, the clock advancing to each evicted
+    priority so that entries which stop being hit age out.
     """
-    
-    def __init__(self, cache_dir: Optional[str] = None):
+
+    def __init__(self, cache_dir: Optional[str] = None, l1_size: int = CACHE_L1_SIZE,
+                 embedder: Optional[Callable[[str], Sequence[float]]] = None,
+                 semantic: bool = SEMANTIC_CACHE_ENABLED, semantic_size: int = SEMANTIC_CACHE_SIZE):
         """Initialize the ResponseCache.
-        
+
         Args:
-            cache_dir: Directory to store cache files. If None, uses './cache'.
+            cache_dir: Directory to store the cache database. If None, uses './cache_data'.
+            l1_size: Maximum number of entries kept in the in-process LRU
+            embedder: Callable returning the embedding of a question. If None, the
+                shared embedding generator is used on first semantic lookup.
+            semantic: Whether to fall back to embedding similarity on exact-key misses
+            semantic_size: Maximum number of questions in the semantic tier (0 = unbounded)
         """
         self.cache_dir = Path(cache_dir or os.path.join(os.path.dirname(__file__), 'cache_data'))
         self.ttl = CACHE_TTL
-        
+        self.db_path = self.cache_dir / "response_cache.db"
+
         # Create cache directory if it doesn't exist
         os.makedirs(self.cache_dir, exist_ok=True)
-        logging.info(f"Initialized response cache at {self.cache_dir}")
-    
+
+        # In-process LRU of cache_key -> (timestamp, response)
+        self._l1: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._l1_size = l1_size
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+
+        self._embedder = embedder
+        self._semantic = SemanticIndex(EMBEDDING_DIMENSION, threshold=SEMANTIC_CACHE_THRESHOLD) if semantic else None
+        # GDSF state of the semantic tier: cache_key -> [priority, hits, cost per byte]
+        self._semantic_size = semantic_size
+        self._gdsf: Dict[str, List[float]] = {}
+        self._gdsf_clock = 0.0
+        if self._semantic is not None:
+            self._load_semantic_index()
+        # Consecutive embedding failures, and the time before which no new attempt is made
+        self._embed_failures = 0
+        self._embed_retry_at = 0.0
+
+        # Writes are persisted off the request path by a single daemon thread
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._writer_loop, name="response-cache-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+        logger.info(f"Initialized response cache at {self.db_path}")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the SQLite store in autocommit + WAL mode and ensure the table exists.
+
+        Returns:
+            An open SQLite connection shared by all threads (guarded by self._lock)
+        """
+        conn = sqlite3.connect(str(self.db_path), isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, ts REAL NOT NULL, question TEXT, payload BLOB NOT NULL, embedding BLOB)"
+        )
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(cache)")}
+        if "embedding" not in columns:
+            conn.execute("ALTER TABLE cache ADD COLUMN embedding BLOB")
+        return conn
+
+    def _load_semantic_index(self):
+        """Rebuild the semantic index from the embeddings of the newest unexpired entries."""
+        rows = self._conn.execute(
+            "SELECT key, embedding, length(payload) FROM cache WHERE embedding IS NOT NULL AND ts >= ? "
+            "ORDER BY ts DESC LIMIT ?",
+            (time.time() - self.ttl, self._semantic_size or -1)
+        ).fetchall()
+        for cache_key, blob, size in rows:
+            self._semantic.add(cache_key, np.frombuffer(blob, dtype=np.float32))
+            # Compute costs are not persisted; restored entries count as one unit
+            self._gdsf_touch(cache_key, 1.0 / max(size, 1))
+        if rows:
+            logger.info(f"Loaded {len(rows)} question embeddings into the semantic cache")
+
+    def _embed(self, question: str) -> Optional[np.ndarray]:
+        """Embed a question for the semantic tier.
+
+        Args:
+            question: The user's question
+
+        Returns:
+            The embedding as a float32 array, or None if no embedder is available
+        """
+        if self._semantic is None or time.monotonic() < self._embed_retry_at:
+            return None
+
+        try:
+            if self._embedder is None:
+                from data_ingestion.embedding import embedding_generator
+                self._embedder = embedding_generator.generate_embedding
+            embedding = np.asarray(self._embedder(question.strip()), dtype=np.float32)
+        except Exception as e:
+            # Only this lookup goes without the semantic tier; repeated failures back off
+            # exponentially so a broken embedder is not retried on every request
+            self._embed_failures += 1
+            backoff = min(EMBED_RETRY_BACKOFF * 2 ** (self._embed_failures - 1), EMBED_RETRY_BACKOFF_MAX)
+            self._embed_retry_at = time.monotonic() + backoff
+            logger.warning(f"Could not embed question for the semantic cache (retrying in {backoff:.0f}s): {str(e)}")
+            return None
+        self._embed_failures = 0
+        return embedding
+
     def _get_cache_key(self, question: str) -> str:
         """Generate a cache key from the question.
-        
+
         Args:
             question: The user's question
-            
+
         Returns:
             A string key for cache lookup
         """
-        # Simple hashing of the question for the filename
-        # In a production system, consider using a more robust hashing method
-        import hashlib
-        return hashlib.md5(question.lower().strip().encode()).hexdigest()
-    
-    def get(self, question: str) -> Optional[Dict[str, Any]]:
+        # Short non-cryptographic-use key: 8-byte BLAKE2b digest (16 hex chars)
+        return hashlib.blake2b(question.lower().strip().encode(), digest_size=8).hexdigest()
+
+    def _gdsf_touch(self, cache_key: str, value: Optional[float] = None):
+        """Count a hit on a semantic-tier entry and refresh its GDSF priority.
+
+        Must be called with self._lock held.
+
+        Args:
+            cache_key: Key of the entry
+            value: Compute cost per payload byte; registers the entry if it is new
+        """
+        entry = self._gdsf.get(cache_key)
+        if entry is None:
+            if value is None:
+                return
+            entry = self._gdsf[cache_key] = [0.0, 0, value]
+        elif value is not None:
+            entry[2] = value
+        entry[1] += 1
+        entry[0] = self._gdsf_clock + entry[1] * entry[2]
+
+    def _gdsf_evict(self):
+        """Drop the lowest-priority questions until the semantic tier fits its size.
+
+        Evicted questions are still served by exact lookups; they only stop
+        matching paraphrases. Must be called with self._lock held.
+        """
+        while self._semantic_size and len(self._gdsf) > self._semantic_size:
+            victim = min(self._gdsf, key=lambda key: self._gdsf[key][0])
+            self._gdsf_clock = self._gdsf.pop(victim)[0]
+            self._semantic.remove(victim)
+
+    def _semantic_remove(self, cache_key: str):
+        """Remove an entry from the semantic tier. Must be called with self._lock held."""
+        if self._semantic is not None:
+            self._semantic.remove(cache_key)
+        self._gdsf.pop(cache_key, None)
+
+    def _l1_put(self, cache_key: str, timestamp: float, response: Dict[str, Any]):
+        """Insert an entry into the L1 LRU, evicting the least recently used one if full.
+
+        Must be called with self._lock held.
+        """
+        self._l1[cache_key] = (timestamp, response)
+        self._l1.move_to_end(cache_key)
+        if len(self._l1) > self._l1_size:
+            self._l1.popitem(last=False)
+
+    def _lookup(self, cache_key: str, now: float) -> Optional[Dict[str, Any]]:
+        """Fetch an unexpired response by key from L1, falling back to SQLite.
+
+        Must be called with self._lock held.
+
+        Args:
+            cache_key: Key produced by _get_cache_key
+            now: Current time used for the TTL check
+
+        Returns:
+            Cached response dictionary or None if not found or expired
+        """
+        entry = self._l1.get(cache_key)
+        if entry is not None:
+            timestamp, response = entry
+            if now - timestamp <= self.ttl:
+                self._l1.move_to_end(cache_key)
+                self._gdsf_touch(cache_key)
+                return response
+            del self._l1[cache_key]
+
+        row = self._conn.execute(
+            "SELECT ts, payload FROM cache WHERE key = ?", (cache_key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        # Check if the cache entry has expired
+        timestamp, payload = row
+        if now - timestamp > self.ttl:
+            self._semantic_remove(cache_key)
+            return None
+
+        response = _decode_payload(payload)
+        self._l1_put(cache_key, timestamp, response)
+        self._gdsf_touch(cache_key)
+        return response
+
+    def get(self, question: str, embedding: Optional[np.ndarray] = None) -> Optional[Dict[str, Any]]:
         """Retrieve a cached response for a question if it exists and is not expired.
-        
+
+        Exact (normalized) matches are tried first; on a miss, the cached question
+        with the most similar embedding is used if it reaches the similarity threshold.
+
         Args:
             question: The user's question
-            
+            embedding: The question's embedding if the caller already computed it;
+                otherwise it is computed here when the exact lookup misses
+
+        Returns:
+            Cached response dictionary or None if not found or expired
+        """
+        response = self.get_exact(question)
+        if response is None:
+            if embedding is None:
+                embedding = self._embed(question)
+            response = self.get_similar(question, embedding)
+        return response
+
+    def get_exact(self, question: str) -> Optional[Dict[str, Any]]:
+        """Retrieve the cached response stored under the question's normalized key.
+
+        Never embeds the question, so callers can try it before computing an embedding.
+
+        Args:
+            question: The user's question
+
         Returns:
             Cached response dictionary or None if not found or expired
         """
         cache_key = self._get_cache_key(question)
-        cache_file = self.cache_dir / f"{cache_key}.json"
-        
-        if not cache_file.exists():
-            logging.info(f"Cache miss for question: {question}")
+
+        try:
+            with self._lock:
+                response = self._lookup(cache_key, time.time())
+            if response is not None and logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Cache hit for question: {question}")
+            return response
+        except Exception as e:
+            logger.error(f"Error retrieving from cache: {str(e)}")
             return None
-        
+
+    def get_similar(self, question: str, embedding: Optional[np.ndarray]) -> Optional[Dict[str, Any]]:
+        """Retrieve the response of the most similar cached question, if similar enough.
+
+        Meant for after get_exact missed; exact matches are not tried again.
+
+        Args:
+            question: The user's question
+            embedding: The question's embedding; None counts as a miss
+
+        Returns:
+            Cached response dictionary or None if no cached question is similar enough
+        """
         try:
-            with open(cache_file, 'r') as f:
-                cached_data = json.load(f)
-            
-            # Check if the cache entry has expired
-            timestamp = cached_data.get('timestamp', 0)
-            if time.time() - timestamp > self.ttl:
-                logging.info(f"Cache expired for question: {question}")
-                return None
-            
-            logging.info(f"Cache hit for question: {question}")
-            return cached_data.get('response')
+            if embedding is not None and self._semantic is not None:
+                response = None
+                with self._lock:
+                    match = self._semantic.search(embedding) if self._semantic is not None else None
+                    if match is not None:
+                        response = self._lookup(match[0], time.time())
+                if response is not None:
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(f"Semantic cache hit (similarity {match[1]:.3f}) for question: {question}")
+                    return response
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Cache miss for question: {question}")
+            return None
         except Exception as e:
-            logging.error(f"Error retrieving from cache: {str(e)}")
+            logger.error(f"Error retrieving from cache: {str(e)}")
             return None
-    
-    def set(self, question: str, response: Dict[str, Any]) -> bool:
+
+    def set(self, question: str, response: Dict[str, Any], embedding: Optional[np.ndarray] = None,
+            cost: float = 1.0) -> bool:
         """Store a response in the cache.
-        
+
+        The response is available from the in-process LRU immediately; embedding,
+        serialization and the SQLite write happen on the background writer thread.
+
         Args:
             question: The user's question
             response: The response to cache
-            
+            embedding: The question's embedding if already computed; otherwise it is
+                computed on the writer thread
+            cost: Seconds it took to produce the response, weighting the entry's
+                GDSF priority in the semantic tier
+
         Returns:
-            True if successful, False otherwise
+            True if the response was accepted, False otherwise
         """
         cache_key = self._get_cache_key(question)
-        cache_file = self.cache_dir / f"{cache_key}.json"
-        
+
         try:
-            cache_data = {
-                'question': question,
-                'response': response,
-                'timestamp': time.time()
-            }
-            
-            with open(cache_file, 'w') as f:
-                json.dump(cache_data, f)
-            
-            logging.info(f"Cached response for question: {question}")
+            timestamp = time.time()
+            with self._lock:
+                self._l1_put(cache_key, timestamp, response)
+            self._queue.put((cache_key, timestamp, question, response, embedding, cost))
             return True
         except Exception as e:
-            logging.error(f"Error storing in cache: {str(e)}")
+            logger.error(f"Error storing in cache: {str(e)}")
             return False
-    
+
+    def _write(self, cache_key: str, timestamp: float, question: str, response: Dict[str, Any],
+               embedding: Optional[np.ndarray], cost: float):
+        """Persist one entry to SQLite and the semantic index (runs on the writer thread)."""
+        try:
+            payload = _encode_payload(response)
+            if embedding is None:
+                embedding = self._embed(question)
+            elif self._semantic is None:
+                embedding = None
+            else:
+                embedding = np.asarray(embedding, dtype=np.float32)
+            blob = embedding.tobytes() if embedding is not None else None
+
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, ts, question, payload, embedding) VALUES (?, ?, ?, ?, ?)",
+                    (cache_key, timestamp, question, payload, blob)
+                )
+                if embedding is not None and self._semantic is not None:
+                    self._semantic.add(cache_key, embedding)
+                    self._gdsf_touch(cache_key, cost / len(payload))
+                    self._gdsf_evict()
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Cached response for question: {question}")
+        except Exception as e:
+            logger.error(f"Error storing in cache: {str(e)}")
+
+    def _writer_loop(self):
+        """Drain the write queue until the stop sentinel (None) is received."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if isinstance(item, threading.Event):
+                item.set()
+                continue
+            self._write(*item)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every write queued so far has been persisted.
+
+        Args:
+            timeout: Maximum number of seconds to wait, or None to wait indefinitely
+
+        Returns:
+            True if the queue was drained within the timeout
+        """
+        if not self._writer.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        """Persist pending writes and stop the writer thread (registered with atexit)."""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+
     def clear(self, question: Optional[str] = None) -> bool:
         """Clear cache entries.
-        
+
         Args:
             question: If provided, clears only the cache for this question.
                      If None, clears all cache entries.
-            
+
         Returns:
             True if successful, False otherwise
         """
         try:
-            if question:
-                # Clear specific cache entry
-                cache_key = self._get_cache_key(question)
-                cache_file = self.cache_dir / f"{cache_key}.json"
-                
-                if cache_file.exists():
-                    os.remove(cache_file)
-                    logging.info(f"Cleared cache for question: {question}")
-            else:
-                # Clear all cache entries
-                for cache_file in self.cache_dir.glob('*.json'):
-                    os.remove(cache_file)
-                logging.info("Cleared all cache entries")
-            
+            # Let queued writes land first so they cannot resurrect cleared entries
+            self.flush()
+            with self._lock:
+                if question:
+                    # Clear specific cache entry
+                    cache_key = self._get_cache_key(question)
+                    self._conn.execute("DELETE FROM cache WHERE key = ?", (cache_key,))
+                    self._l1.pop(cache_key, None)
+                    self._semantic_remove(cache_key)
+                    logger.info(f"Cleared cache for question: {question}")
+                else:
+                    # Clear all cache entries
+                    self._conn.execute("DELETE FROM cache")
+                    self._l1.clear()
+                    if self._semantic is not None:
+                        self._semantic.clear()
+                    self._gdsf.clear()
+                    self._gdsf_clock = 0.0
+                    logger.info("Cleared all cache entries")
+
             return True
         except Exception as e:
-            logging.error(f"Error clearing cache: {str(e)}")
+            logger.error(f"Error clearing cache: {str(e)}")
             return False
 
 # Create a singleton instance
-response_cache = ResponseCache()
\ No newline at end of file
+response_cache = ResponseCache()
@@ -0,0 +1,160 @@
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from ._sim import cosine_scores
+
+# Unit-length components in [-1, 1] are stored as int8 in [-127, 127]
+_QUANT_SCALE = 127.0
+
+class SemanticIndex:
+    """In-memory nearest-neighbour index over L2-normalized embeddings.
+
+    Rows are quantized to int8 and stored in a single contiguous matrix (4x less
+    memory than float32). Lookups score the float32 query against the stored rows
+    with a single similarity kernel (SimSIMD or numba when available). Once the index grows past `lsh_min_size` entries,
+    random-projection LSH tables prune the candidate set before scoring.
+    """
+
+    def __init__(self, dimension: int, threshold: float = 0.95, lsh_bits: int = 16,
+                 lsh_tables: int = 8, lsh_min_size: int = 4096, seed: int = 0):
+        """Initialize the SemanticIndex.
+
+        Args:
+            dimension: Dimension of the embedding vectors
+            threshold: Minimum cosine similarity for a lookup to count as a hit
+            lsh_bits: Number of hyperplanes (signature bits) per LSH table
+            lsh_tables: Number of independent LSH tables
+            lsh_min_size: Index size from which LSH pruning is used instead of a full scan
+            seed: Seed for the random hyperplanes, so signatures are stable across restarts
+        """
+        self.logger = logging.getLogger(__name__)
+        self.dimension = dimension
+        self.threshold = threshold
+        self.lsh_min_size = lsh_min_size
+
+        self._vecs = np.empty((64, dimension), dtype=np.int8)
+        self._keys: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+
+        rng = np.random.default_rng(seed)
+        self._planes = rng.standard_normal((lsh_tables, lsh_bits, dimension)).astype(np.float32)
+        self._pow2 = (1 << np.arange(lsh_bits, dtype=np.int64))
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in range(lsh_tables)]
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _normalize(self, embedding: Sequence[float]) -> Optional[np.ndarray]:
+        """Return `embedding` as a unit-length float32 vector, or None if it has no direction."""
+        vec = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        if vec.shape[0] != self.dimension:
+            self.logger.warning(f"Ignoring embedding of dimension {vec.shape[0]} (expected {self.dimension})")
+            return None
+        norm = float(np.linalg.norm(vec))
+        if norm == 0.0:
+            return None
+        return vec / norm
+
+    def _signatures(self, vec: np.ndarray) -> np.ndarray:
+        """Compute the LSH bucket code of `vec` for every table."""
+        bits = (self._planes @ vec) > 0
+        return bits.astype(np.int64) @ self._pow2
+
+    def add(self, key: str, embedding: Sequence[float]):
+        """Insert or replace the embedding stored for `key`.
+
+        Args:
+            key: Identifier returned by `search` on a hit
+            embedding: Embedding vector; it is L2-normalized on insert
+        """
+        vec = self._normalize(embedding)
+        if vec is None:
+            return
+
+        if key in self._rows:
+            self.remove(key)
+        self._insert(key, vec)
+
+    def _insert(self, key: str, vec: np.ndarray):
+        """Quantize a unit-length vector into a new row and register it in the LSH tables."""
+        row = len(self._keys)
+        if row == self._vecs.shape[0]:
+            grown = np.empty((row * 2, self.dimension), dtype=np.int8)
+            grown[:row] = self._vecs
+            self._vecs = grown
+
+        self._vecs[row] = np.rint(vec * _QUANT_SCALE).astype(np.int8)
+        self._keys.append(key)
+        self._rows[key] = row
+        for table, code in zip(self._buckets, self._signatures(vec)):
+            table.setdefault(int(code), []).append(row)
+
+    def remove(self, key: str):
+        """Remove `key` from the index if present.
+
+        The row is zeroed and tombstoned; the matrix is compacted once more than
+        half of the rows are dead.
+        """
+        row = self._rows.pop(key, None)
+        if row is None:
+            return
+        self._vecs[row] = 0
+        self._keys[row] = None
+        if len(self._keys) > 64 and len(self._rows) * 2 < len(self._keys):
+            self._compact()
+
+    def _compact(self):
+        """Rebuild the matrix and LSH tables without tombstoned rows."""
+        live = [(key, self._vecs[row] / _QUANT_SCALE) for key, row in self._rows.items()]
+        self.clear()
+        for key, vec in live:
+            # Dequantized rows re-quantize to exactly the same int8 values
+            self._insert(key, vec.astype(np.float32))
+
+    def clear(self):
+        """Remove every entry from the index."""
+        self._vecs = np.empty((64, self.dimension), dtype=np.int8)
+        self._keys = []
+        self._rows = {}
+        self._buckets = [{} for _ in self._buckets]
+
+    @staticmethod
+    def _score(rows: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Cosine similarity of a unit-length float32 query against quantized rows."""
+        return cosine_scores(rows, query, _QUANT_SCALE)
+
+    def search(self, embedding: Sequence[float]) -> Optional[Tuple[str, float]]:
+        """Find the closest stored embedding.
+
+        Args:
+            embedding: The query embedding vector
+
+        Returns:
+            Tuple of (key, similarity) if the best match reaches the threshold, otherwise None
+        """
+        if not self._rows:
+            return None
+
+        query = self._normalize(embedding)
+        if query is None:
+            return None
+
+        if len(self._rows) >= self.lsh_min_size:
+            candidates = set()
+            for table, code in zip(self._buckets, self._signatures(query)):
+                candidates.update(table.get(int(code), ()))
+            if not candidates:
+                return None
+            rows = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            scores = self._score(self._vecs[rows], query)
+            best = int(np.argmax(scores))
+            row, score = int(rows[best]), float(scores[best])
+        else:
+            scores = self._score(self._vecs[:len(self._keys)], query)
+            row = int(np.argmax(scores))
+            score = float(scores[row])
+
+        key = self._keys[row]
+        if key is None or score < self.threshold:
+            return None
+        return key, score
@@ -12,10 +12,20 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
 NEO4J_USERNAME = os.getenv("NEO4J_USERNAME", "neo4j")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "password")
+# Database used by sessions; naming it explicitly saves a home-database lookup per session
+NEO4J_DATABASE = os.getenv("NEO4J_DATABASE", "neo4j")
+# Connection pool tuning (the driver is a long-lived singleton shared by all callers)
+NEO4J_MAX_CONNECTION_POOL_SIZE = int(os.getenv("NEO4J_MAX_CONNECTION_POOL_SIZE", "50"))
+NEO4J_CONNECTION_ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_CONNECTION_ACQUISITION_TIMEOUT", "30"))
+NEO4J_MAX_CONNECTION_LIFETIME = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "1200"))
+# Seconds a get_schema_info result is reused; writes through the driver invalidate it (0 disables)
+NEO4J_SCHEMA_CACHE_TTL = float(os.getenv("NEO4J_SCHEMA_CACHE_TTL", "60"))
 
 # OpenRouter Configuration
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL")
+OPENROUTER_CONNECT_TIMEOUT = float(os.getenv("OPENROUTER_CONNECT_TIMEOUT", "5"))
+OPENROUTER_READ_TIMEOUT = float(os.getenv("OPENROUTER_READ_TIMEOUT", "60"))
 
 # LLM Model Configuration
 QUERY_TRANSLATOR_MODEL = os.getenv("QUERY_TRANSLATOR_MODEL", "google/gemini-2.5-pro-exp-03-25:free")
@@ -24,15 +34,63 @@ ANSWER_GENERATOR_MODEL = os.getenv("ANSWER_GENERATOR_MODEL", "google/gemini-2.5-
 # Embedding Model Configuration
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
 EMBEDDING_DIMENSION = 384  # Dimension for the specified model
+# Batch size for encoding and optional device override ("cuda", "mps", "cpu"; auto-detected if unset)
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE")
+# Milliseconds concurrent async requests wait to be embedded together in one batch
+EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5"))
+# Number of chunk embeddings memoized by content hash (0 disables the cache)
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "100000"))
+# SQLite file persisting question embeddings across restarts, below the in-memory LRU (empty disables)
+EMBEDDING_CACHE_DB = os.getenv("EMBEDDING_CACHE_DB", str(BASE_DIR / "src" / "cache" / "cache_data" / "embedding_cache.db"))
+# Inference backend: "torch" (SentenceTransformer) or "onnx" (INT8-quantized ONNX Runtime, CPU)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+# Run the torch backend in BF16 on CPU via Intel Extension for PyTorch (AVX-512 BF16 / AMX CPUs)
+EMBEDDING_CPU_BF16 = os.getenv("EMBEDDING_CPU_BF16", "false").lower() == "true"
+# Where exported/quantized ONNX models are kept between runs
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", str(BASE_DIR / "models" / "onnx"))
+
+# Ingestion Configuration
+# Worker processes that parse and chunk files in parallel (0 = one per CPU core)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "0"))
+
+# Store document embeddings as int8 lists plus a per-vector scale (4x smaller) instead of
+# float lists. The HNSW index needs float vectors, so vector search then scores nodes
+# exhaustively with vector.similarity.cosine (Neo4j 5.18+); intended for small corpora.
+EMBEDDING_STORE_INT8 = os.getenv("EMBEDDING_STORE_INT8", "false").lower() == "true"
 
 # Vector Search Configuration
 VECTOR_INDEX_NAME = "Document_embedding_index"
 VECTOR_NODE_LABEL = "Document"
 VECTOR_PROPERTY = "embedding"
+# Neighbours requested from the vector index per result wanted (k = limit * factor)
+VECTOR_SEARCH_OVERFETCH = float(os.getenv("VECTOR_SEARCH_OVERFETCH", "1.0"))
+# Query-vector cache: a search whose embedding is at least this similar to a recent one
+# reuses that search's results instead of querying Neo4j; 0 entries disables it
+VECTOR_QUERY_CACHE_SIZE = int(os.getenv("VECTOR_QUERY_CACHE_SIZE", "1024"))
+VECTOR_QUERY_CACHE_THRESHOLD = float(os.getenv("VECTOR_QUERY_CACHE_THRESHOLD", "0.97"))
+VECTOR_QUERY_CACHE_TTL = int(os.getenv("VECTOR_QUERY_CACHE_TTL", "300"))
 
 # Cache Configuration
 # Time to live in seconds (default: 1 hour)
 CACHE_TTL = int(os.getenv("CACHE_TTL", "3600"))
+# Maximum number of responses kept in the in-process LRU in front of the SQLite store
+CACHE_L1_SIZE = int(os.getenv("CACHE_L1_SIZE", "1024"))
+# Semantic cache: reuse a cached answer when a new question's embedding is this similar to a cached one
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+# Questions kept in the semantic tier; the lowest hits x compute cost / size are evicted first (0 = unbounded)
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "1024"))
+# Generated Cypher queries kept per (normalized question, schema, vector context); 0 disables
+CYPHER_CACHE_SIZE = int(os.getenv("CYPHER_CACHE_SIZE", "512"))
+CYPHER_CACHE_TTL = int(os.getenv("CYPHER_CACHE_TTL", "3600"))
+# Answer structural questions ("how many X", "list all X", "find X with P = V") from local
+# templates instead of the LLM when they match the schema unambiguously
+CYPHER_TEMPLATES_ENABLED = os.getenv("CYPHER_TEMPLATES_ENABLED", "true").lower() == "true"
 
 # Logging Configuration
-LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
\ No newline at end of file
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+
+# Metrics Configuration
+# Port of the Prometheus /metrics endpoint (requires prometheus_client); 0 disables it
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
\ No newline at end of file
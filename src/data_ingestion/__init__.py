@@ -1,5 +1,17 @@
-from .preprocessor import document_preprocessor
-from data_ingestion.embedding import embedding_generator
-from .ingest import data_ingestion
+import importlib
 
-__all__ = ['document_preprocessor', 'embedding_generator', 'data_ingestion']
\ No newline at end of file
+# Singletons are imported on first access (PEP 562) so that importing a submodule,
+# e.g. in an ingestion worker process, does not load the embedding model or connect to Neo4j
+_SINGLETONS = {
+    'document_preprocessor': '.preprocessor',
+    'embedding_generator': '.embedding',
+    'data_ingestion': '.ingest',
+}
+
+__all__ = ['document_preprocessor', 'embedding_generator', 'data_ingestion']
+
+def __getattr__(name):
+    if name in _SINGLETONS:
+        module = importlib.import_module(_SINGLETONS[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -8,15 +8,7 @@ from pathlib import Path
 # Add the parent directory to the path so we can import the modules
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
 
-from data_ingestion.ingest import DataIngestion
-from utils.monitoring import monitoring
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+from logging_config import configure_logging
 
 logger = logging.getLogger(__name__)
 
@@ -66,6 +58,12 @@ def main():
     )
     
     args = parser.parse_args()
+    configure_logging()
+    
+    # Imported here rather than at module level: spawned ingestion workers re-run this
+    # script as __mp_main__, and must not load the embedding model or connect to Neo4j
+    from data_ingestion.ingest import DataIngestion
+    from utils.monitoring import monitoring
     
     # Set logging level based on verbosity
     if args.verbose:
@@ -95,8 +93,7 @@ def main():
         
         # Configure the embedding generator with the specified model if provided
         if args.embedding_model:
-            data_ingestion.embedding_generator.model_name = args.embedding_model
-            data_ingestion.embedding_generator._load_model()
+            data_ingestion.embedding_generator.set_model(args.embedding_model)
         
         # Perform the data ingestion
         data_ingestion.ingest_data(
@@ -1,8 +1,87 @@
+import asyncio
+import hashlib
 import logging
-from typing import List, Dict, Any, Union
+import os
+import sqlite3
+import threading
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Set, Tuple, Union
 import numpy as np
+import torch
 from sentence_transformers import SentenceTransformer
-from config import EMBEDDING_MODEL, EMBEDDING_DIMENSION
+from config import (
+    EMBEDDING_MODEL,
+    EMBEDDING_DIMENSION,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_BATCH_WINDOW_MS,
+    EMBEDDING_DEVICE,
+    EMBEDDING_CACHE_SIZE,
+    EMBEDDING_CACHE_DB,
+    EMBEDDING_BACKEND,
+    EMBEDDING_CPU_BF16,
+    ONNX_MODEL_DIR
+)
+
+def _text_key(text: str) -> bytes:
+    """Content hash identifying a text in the embedding caches."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+class EmbeddingStore:
+    """SQLite-backed store of embeddings by (model, content hash).
+    
+    Keeps question embeddings across restarts, so a question embedded before
+    is not encoded again after the in-memory LRU has been lost.
+    """
+    
+    def __init__(self, db_path: str):
+        """Initialize the EmbeddingStore; the database is opened on first use.
+        
+        Args:
+            db_path: Path of the SQLite database file
+        """
+        self.db_path = Path(db_path)
+        self.logger = logging.getLogger(__name__)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database in autocommit + WAL mode. Must be called with self._lock held."""
+        if self._conn is None:
+            os.makedirs(self.db_path.parent, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, key BLOB NOT NULL, vec BLOB NOT NULL, PRIMARY KEY (model, key))"
+            )
+            self._conn = conn
+        return self._conn
+    
+    def get(self, model: str, key: bytes) -> Optional[np.ndarray]:
+        """Return the stored embedding, or None if there is none (or the store fails)."""
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT vec FROM embeddings WHERE model = ? AND key = ?", (model, key)
+                ).fetchone()
+        except sqlite3.Error as e:
+            self.logger.warning(f"Could not read from the embedding store: {str(e)}")
+            return None
+        return np.frombuffer(row[0], dtype=np.float32) if row else None
+    
+    def put(self, model: str, key: bytes, embedding: np.ndarray):
+        """Store an embedding; failures are logged, not raised."""
+        try:
+            with self._lock:
+                self._connect().execute(
+                    "INSERT OR REPLACE INTO embeddings (model, key, vec) VALUES (?, ?, ?)",
+                    (model, key, np.asarray(embedding, dtype=np.float32).tobytes())
+                )
+        except sqlite3.Error as e:
+            self.logger.warning(f"Could not write to the embedding store: {str(e)}")
 
 class EmbeddingGenerator:
     """Generates vector embeddings for text chunks.
@@ -19,66 +98,297 @@ class EmbeddingGenerator:
         """
         self.model_name = model_name or EMBEDDING_MODEL
         self.dimension = EMBEDDING_DIMENSION
+        self.batch_size = EMBEDDING_BATCH_SIZE
+        self.device = EMBEDDING_DEVICE or self._select_device()
+        self.backend = EMBEDDING_BACKEND
+        # Set by _load_model once the model has been optimized for BF16 on CPU
+        self._cpu_bf16 = False
         self.logger = logging.getLogger(__name__)
+        # The model is loaded lazily on the first encode call
         self.model = None
-        self._load_model()
+        
+        # LRU of content hash -> embedding row, so repeated chunks are encoded once
+        self._emb_cache: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._emb_cache_size = EMBEDDING_CACHE_SIZE
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Persistent tier for single-text (question) embeddings
+        self._store = EmbeddingStore(EMBEDDING_CACHE_DB) if EMBEDDING_CACHE_DB else None
+    
+    def set_model(self, model_name: str):
+        """Switch to a different embedding model.
+        
+        The new model is not loaded until it is first needed.
+        
+        Args:
+            model_name: Name of the SentenceTransformer model to use
+        """
+        if model_name != self.model_name:
+            self.model_name = model_name
+            self.model = None
+            self._cpu_bf16 = False
+            with self._cache_lock:
+                self._emb_cache.clear()
+    
+    @staticmethod
+    def _select_device() -> str:
+        """Pick the fastest available device for encoding."""
+        if torch.cuda.is_available():
+            return "cuda"
+        if torch.backends.mps.is_available():
+            return "mps"
+        return "cpu"
+    
+    def _encode(self, texts: Union[str, List[str]]) -> np.ndarray:
+        """Encode one text or a batch of texts into L2-normalized float32 vectors.
+        
+        Args:
+            texts: A single text or a list of texts
+            
+        Returns:
+            Array of shape (dim,) for a single text or (N, dim) for a list
+        """
+        if self._cpu_bf16:
+            with torch.no_grad(), torch.autocast("cpu", dtype=torch.bfloat16):
+                embeddings = self.model.encode(
+                    texts,
+                    batch_size=self.batch_size,
+                    convert_to_tensor=True,
+                    normalize_embeddings=True,
+                    show_progress_bar=False
+                )
+            return embeddings.float().cpu().numpy()
+        return self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        ).astype(np.float32, copy=False)
     
     def _load_model(self):
         """Load the embedding model."""
         try:
             self.logger.info(f"Loading embedding model: {self.model_name}")
-            self.model = SentenceTransformer(self.model_name)
-            self.logger.info(f"Embedding model loaded successfully")
+            if self.backend == "onnx":
+                from .onnx_encoder import OnnxEncoder
+                self.model = OnnxEncoder(self.model_name, ONNX_MODEL_DIR)
+                self.logger.info("Embedding model loaded successfully on ONNX Runtime (INT8, CPU)")
+                return
+            self.model = SentenceTransformer(self.model_name, device=self.device)
+            if self.model.device.type in ("cuda", "mps"):
+                # Half precision halves weight bandwidth on accelerators
+                self.model.half()
+            else:
+                torch.set_num_threads(os.cpu_count() or 1)
+                if EMBEDDING_CPU_BF16:
+                    self._optimize_cpu_bf16()
+            self.logger.info(f"Embedding model loaded successfully on {self.model.device}")
         except Exception as e:
             self.logger.error(f"Error loading embedding model: {str(e)}")
             raise
     
-    def generate_embedding(self, text: str) -> List[float]:
+    def _optimize_cpu_bf16(self):
+        """Prepack the transformer weights for BF16 CPU kernels with IPEX, if available."""
+        try:
+            import intel_extension_for_pytorch as ipex
+        except ImportError:
+            self.logger.warning("EMBEDDING_CPU_BF16 is set but intel_extension_for_pytorch is not installed; using FP32")
+            return
+        transformer = self.model[0]
+        transformer.auto_model = ipex.optimize(transformer.auto_model.eval(), dtype=torch.bfloat16)
+        self._cpu_bf16 = True
+        self.logger.info("Embedding model optimized for BF16 on CPU")
+    
+    def generate_embedding(self, text: str) -> np.ndarray:
         """Generate an embedding for a single text.
         
+        Looks the text up in the in-memory LRU, then in the persistent store, and
+        only encodes it when neither has it.
+        
         Args:
             text: The text to generate an embedding for
             
         Returns:
-            List of floats representing the embedding vector
+            Float32 array of shape (dim,) representing the embedding vector
         """
-        if not self.model:
-            self._load_model()
+        key = _text_key(text)
+        if self._emb_cache_size:
+            with self._cache_lock:
+                row = self._emb_cache.get(key)
+                if row is not None:
+                    self._emb_cache.move_to_end(key)
+                    self.cache_hits += 1
+                    return row
         
-        try:
-            embedding = self.model.encode(text)
-            return embedding.tolist()
-        except Exception as e:
-            self.logger.error(f"Error generating embedding: {str(e)}")
-            raise
+        row = self._store.get(self.model_name, key) if self._store is not None else None
+        if row is None:
+            if not self.model:
+                self._load_model()
+            try:
+                row = np.asarray(self._encode(text), dtype=np.float32)
+            except Exception as e:
+                self.logger.error(f"Error generating embedding: {str(e)}")
+                raise
+            if self._store is not None:
+                self._store.put(self.model_name, key, row)
+        
+        if self._emb_cache_size:
+            with self._cache_lock:
+                self._emb_cache[key] = row
+                while len(self._emb_cache) > self._emb_cache_size:
+                    self._emb_cache.popitem(last=False)
+                self.cache_misses += 1
+        return row
     
-    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+    def generate_embeddings(self, texts: List[str]) -> np.ndarray:
         """Generate embeddings for multiple texts in batch.
         
+        Texts seen before (by content hash) are served from an in-memory LRU; only
+        the remaining distinct texts are encoded.
+        
         Args:
             texts: List of texts to generate embeddings for
             
         Returns:
-            List of embedding vectors (each as a list of floats)
+            Float32 array of shape (N, dim), one L2-normalized row per text
+        """
+        if not self._emb_cache_size:
+            return self._encode_batched(texts)
+        
+        keys = [_text_key(text) for text in texts]
+        with self._cache_lock:
+            rows = [self._emb_cache.get(key) for key in keys]
+            for key, row in zip(keys, rows):
+                if row is not None:
+                    self._emb_cache.move_to_end(key)
+        
+        # Distinct texts that still need encoding, in first-seen order
+        missing: Dict[bytes, int] = {}
+        for i, (key, row) in enumerate(zip(keys, rows)):
+            if row is None and key not in missing:
+                missing[key] = i
+        hits = sum(row is not None for row in rows)
+        
+        encoded = self._encode_batched([texts[i] for i in missing.values()]) if missing else None
+        dim = encoded.shape[1] if encoded is not None else (rows[0].shape[0] if rows else self.dimension)
+        out = np.empty((len(texts), dim), dtype=np.float32)
+        
+        fresh = dict(zip(missing, encoded)) if encoded is not None else {}
+        for i, (key, row) in enumerate(zip(keys, rows)):
+            out[i] = row if row is not None else fresh[key]
+        
+        with self._cache_lock:
+            for key, row in fresh.items():
+                self._emb_cache[key] = row.copy()
+            while len(self._emb_cache) > self._emb_cache_size:
+                self._emb_cache.popitem(last=False)
+            self.cache_hits += hits
+            self.cache_misses += len(texts) - hits
+        return out
+    
+    def _encode_batched(self, texts: List[str]) -> np.ndarray:
+        """Encode texts in sub-batches of `batch_size` written straight into one preallocated array.
+        
+        Args:
+            texts: List of texts to encode
+            
+        Returns:
+            Float32 array of shape (N, dim)
         """
         if not self.model:
             self._load_model()
         
         try:
-            embeddings = self.model.encode(texts)
-            return embeddings.tolist()
+            if self._cuda_pipelined():
+                return self._encode_cuda_pipelined(texts)
+            out = None
+            for start in range(0, len(texts), self.batch_size):
+                batch = self._encode(texts[start:start + self.batch_size])
+                if out is None:
+                    out = np.empty((len(texts), batch.shape[1]), dtype=np.float32)
+                out[start:start + len(batch)] = batch
+            if out is None:
+                out = np.empty((0, self.dimension), dtype=np.float32)
+            return out
         except Exception as e:
             self.logger.error(f"Error generating batch embeddings: {str(e)}")
             raise
     
+    def _cuda_pipelined(self) -> bool:
+        """Whether batches can be pipelined through CUDA streams."""
+        return isinstance(self.model, SentenceTransformer) and self.model.device.type == "cuda"
+    
+    def _encode_cuda_pipelined(self, texts: List[str]) -> np.ndarray:
+        """Encode texts on CUDA, overlapping host work with the GPU forward pass.
+        
+        While the GPU runs the forward pass of one batch, the next batch is tokenized
+        on the CPU and copied from pinned memory on a separate stream, so the
+        host-to-device transfer is hidden behind compute instead of preceding it.
+        Texts are processed longest first, as SentenceTransformer.encode does, to
+        keep padding low.
+        
+        Args:
+            texts: List of texts to encode
+            
+        Returns:
+            Float32 array of shape (N, dim), one L2-normalized row per text
+        """
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        
+        device = self.model.device
+        copy_stream = torch.cuda.Stream(device)
+        compute_stream = torch.cuda.current_stream(device)
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        batches = [
+            [texts[i] for i in order[start:start + self.batch_size]]
+            for start in range(0, len(texts), self.batch_size)
+        ]
+        
+        def stage(batch):
+            features = self.model.tokenize(batch)
+            with torch.cuda.stream(copy_stream):
+                features = {
+                    name: value.pin_memory().to(device, non_blocking=True)
+                    for name, value in features.items()
+                }
+                ready = torch.cuda.Event()
+                ready.record(copy_stream)
+            return features, ready
+        
+        results = []
+        with torch.inference_mode():
+            pending = stage(batches[0])
+            for i in range(len(batches)):
+                features, ready = pending
+                compute_stream.wait_event(ready)
+                for value in features.values():
+                    # The tensors were allocated on the copy stream but are consumed here
+                    value.record_stream(compute_stream)
+                embeddings = self.model(features)["sentence_embedding"]
+                if i + 1 < len(batches):
+                    # Runs on the CPU while the GPU is still busy with this batch
+                    pending = stage(batches[i + 1])
+                results.append(torch.nn.functional.normalize(embeddings.float(), dim=1))
+            sorted_out = torch.cat(results).cpu().numpy()
+        
+        out = np.empty_like(sorted_out)
+        out[order] = sorted_out
+        return out
+    
     def process_chunks(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Process a list of text chunks and add embeddings.
         
+        Each chunk's 'metadata' dictionary is merged into the chunk itself, so the
+        result already has the shape of the node properties stored in Neo4j.
+        
         Args:
             chunks: List of chunk dictionaries with 'text' key
             
         Returns:
-            List of chunk dictionaries with added 'embedding' key
+            List of chunk dictionaries with added 'embedding' key (a float32 row view)
         """
         texts = [chunk["text"] for chunk in chunks]
         
@@ -87,6 +397,9 @@ class EmbeddingGenerator:
             
             # Add embeddings to the chunks
             for i, chunk in enumerate(chunks):
+                metadata = chunk.pop("metadata", None)
+                if metadata:
+                    chunk.update(metadata)
                 chunk["embedding"] = embeddings[i]
             
             self.logger.info(f"Generated embeddings for {len(chunks)} chunks")
@@ -95,5 +408,79 @@ class EmbeddingGenerator:
             self.logger.error(f"Error processing chunks: {str(e)}")
             raise
 
+class EmbeddingBatcher:
+    """Micro-batches embedding requests from concurrent coroutines.
+    
+    Texts submitted within `window` seconds of each other (or until `max_batch`
+    are pending) are encoded by one generate_embeddings call in a worker thread,
+    and each caller receives its own row. Pending requests are kept per event loop.
+    
+    Only async callers benefit (Orchestrator.process_question_async / embed_question_async,
+    e.g. a service answering many questions on one event loop); the synchronous
+    Streamlit path embeds each question as it arrives.
+    """
+    
+    def __init__(self, generator: EmbeddingGenerator, window: float = EMBEDDING_BATCH_WINDOW_MS / 1000,
+                 max_batch: Optional[int] = None):
+        """Initialize the EmbeddingBatcher.
+        
+        Args:
+            generator: Embedding generator used to encode the batches
+            window: Seconds to wait for more texts after the first one arrives
+            max_batch: Batch size that triggers encoding immediately (default: the generator's batch size)
+        """
+        self.generator = generator
+        self.window = window
+        self.max_batch = max_batch or generator.batch_size
+        # Event loop -> texts waiting for the next batch, with their result futures
+        self._pending: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, List[Tuple[str, asyncio.Future]]]" = weakref.WeakKeyDictionary()
+        self._timers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.TimerHandle]" = weakref.WeakKeyDictionary()
+        # Running encode tasks; the event loop only keeps weak references to tasks, so
+        # without these a batch could be collected mid-flight and its callers never resolved
+        self._tasks: Set[asyncio.Task] = set()
+    
+    async def embed(self, text: str) -> np.ndarray:
+        """Embed one text as part of the next batch.
+        
+        Args:
+            text: The text to generate an embedding for
+            
+        Returns:
+            Float32 array of shape (dim,)
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending.setdefault(loop, [])
+        pending.append((text, future))
+        if len(pending) >= self.max_batch:
+            self._flush(loop)
+        elif len(pending) == 1:
+            self._timers[loop] = loop.call_later(self.window, self._flush, loop)
+        return await future
+    
+    def _flush(self, loop: asyncio.AbstractEventLoop):
+        """Start encoding the texts pending on `loop`."""
+        timer = self._timers.pop(loop, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(loop, None)
+        if batch:
+            task = loop.create_task(self._encode(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    
+    async def _encode(self, batch: List[Tuple[str, asyncio.Future]]):
+        """Encode one batch off the event loop and resolve the callers' futures."""
+        try:
+            embeddings = await asyncio.to_thread(self.generator.generate_embeddings, [text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
+
 # Create a singleton instance
 embedding_generator = EmbeddingGenerator()
\ No newline at end of file
@@ -0,0 +1,368 @@
+"""Parse-only half of data ingestion.
+
+Everything here is free of the embedding model and the Neo4j driver so it can
+run in worker processes: files are read, graph nodes are collected as
+(label, properties) pairs and long text fields are cleaned and chunked.
+"""
+import logging
+import mmap
+from collections import deque
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import pandas as pd
+
+import json_utils
+from .preprocessor import DocumentPreprocessor
+
+try:
+    import ijson
+except ImportError:  # ijson is optional; large JSON files are then parsed in one go
+    ijson = None
+
+# String fields longer than this are chunked for vector embedding
+TEXT_MIN_LENGTH = 100
+# CSV files are read and processed in slices of this many rows to bound memory
+CSV_CHUNK_ROWS = 10_000
+# JSON arrays in files larger than this are streamed item by item (requires ijson)
+JSON_STREAM_MIN_BYTES = 50 * 1024 * 1024
+# Text files larger than this are memory-mapped and processed in windows of about this size
+TEXT_WINDOW_BYTES = 1024 * 1024
+
+SUPPORTED_EXTENSIONS = {".csv", ".json", ".txt", ".md", ".html"}
+
+logger = logging.getLogger(__name__)
+
+def clean_properties(properties: Dict[str, Any]) -> Dict[str, Any]:
+    """Remove None values and non-primitive types from node properties.
+
+    Args:
+        properties: Raw node properties
+
+    Returns:
+        Properties that can be stored on a Neo4j node
+    """
+    cleaned_props = {}
+    for key, value in properties.items():
+        if value is not None and isinstance(value, (str, int, float, bool, list)):
+            if isinstance(value, list) and all(isinstance(item, (str, int, float, bool)) for item in value):
+                cleaned_props[key] = value
+            elif not isinstance(value, list):
+                cleaned_props[key] = value
+    return cleaned_props
+
+class ParsedFile:
+    """Graph nodes and text fields extracted from one source file."""
+
+    def __init__(self):
+        self.nodes: List[Tuple[str, Dict[str, Any]]] = []
+        self.texts: List[Tuple[str, Dict[str, Any]]] = []
+
+    def add_node(self, label: str, properties: Dict[str, Any]):
+        self.nodes.append((label, clean_properties(properties)))
+
+    def add_clean_nodes(self, label: str, rows: List[Dict[str, Any]]):
+        """Add nodes whose properties are already restricted to storable values."""
+        self.nodes.extend((label, row) for row in rows)
+
+    def add_text(self, text: str, metadata: Dict[str, Any]):
+        self.texts.append((text, metadata))
+
+    def extend(self, other: "ParsedFile"):
+        self.nodes.extend(other.nodes)
+        self.texts.extend(other.texts)
+
+def is_supported(file_path: Path) -> bool:
+    """Whether the file type of `file_path` can be ingested."""
+    return file_path.suffix.lower() in SUPPORTED_EXTENSIONS
+
+def iter_parse_file(file_path: Path) -> Iterator[ParsedFile]:
+    """Parse a supported file into one or more parts.
+
+    CSV files and large JSON arrays yield one part per CSV_CHUNK_ROWS rows (items), and
+    large text files one part per TEXT_WINDOW_BYTES window, so they never have to be
+    held in memory as a whole; other files yield a single part.
+
+    Args:
+        file_path: Path to the file
+
+    Yields:
+        Parsed nodes and text fields
+    """
+    file_extension = file_path.suffix.lower()
+
+    if file_extension == ".csv":
+        for df in pd.read_csv(file_path, chunksize=CSV_CHUNK_ROWS):
+            parsed = ParsedFile()
+            _parse_csv_frame(df, file_path, parsed)
+            yield parsed
+        return
+
+    if file_extension == ".json" and _should_stream_json(file_path):
+        yield from _iter_parse_json_stream(file_path)
+        return
+
+    if file_extension in [".txt", ".md", ".html"] and file_path.stat().st_size > TEXT_WINDOW_BYTES:
+        yield from _iter_parse_text_windows(file_path)
+        return
+
+    parsed = ParsedFile()
+    if file_extension == ".json":
+        _parse_json(file_path, parsed)
+    elif file_extension in [".txt", ".md", ".html"]:
+        _parse_text(file_path, parsed)
+    yield parsed
+
+def parse_file(file_path: Path) -> Optional[ParsedFile]:
+    """Parse a single file based on its type.
+
+    Args:
+        file_path: Path to the file
+
+    Returns:
+        The parsed nodes and text fields, or None if the file type is not supported
+    """
+    if not is_supported(file_path):
+        return None
+    parsed = ParsedFile()
+    for part in iter_parse_file(file_path):
+        parsed.extend(part)
+    return parsed
+
+def _parse_csv_frame(df: pd.DataFrame, file_path: Path, parsed: ParsedFile):
+    """Parse a slice of a CSV file: one node per row plus its long text columns.
+
+    Properties are cleaned per column rather than per value: only numeric, boolean
+    and object (string) columns without container values are kept, and missing values
+    become None, which Neo4j simply does not store.
+    """
+    keep_cols = [
+        col for col in df.select_dtypes(include=["number", "bool", "object"]).columns
+        if df[col].dtype != object or not df[col].map(type).isin([list, dict]).any()
+    ]
+    # Python scalars instead of NumPy ones, with missing values as None
+    df = df[keep_cols].astype(object)
+    df = df.where(pd.notna(df), None)
+
+    # Determine node labels and relationship structure based on the CSV structure
+    # This is a simplified approach - in a real system, you might want to provide a mapping configuration
+    primary_label = file_path.stem.capitalize()
+
+    records = df.to_dict(orient="records")
+    parsed.add_clean_nodes(primary_label, records)
+
+    # Find the cells holding text that should be vectorized, one column at a time
+    long_text = pd.DataFrame({
+        col: _string_lengths(df[col]) > TEXT_MIN_LENGTH
+        for col in df.columns
+    })
+    for row, col in zip(*long_text.to_numpy().nonzero()):
+        properties = records[row]
+        text_col = df.columns[col]
+        parsed.add_text(
+            properties[text_col],
+            metadata={
+                "source": file_path.name,
+                "node_label": primary_label,
+                "node_properties": {k: v for k, v in properties.items() if k != text_col}
+            }
+        )
+
+def _string_lengths(column: pd.Series) -> pd.Series:
+    """Length of every string value in `column`, NaN for anything else."""
+    return column.where(column.map(type).eq(str)).str.len()
+
+def _parse_json(file_path: Path, parsed: ParsedFile):
+    """Parse a JSON file containing a list of objects or a single (nested) object."""
+    with open(file_path, 'rb') as f:
+        data = json_utils.loads(f.read())
+
+    primary_label = file_path.stem.capitalize()
+    if isinstance(data, list):
+        # List of objects
+        for item in data:
+            _parse_json_item(item, file_path.name, primary_label, parsed)
+    elif isinstance(data, dict):
+        # Single object or complex structure
+        # For simplicity, we'll create a node for the top-level object
+        parsed.add_node(primary_label, data)
+        _parse_nested_dict(data, file_path.name, primary_label, parsed)
+
+def _should_stream_json(file_path: Path) -> bool:
+    """Whether `file_path` is a JSON array large enough to be worth streaming."""
+    if ijson is None or file_path.stat().st_size < JSON_STREAM_MIN_BYTES:
+        return False
+    with open(file_path, 'rb') as f:
+        head = f.read(4096).lstrip(b"\xef\xbb\xbf \t\r\n")
+    return head.startswith(b"[")
+
+def _iter_parse_json_stream(file_path: Path) -> Iterator[ParsedFile]:
+    """Stream the items of a top-level JSON array, CSV_CHUNK_ROWS items per part."""
+    primary_label = file_path.stem.capitalize()
+    logger.info(f"Streaming large JSON array from {file_path}")
+    with open(file_path, 'rb') as f:
+        items = ijson.items(f, "item", use_float=True)
+        while True:
+            batch = list(islice(items, CSV_CHUNK_ROWS))
+            if not batch:
+                return
+            parsed = ParsedFile()
+            for item in batch:
+                _parse_json_item(item, file_path.name, primary_label, parsed)
+            yield parsed
+
+def _parse_json_item(item: Any, source: str, label: str, parsed: ParsedFile):
+    """Add one element of a top-level JSON array as a node plus its long text fields."""
+    if not isinstance(item, dict):
+        return
+    parsed.add_node(label, item)
+
+    # Process text fields for vector embedding
+    for key, value in item.items():
+        if isinstance(value, str) and len(value) > TEXT_MIN_LENGTH:
+            parsed.add_text(
+                value,
+                metadata={
+                    "source": source,
+                    "node_label": label,
+                    "node_properties": {k: v for k, v in item.items() if k != key}
+                }
+            )
+
+def _nested_entries(node: Dict[str, Any]) -> Iterator[Tuple[str, Any, Optional[int]]]:
+    """Yield (key, value, None) per field of a dict, and (key, item, index) per list element."""
+    for key, value in node.items():
+        if isinstance(value, list):
+            for i, item in enumerate(value):
+                yield key, item, i
+        else:
+            yield key, value, None
+
+def _parse_nested_dict(data: Dict[str, Any], source: str, parent_label: str, parsed: ParsedFile):
+    """Collect child nodes and text fields of a nested dictionary.
+
+    The tree is walked with an explicit stack instead of recursion, so deep documents
+    cost no Python frames. Each stack entry iterates one dict's fields lazily and a
+    child dict is entered as soon as it is reached, so nodes and texts come out in
+    the same depth-first order as a recursive walk. A node's inherited properties
+    only ever hold the label of its parent, so each level gets a fresh
+    ``{"parent": ...}`` dict rather than a copy of its ancestors' properties.
+
+    Args:
+        data: Dictionary to process
+        source: Source file name
+        parent_label: Label of the top-level node
+        parsed: Result being filled in
+    """
+    stack = deque([(_nested_entries(data), parent_label, {})])
+    while stack:
+        entries, label, parent_props = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+
+        key, value, index = entry
+        if isinstance(value, dict):
+            child_label = f"{label}{key.capitalize()}"
+            parsed.add_node(child_label, value if index is None else {**value, "index": index})
+            stack.append((_nested_entries(value), child_label, {"parent": label}))
+        elif isinstance(value, str) and len(value) > TEXT_MIN_LENGTH:
+            # Process text fields (and long strings in lists) for vector embedding
+            parsed.add_text(
+                value,
+                metadata={
+                    "source": source,
+                    "node_label": label,
+                    "node_properties": {**parent_props, key: "[TEXT]" if index is None else f"[LIST_ITEM_{index}]"},
+                    "field_name": key if index is None else f"{key}[{index}]"
+                }
+            )
+
+def _parse_text(file_path: Path, parsed: ParsedFile):
+    """Parse a plain text, Markdown or HTML file as a single text field."""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    parsed.add_text(content, {
+        "source": file_path.name,
+        "file_path": str(file_path),
+        "file_type": file_path.suffix.lower()[1:]
+    })
+
+def _iter_parse_text_windows(file_path: Path) -> Iterator[ParsedFile]:
+    """Parse a large text file as windows of about TEXT_WINDOW_BYTES each.
+
+    The file is memory-mapped and cut at the first paragraph break (blank line) after
+    each window boundary, falling back to a line break, so only one window is decoded
+    at a time and chunks never straddle two windows mid-paragraph.
+    """
+    metadata = {
+        "source": file_path.name,
+        "file_path": str(file_path),
+        "file_type": file_path.suffix.lower()[1:]
+    }
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm)
+        start = 0
+        while start < size:
+            end = min(start + TEXT_WINDOW_BYTES, size)
+            if end < size:
+                # Both separators are ASCII, so cutting after them keeps UTF-8 sequences whole
+                cut = mm.find(b"\n\n", end)
+                if cut == -1:
+                    cut = mm.find(b"\n", end)
+                end = size if cut == -1 else cut + 1
+
+            content = mm[start:end].decode('utf-8')
+            start = end
+            if not content.strip():
+                continue
+            parsed = ParsedFile()
+            parsed.add_text(content, dict(metadata))
+            yield parsed
+
+@lru_cache(maxsize=None)
+def _preprocessor(chunk_size: int, chunk_overlap: int) -> DocumentPreprocessor:
+    """One preprocessor per chunking configuration and process."""
+    return DocumentPreprocessor(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+def iter_preprocess_file(file_path: str, chunk_size: int, chunk_overlap: int) -> Iterator[Dict[str, List]]:
+    """Parse a supported file part by part and chunk the text fields of each part.
+
+    Args:
+        file_path: Path to the file
+        chunk_size: Maximum size of text chunks in characters
+        chunk_overlap: Overlap between chunks in characters
+
+    Yields:
+        Dictionaries with "nodes" as (label, properties) pairs and "chunks" ready for embedding
+    """
+    preprocessor = _preprocessor(chunk_size, chunk_overlap)
+    for parsed in iter_parse_file(Path(file_path)):
+        chunks = []
+        for text, metadata in parsed.texts:
+            chunks.extend(preprocessor.preprocess(text, metadata))
+        yield {"nodes": parsed.nodes, "chunks": chunks}
+
+def preprocess_file(file_path: str, chunk_size: int, chunk_overlap: int) -> Optional[Dict[str, List]]:
+    """Parse a file and chunk its text fields (picklable entry point for worker processes).
+
+    Args:
+        file_path: Path to the file
+        chunk_size: Maximum size of text chunks in characters
+        chunk_overlap: Overlap between chunks in characters
+
+    Returns:
+        Dictionary with "nodes" as (label, properties) pairs and "chunks" ready for
+        embedding, or None if the file type is not supported
+    """
+    if not is_supported(Path(file_path)):
+        return None
+
+    result = {"nodes": [], "chunks": []}
+    for part in iter_preprocess_file(file_path, chunk_size, chunk_overlap):
+        result["nodes"].extend(part["nodes"])
+        result["chunks"].extend(part["chunks"])
+    return result
@@ -1,19 +1,21 @@
 import logging
 import argparse
+import multiprocessing
 import os
-import json
-import csv
-import pandas as pd
-from typing import Dict, List, Any, Optional, Union
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Any, Optional
 from pathlib import Path
-import nltk
-nltk.download('punkt', quiet=True)
 
 from .preprocessor import document_preprocessor
-from .embedding import embedding_generator
-from database.neo4j_driver import neo4j_driver
+from .file_parser import is_supported, iter_preprocess_file, preprocess_file
 from utils.monitoring import monitoring
 from utils.error_handler import error_handler
+from logging_config import configure_logging
+from config import INGEST_WORKERS
+
+# Number of buffered chunks (across documents) encoded and stored together
+EMBEDDING_BUFFER_SIZE = 256
 
 class DataIngestion:
     """Main data ingestion script for the GraphRAG system.
@@ -24,10 +26,19 @@ class DataIngestion:
     
     def __init__(self):
         """Initialize the DataIngestion component."""
+        # Imported on construction, so importing this module (e.g. from a spawned
+        # ingestion worker) neither loads the embedding model nor connects to Neo4j
+        from .embedding import embedding_generator
+        from database.neo4j_driver import neo4j_driver
+        
         self.logger = logging.getLogger(__name__)
         self.preprocessor = document_preprocessor
         self.embedding_generator = embedding_generator
         self.db_driver = neo4j_driver
+        # Preprocessed chunks waiting to be embedded and stored
+        self._chunk_buffer: List[Dict[str, Any]] = []
+        # Node creation statement per label, formatted once
+        self._create_query_cache: Dict[str, str] = {}
         
     def clear_existing_data(self):
         """Clear existing data from the Neo4j database.
@@ -35,12 +46,14 @@ class DataIngestion:
         This method removes all document nodes and their associated embeddings.
         """
         try:
-            # Delete all document nodes and their relationships
+            # Delete all document nodes and their relationships, committing every
+            # 1000 rows instead of building one huge transaction
             cypher_query = """
-            MATCH (d:Document) 
-            DETACH DELETE d
+            MATCH (d:Document)
+            CALL { WITH d DETACH DELETE d } IN TRANSACTIONS OF 1000 ROWS
             """
             self.db_driver.execute_query(cypher_query)
+            self._invalidate_vector_cache()
             
             self.logger.info("Cleared existing document data from the database")
             return True
@@ -65,284 +78,166 @@ class DataIngestion:
             self._process_directory(data_path, file_type)
         else:
             raise ValueError(f"Data path does not exist: {data_path}")
+        
+        # Embed and store whatever is left in the chunk buffer
+        self._flush_embeddings(force=True)
+        
+        hits, misses = self.embedding_generator.cache_hits, self.embedding_generator.cache_misses
+        monitoring.log_activity("embedding_cache", {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0
+        })
     
-    def _process_directory(self, directory: Path, file_type: Optional[str] = None):
-        """Process all files in a directory.
+    def _collect_files(self, directory: Path, file_type: Optional[str] = None) -> List[Path]:
+        """List the files to ingest under a directory, recursing into subdirectories.
         
         Args:
             directory: Path to the directory
             file_type: Optional file type to filter by
+            
+        Returns:
+            Paths of the matching files
         """
-        self.logger.info(f"Processing directory: {directory}")
-        
+        files = []
         for file_path in directory.iterdir():
             if file_path.is_file():
                 if file_type and file_path.suffix.lower() != f".{file_type.lower()}":
                     continue
-                self._process_file(file_path)
+                files.append(file_path)
             elif file_path.is_dir():
                 # Recursively process subdirectories
-                self._process_directory(file_path, file_type)
-    
-    def _process_file(self, file_path: Path):
-        """Process a single file based on its type.
-        
-        Args:
-            file_path: Path to the file
-        """
-        self.logger.info(f"Processing file: {file_path}")
-        
-        file_extension = file_path.suffix.lower()
-        
-        try:
-            if file_extension == ".csv":
-                self._process_csv(file_path)
-            elif file_extension == ".json":
-                self._process_json(file_path)
-            elif file_extension in [".txt", ".md", ".html"]:
-                self._process_text(file_path)
-            else:
-                self.logger.warning(f"Unsupported file type: {file_extension}")
-        except Exception as e:
-            self.logger.error(f"Error processing file {file_path}: {str(e)}")
-            # Continue with other files instead of raising
-    
-    def _process_csv(self, file_path: Path):
-        """Process a CSV file.
-        
-        Args:
-            file_path: Path to the CSV file
-        """
-        try:
-            # Read CSV file
-            df = pd.read_csv(file_path)
-            
-            # Get column names
-            columns = df.columns.tolist()
-            
-            # Determine node labels and relationship structure based on the CSV structure
-            # This is a simplified approach - in a real system, you might want to provide a mapping configuration
-            primary_label = file_path.stem.capitalize()
-            
-            # Process each row
-            for _, row in df.iterrows():
-                # Convert row to dictionary
-                properties = row.to_dict()
-                
-                # Create node in Neo4j
-                self._create_graph_node(primary_label, properties)
-                
-                # Check if any columns contain text that should be vectorized
-                for col in columns:
-                    if isinstance(properties.get(col), str) and len(properties.get(col, "")) > 100:
-                        # This column contains substantial text, process it for vector embedding
-                        self._process_text_content(
-                            properties.get(col),
-                            metadata={
-                                "source": file_path.name,
-                                "node_label": primary_label,
-                                "node_properties": {k: v for k, v in properties.items() if k != col}
-                            }
-                        )
-        except Exception as e:
-            self.logger.error(f"Error processing CSV file {file_path}: {str(e)}")
-            raise
+                files.extend(self._collect_files(file_path, file_type))
+        return files
     
-    def _process_json(self, file_path: Path):
-        """Process a JSON file.
+    def _process_directory(self, directory: Path, file_type: Optional[str] = None):
+        """Process all files in a directory.
         
-        Args:
-            file_path: Path to the JSON file
-        """
-        try:
-            # Read JSON file
-            with open(file_path, 'r') as f:
-                data = json.load(f)
-            
-            # Handle different JSON structures
-            if isinstance(data, list):
-                # List of objects
-                primary_label = file_path.stem.capitalize()
-                
-                for item in data:
-                    if isinstance(item, dict):
-                        # Create node in Neo4j
-                        self._create_graph_node(primary_label, item)
-                        
-                        # Process text fields for vector embedding
-                        for key, value in item.items():
-                            if isinstance(value, str) and len(value) > 100:
-                                self._process_text_content(
-                                    value,
-                                    metadata={
-                                        "source": file_path.name,
-                                        "node_label": primary_label,
-                                        "node_properties": {k: v for k, v in item.items() if k != key}
-                                    }
-                                )
-            elif isinstance(data, dict):
-                # Single object or complex structure
-                # For simplicity, we'll create a node for the top-level object
-                primary_label = file_path.stem.capitalize()
-                self._create_graph_node(primary_label, data)
-                
-                # Process text fields for vector embedding
-                self._process_nested_dict(data, file_path.name, primary_label)
-        except Exception as e:
-            self.logger.error(f"Error processing JSON file {file_path}: {str(e)}")
-            raise
-    
-    def _process_nested_dict(self, data: Dict[str, Any], source: str, parent_label: str, parent_props: Dict[str, Any] = None):
-        """Process a nested dictionary for text fields.
+        Files are parsed and chunked in worker processes while the main process embeds
+        and writes the results of the files that have already finished.
         
         Args:
-            data: Dictionary to process
-            source: Source file name
-            parent_label: Label of the parent node
-            parent_props: Properties of the parent node
+            directory: Path to the directory
+            file_type: Optional file type to filter by
         """
-        if parent_props is None:
-            parent_props = {}
+        self.logger.info(f"Processing directory: {directory}")
         
-        for key, value in data.items():
-            if isinstance(value, str) and len(value) > 100:
-                # Process text for vector embedding
-                self._process_text_content(
-                    value,
-                    metadata={
-                        "source": source,
-                        "node_label": parent_label,
-                        "node_properties": {**parent_props, key: "[TEXT]"},
-                        "field_name": key
-                    }
-                )
-            elif isinstance(value, dict):
-                # Recursively process nested dictionaries
-                child_label = f"{parent_label}{key.capitalize()}"
-                self._create_graph_node(child_label, value)
-                self._process_nested_dict(value, source, child_label, {**parent_props, "parent": parent_label})
-            elif isinstance(value, list):
-                # Process list items
-                for i, item in enumerate(value):
-                    if isinstance(item, dict):
-                        child_label = f"{parent_label}{key.capitalize()}"
-                        self._create_graph_node(child_label, {**item, "index": i})
-                        self._process_nested_dict(item, source, child_label, {**parent_props, "parent": parent_label})
-                    elif isinstance(item, str) and len(item) > 100:
-                        # Process text for vector embedding
-                        self._process_text_content(
-                            item,
-                            metadata={
-                                "source": source,
-                                "node_label": parent_label,
-                                "node_properties": {**parent_props, key: f"[LIST_ITEM_{i}]"},
-                                "field_name": f"{key}[{i}]"
-                            }
-                        )
-    
-    def _process_text(self, file_path: Path):
-        """Process a text file.
+        files = self._collect_files(directory, file_type)
+        workers = min(len(files), INGEST_WORKERS or os.cpu_count() or 1)
+        if workers <= 1:
+            for file_path in files:
+                self._process_file(file_path)
+            return
         
-        Args:
-            file_path: Path to the text file
-        """
-        try:
-            # Read text file
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Create metadata
-            metadata = {
-                "source": file_path.name,
-                "file_path": str(file_path),
-                "file_type": file_path.suffix.lower()[1:]
+        # Spawned (not forked) workers only import the parsing modules, never the
+        # embedding model or the Neo4j driver held by this process
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = {
+                executor.submit(preprocess_file, str(file_path), self.preprocessor.chunk_size, self.preprocessor.chunk_overlap): file_path
+                for file_path in files
             }
-            
-            # Process text content
-            self._process_text_content(content, metadata)
-        except Exception as e:
-            self.logger.error(f"Error processing text file {file_path}: {str(e)}")
-            raise
+            for future in as_completed(futures):
+                file_path = futures[future]
+                try:
+                    self._store_parsed(file_path, future.result())
+                except Exception as e:
+                    self.logger.error(f"Error processing file {file_path}: {str(e)}")
+                    # Continue with other files instead of raising
     
-    def _process_text_content(self, text: str, metadata: Dict[str, Any]):
-        """Process text content for vector embedding.
+    def _process_file(self, file_path: Path):
+        """Process a single file based on its type.
         
         Args:
-            text: Text content to process
-            metadata: Metadata to associate with the text
+            file_path: Path to the file
         """
-        # Preprocess the text into chunks
-        chunks = self.preprocessor.preprocess(text, metadata)
-        
-        # Generate embeddings for the chunks
-        chunks_with_embeddings = self.embedding_generator.process_chunks(chunks)
+        self.logger.info(f"Processing file: {file_path}")
         
-        # Store the chunks and embeddings in Neo4j
-        for chunk in chunks_with_embeddings:
-            self._store_document_with_embedding(chunk)
+        try:
+            if not is_supported(file_path):
+                self._store_parsed(file_path, None)
+                return
+            # Store part by part so large CSV files are never held in memory at once
+            for parsed in iter_preprocess_file(str(file_path), self.preprocessor.chunk_size, self.preprocessor.chunk_overlap):
+                self._store_parsed(file_path, parsed)
+        except Exception as e:
+            self.logger.error(f"Error processing file {file_path}: {str(e)}")
+            # Continue with other files instead of raising
     
-    def _create_graph_node(self, label: str, properties: Dict[str, Any]):
-        """Create a node in the Neo4j graph database.
+    def _store_parsed(self, file_path: Path, parsed: Optional[Dict[str, List]]):
+        """Write the graph nodes of a parsed file and queue its chunks for embedding.
         
         Args:
-            label: Node label
-            properties: Node properties
-        """
-        # Clean properties (remove None values and non-primitive types)
-        cleaned_props = {}
-        for key, value in properties.items():
-            if value is not None and isinstance(value, (str, int, float, bool, list)):
-                if isinstance(value, list) and all(isinstance(item, (str, int, float, bool)) for item in value):
-                    cleaned_props[key] = value
-                elif not isinstance(value, list):
-                    cleaned_props[key] = value
-        
-        # Create Cypher query
-        query = f"""
-        CREATE (n:{label} $properties)
-        RETURN n
+            file_path: Path of the source file
+            parsed: Result of preprocess_file, or None for unsupported file types
         """
+        if parsed is None:
+            self.logger.warning(f"Unsupported file type: {file_path.suffix.lower()}")
+            return
         
-        params = {"properties": cleaned_props}
+        # Create the nodes with one batched UNWIND write per label
+        rows_by_label: Dict[str, List[Dict[str, Any]]] = {}
+        for label, properties in parsed["nodes"]:
+            rows_by_label.setdefault(label, []).append(properties)
+        for label, rows in rows_by_label.items():
+            query = self._create_query_cache.get(label)
+            if query is None:
+                query = self._create_query_cache[label] = f"UNWIND $rows AS row CREATE (n:{label}) SET n = row"
+            self.db_driver.execute_batch(query, rows)
+            self.logger.info(f"Created {len(rows)} {label} nodes from {file_path.name}")
         
-        try:
-            self.db_driver.execute_query(query, params)
-            self.logger.info(f"Created {label} node with properties: {cleaned_props}")
-        except Exception as e:
-            self.logger.error(f"Error creating graph node: {str(e)}")
-            raise
+        # Embeddings are generated for several documents at once so the model always sees full batches
+        self._chunk_buffer.extend(parsed["chunks"])
+        self._flush_embeddings()
     
-    def _store_document_with_embedding(self, chunk: Dict[str, Any]):
-        """Store a document chunk with its embedding in Neo4j.
+    def _flush_embeddings(self, force: bool = False):
+        """Embed and store the buffered chunks once enough have accumulated.
         
         Args:
-            chunk: Document chunk with text, embedding, and metadata
+            force: Flush regardless of how many chunks are buffered
         """
-        # Extract data from chunk
-        text = chunk["text"]
-        embedding = chunk["embedding"]
-        metadata = chunk.get("metadata", {})
-        chunk_id = chunk.get("chunk_id", 0)
-        total_chunks = chunk.get("total_chunks", 1)
+        if not self._chunk_buffer or (not force and len(self._chunk_buffer) < EMBEDDING_BUFFER_SIZE):
+            return
         
-        # Prepare properties
-        properties = {
-            "text": text,
-            "chunk_id": chunk_id,
-            "total_chunks": total_chunks,
-            **metadata
-        }
+        chunks, self._chunk_buffer = self._chunk_buffer, []
+        embeddings = self.embedding_generator.generate_embeddings([chunk["text"] for chunk in chunks])
         
-        # Store in Neo4j with vector embedding
+        # Flatten the metadata into the chunk itself, which then serves as the node properties
+        for chunk in chunks:
+            metadata = chunk.pop("metadata", None)
+            if metadata:
+                chunk.update(metadata)
         try:
-            self.db_driver.store_vector_embedding("Document", properties, embedding)
-            self.logger.info(f"Stored document chunk {chunk_id+1}/{total_chunks} with embedding")
+            self.db_driver.store_vector_embeddings("Document", chunks, embeddings)
+            self._invalidate_vector_cache()
+            self.logger.info(f"Stored {len(chunks)} document chunks with embeddings")
         except Exception as e:
-            self.logger.error(f"Error storing document with embedding: {str(e)}")
+            self.logger.error(f"Error storing documents with embeddings: {str(e)}")
             raise
 
-# Create a singleton instance
-data_ingestion = DataIngestion()
+    def _invalidate_vector_cache(self):
+        """Forget cached vector search results once the set of documents has changed."""
+        query_cache = self.db_driver.vector_search.query_cache
+        if query_cache is not None:
+            query_cache.clear()
+
+# The singleton is created on first use rather than at import
+_instance: Optional[DataIngestion] = None
+_instance_lock = threading.Lock()
+
+def get_data_ingestion() -> DataIngestion:
+    """Return the shared DataIngestion, creating it on first use."""
+    global _instance
+    if _instance is None:
+        with _instance_lock:
+            if _instance is None:
+                _instance = DataIngestion()
+    return _instance
+
+def __getattr__(name):
+    # PEP 562: `from data_ingestion.ingest import data_ingestion` keeps working
+    if name == "data_ingestion":
+        return get_data_ingestion()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Command-line interface
 def main():
@@ -352,13 +247,10 @@ def main():
     args = parser.parse_args()
     
     # Configure logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
+    configure_logging()
     
     # Run ingestion
-    data_ingestion.ingest_data(args.data_path, args.file_type)
+    get_data_ingestion().ingest_data(args.data_path, args.file_type)
     
     print(f"Data ingestion completed for {args.data_path}")
 
@@ -0,0 +1,96 @@
+import logging
+import os
+from pathlib import Path
+from typing import List, Union
+import numpy as np
+
+class OnnxEncoder:
+    """INT8-quantized ONNX Runtime replacement for SentenceTransformer.encode.
+
+    The model is exported to ONNX and dynamically quantized once, then loaded
+    from `cache_dir` on later runs. Embeddings are mean-pooled over the attention
+    mask, which matches the pooling of the sentence-transformers MiniLM/MPNet
+    checkpoints this project uses.
+    """
+
+    def __init__(self, model_name: str, cache_dir: str, max_length: int = 512):
+        """Initialize the OnnxEncoder.
+
+        Args:
+            model_name: Name of the Hugging Face / sentence-transformers model
+            cache_dir: Directory holding exported models, one subdirectory per model
+            max_length: Maximum number of tokens per text
+        """
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.logger = logging.getLogger(__name__)
+        model_dir = Path(cache_dir) / model_name.replace("/", "__")
+        model_path = model_dir / "model_quantized.onnx"
+        if not model_path.exists():
+            self._export(model_name, model_dir)
+
+        self.tokenizer = AutoTokenizer.from_pretrained(str(model_dir))
+        self.max_length = min(max_length, self.tokenizer.model_max_length)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = os.cpu_count() or 1
+        self.session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        self._input_names = {node.name for node in self.session.get_inputs()}
+
+    def _export(self, model_name: str, model_dir: Path):
+        """Export `model_name` to ONNX and write a dynamically quantized copy to `model_dir`."""
+        from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        from transformers import AutoTokenizer
+
+        self.logger.info(f"Exporting {model_name} to quantized ONNX in {model_dir}")
+        model = ORTModelForFeatureExtraction.from_pretrained(model_name, export=True)
+        model.save_pretrained(model_dir)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(model_dir)
+
+        quantizer = ORTQuantizer.from_pretrained(model)
+        quantizer.quantize(
+            save_dir=model_dir,
+            quantization_config=AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+        )
+
+    def encode(self, texts: Union[str, List[str]], batch_size: int = 32, convert_to_numpy: bool = True,
+               normalize_embeddings: bool = True, show_progress_bar: bool = False) -> np.ndarray:
+        """Encode texts the same way SentenceTransformer.encode does.
+
+        Args:
+            texts: A single text or a list of texts
+            batch_size: Number of texts per inference call
+            convert_to_numpy: Accepted for API compatibility; output is always an ndarray
+            normalize_embeddings: Whether to L2-normalize the embeddings
+            show_progress_bar: Accepted for API compatibility; ignored
+
+        Returns:
+            Array of shape (dim,) for a single text or (N, dim) for a list
+        """
+        single = isinstance(texts, str)
+        batch = [texts] if single else list(texts)
+
+        parts = []
+        for start in range(0, len(batch), batch_size):
+            inputs = self.tokenizer(
+                batch[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np"
+            )
+            feeds = {name: value.astype(np.int64) for name, value in inputs.items() if name in self._input_names}
+            hidden = self.session.run(None, feeds)[0]
+
+            # Mean pooling over the non-padding tokens
+            mask = inputs["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            parts.append(pooled.astype(np.float32, copy=False))
+
+        embeddings = np.concatenate(parts) if parts else np.empty((0, 0), dtype=np.float32)
+        if normalize_embeddings and len(embeddings):
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings[0] if single else embeddings
@@ -1,9 +1,32 @@
 import logging
 from typing import List, Dict, Any, Union, Optional
 import re
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import accumulate
 import nltk
 from nltk.tokenize import sent_tokenize
 
+try:
+    # Compiled FST sentence splitter, much faster than NLTK Punkt on long documents
+    from blingfire import text_to_sentences
+except ImportError:  # blingfire is optional; fall back to NLTK
+    text_to_sentences = None
+
+_WHITESPACE_RE = re.compile(r'\s+')
+# Characters that might interfere with processing
+_DISALLOWED_RE = re.compile(r'[^\w\s.,;:!?\-\'\"\(\)\[\]{}]')
+# str.translate table deleting the same characters from pure-ASCII text, without the regex engine
+_ASCII_DELETE = str.maketrans({chr(c): None for c in range(128) if _DISALLOWED_RE.match(chr(c))})
+
+@lru_cache(maxsize=None)
+def _ensure_punkt():
+    """Download the NLTK Punkt model on first use; checked once per process."""
+    try:
+        nltk.data.find('tokenizers/punkt')
+    except LookupError:
+        nltk.download('punkt', quiet=True)
+
 class DocumentPreprocessor:
     """Preprocesses documents for embedding generation.
     
@@ -21,12 +44,22 @@ class DocumentPreprocessor:
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
         self.logger = logging.getLogger(__name__)
+    
+    def configure(self, chunk_size: int, chunk_overlap: int) -> bool:
+        """Update the chunking parameters.
         
-        # Download NLTK resources if needed
-        try:
-            nltk.data.find('tokenizers/punkt')
-        except LookupError:
-            nltk.download('punkt')
+        Args:
+            chunk_size: Maximum size of text chunks in characters
+            chunk_overlap: Overlap between chunks in characters
+            
+        Returns:
+            True if any parameter changed, False if they were already applied
+        """
+        if (chunk_size, chunk_overlap) == (self.chunk_size, self.chunk_overlap):
+            return False
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        return True
     
     def preprocess(self, text: str, metadata: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """Preprocess a text document into chunks suitable for embedding.
@@ -71,17 +104,31 @@ class DocumentPreprocessor:
         Returns:
             Cleaned text
         """
-        # Replace multiple newlines with a single newline
-        text = re.sub(r'\n+', '\n', text)
-        
-        # Replace multiple spaces with a single space
-        text = re.sub(r'\s+', ' ', text)
+        # Collapse all whitespace (including newlines) to single spaces
+        text = _WHITESPACE_RE.sub(' ', text)
         
         # Remove special characters that might interfere with processing
-        text = re.sub(r'[^\w\s.,;:!?\-\'\"\(\)\[\]{}]', '', text)
+        if text.isascii():
+            text = text.translate(_ASCII_DELETE)
+        else:
+            text = _DISALLOWED_RE.sub('', text)
         
         return text.strip()
     
+    def _split_sentences(self, text: str) -> List[str]:
+        """Split text into sentences with blingfire, or NLTK Punkt if it is not installed.
+        
+        Args:
+            text: The text to split
+            
+        Returns:
+            List of non-empty sentences
+        """
+        if text_to_sentences is not None:
+            return [sentence for sentence in text_to_sentences(text).split("\n") if sentence]
+        _ensure_punkt()
+        return sent_tokenize(text)
+    
     def _chunk_text(self, text: str) -> List[str]:
         """Split text into overlapping chunks of specified size.
         
@@ -92,35 +139,32 @@ class DocumentPreprocessor:
             List of text chunks
         """
         # First split by sentences to avoid cutting in the middle of a sentence
-        sentences = sent_tokenize(text)
-        
-        chunks = []
-        current_chunk = ""
+        sentences = self._split_sentences(text)
+        if not sentences:
+            return []
         
-        for sentence in sentences:
-            # If adding this sentence would exceed the chunk size, save the current chunk and start a new one
-            if len(current_chunk) + len(sentence) > self.chunk_size:
-                if current_chunk:  # Only append if not empty
-                    chunks.append(current_chunk.strip())
-                
-                # Start a new chunk with overlap from the previous chunk if possible
-                if self.chunk_overlap > 0 and current_chunk:
-                    # Get the last few characters from the previous chunk for overlap
-                    words = current_chunk.split()
-                    overlap_text = " ".join(words[-min(len(words), self.chunk_overlap//5):])  # Approximate word count
-                    current_chunk = overlap_text + " " + sentence
-                else:
-                    current_chunk = sentence
-            else:
-                # Add the sentence to the current chunk
-                if current_chunk:
-                    current_chunk += " " + sentence
-                else:
-                    current_chunk = sentence
+        # ends[i] is the length of the first i sentences, each followed by a space, so
+        # len(" ".join(sentences[a:b])) == ends[b] - ends[a] - 1
+        ends = [0, *accumulate(len(sentence) + 1 for sentence in sentences)]
+        # Overlap is carried over as whole words (about five characters per word)
+        overlap_words = max(1, self.chunk_overlap // 5) if self.chunk_overlap > 0 else 0
         
-        # Add the last chunk if it's not empty
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
+        chunks = []
+        overlap_text = ""
+        start = 0
+        while start < len(sentences):
+            # Greedily take the sentences that fit after the overlap; the first one always does
+            prefix = len(overlap_text) + 1 if overlap_text else 0
+            limit = self.chunk_size + ends[start] + 2 - prefix
+            end = max(start + 1, bisect_right(ends, limit) - 1)
+            
+            body = " ".join(sentences[start:end])
+            chunk = f"{overlap_text} {body}" if overlap_text else body
+            chunks.append(chunk.strip())
+            
+            if overlap_words:
+                overlap_text = " ".join(chunk.rsplit(None, overlap_words)[-overlap_words:])
+            start = end
         
         return chunks
 
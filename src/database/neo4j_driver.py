@@ -1,16 +1,89 @@
 from neo4j import GraphDatabase
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Sequence
+import json
 import logging
+import re
+import threading
+import time
+import weakref
+import numpy as np
 from config import (
     NEO4J_URI, 
     NEO4J_USERNAME, 
     NEO4J_PASSWORD, 
+    NEO4J_DATABASE,
+    NEO4J_MAX_CONNECTION_POOL_SIZE,
+    NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
+    NEO4J_MAX_CONNECTION_LIFETIME,
+    NEO4J_SCHEMA_CACHE_TTL,
     EMBEDDING_DIMENSION, 
+    EMBEDDING_STORE_INT8,
     VECTOR_INDEX_NAME, 
     VECTOR_NODE_LABEL, 
     VECTOR_PROPERTY
 )
-from database.vector_search import VectorSearch  # Changed from relative to absolute
+from database.vector_search import VectorSearch, as_vector_param  # Changed from relative to absolute
+
+# Queries matching this are run in write transactions; everything else in read transactions
+_WRITE_QUERY_RE = re.compile(
+    r"\b(CREATE|MERGE|DELETE|SET|REMOVE|DROP|FOREACH|LOAD\s+CSV)\b"
+    r"|\bCALL\s+(?!db\.(?:index\.vector\.queryNodes|schema\.|labels|relationshipTypes|propertyKeys|awaitIndexes)\b|dbms\.components\b)",
+    re.IGNORECASE
+)
+# CALL { ... } IN TRANSACTIONS is only allowed in auto-commit transactions
+_AUTO_COMMIT_RE = re.compile(r"\bIN\s+TRANSACTIONS\b", re.IGNORECASE)
+
+# Node labels and relationship types with their properties. Each subquery aggregates
+# without grouping keys, so it returns one row (possibly an empty list) even when the
+# database has no nodes or no relationships.
+_SCHEMA_QUERY = """
+CALL {
+    CALL db.schema.nodeTypeProperties() YIELD nodeType, propertyName
+    WITH nodeType, collect(propertyName) AS properties
+    RETURN collect([nodeType, properties]) AS nodes
+}
+CALL {
+    CALL db.schema.relTypeProperties() YIELD relType, propertyName
+    WITH relType, collect(propertyName) AS properties
+    RETURN collect([relType, properties]) AS relationships
+}
+RETURN nodes, relationships
+"""
+
+def quantize_embeddings(embeddings: Sequence[Sequence[float]]):
+    """Quantize embeddings to int8 with a symmetric per-vector scale.
+    
+    ``embedding ~= q8 * scale``; cosine similarity is unaffected by the scale.
+    
+    Args:
+        embeddings: 2-D array-like of float embeddings
+        
+    Returns:
+        Tuple of (int8 values as lists of ints, scales as a list of floats)
+    """
+    arr = np.asarray(embeddings, dtype=np.float32)
+    scales = np.abs(arr).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    q8 = np.rint(arr / scales[:, None]).astype(np.int8)
+    return q8.tolist(), scales.tolist()
+
+def _sanitize_props(props: Dict[str, Any]) -> Dict[str, Any]:
+    """Serialize nested dictionaries (also inside lists) to JSON strings so Neo4j can store them."""
+    sanitized = {}
+    for k, v in props.items():
+        if isinstance(v, dict):
+            sanitized[k] = json.dumps(v)
+        elif isinstance(v, list):
+            sanitized_list = []
+            for item in v:
+                if isinstance(item, dict):
+                    sanitized_list.append(json.dumps(item))
+                else:
+                    sanitized_list.append(item)
+            sanitized[k] = sanitized_list
+        else:
+            sanitized[k] = v
+    return sanitized
 
 class Neo4jDriver:
     """Neo4j database driver for interacting with the Neo4j graph database.
@@ -26,18 +99,71 @@ class Neo4jDriver:
         self.password = NEO4J_PASSWORD
         self.driver = None
         self.logger = logging.getLogger(__name__)
+        # One long-lived session per thread (sessions are not thread-safe, the driver is)
+        self._local = threading.local()
+        # Cached session per thread, so close() can reach them and the sessions of
+        # finished threads (e.g. Streamlit's per-rerun script threads) can be closed
+        self._sessions: Dict[threading.Thread, Any] = {}
+        self._sessions_lock = threading.Lock()
+        # Cypher text of the embedding store statements, per (label, batched)
+        self._store_queries: Dict[tuple, str] = {}
+        # (expiry time, schema) of the last get_schema_info result
+        self._schema_cache: Optional[tuple] = None
         self.connect()
         
         # Initialize vector search component
         self.vector_search = VectorSearch(self)
+        self.ensure_vector_index()
+    
+    def ensure_vector_index(self, node_label: str = VECTOR_NODE_LABEL, 
+                            property_name: str = VECTOR_PROPERTY,
+                            dimension: int = EMBEDDING_DIMENSION) -> bool:
+        """Create the vector index used by vector search unless it already exists.
+        
+        Safe to call repeatedly. Failures are logged rather than raised so the
+        application can still start against a database without vector index support.
+        
+        Args:
+            node_label: Label of nodes to index (default from config)
+            property_name: Name of the property containing embeddings (default from config)
+            dimension: Dimension of the embedding vectors (default from config)
+            
+        Returns:
+            True if the index exists or was created, False otherwise
+        """
+        if EMBEDDING_STORE_INT8:
+            # int8 embeddings are searched exhaustively, the index would stay empty
+            return False
+        index_name = f"{node_label}_{property_name}_index"
+        try:
+            existing = self.execute_query(
+                "SHOW INDEXES YIELD name WHERE name = $index_name RETURN name",
+                {"index_name": index_name}
+            )
+            if existing:
+                return True
+            return self.vector_search.create_vector_index(
+                node_label=node_label,
+                property_name=property_name,
+                dimension=dimension
+            )
+        except Exception as e:
+            self.logger.warning(f"Could not ensure vector index {index_name}: {str(e)}")
+            return False
     
     def connect(self):
         """Establish connection to the Neo4j database."""
         try:
             self.driver = GraphDatabase.driver(
                 self.uri, 
-                auth=(self.username, self.password)
+                auth=(self.username, self.password),
+                max_connection_pool_size=NEO4J_MAX_CONNECTION_POOL_SIZE,
+                connection_acquisition_timeout=NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
+                max_connection_lifetime=NEO4J_MAX_CONNECTION_LIFETIME
             )
+            # Close the Bolt pool if this instance is dropped without close(), e.g. when a
+            # Streamlit reload re-imports the module; closing twice is harmless
+            weakref.finalize(self, self.driver.close)
             # Verify connection
             self.driver.verify_connectivity()
             logging.info("Successfully connected to Neo4j database")
@@ -46,39 +172,131 @@ class Neo4jDriver:
             raise
     
     def close(self):
-        """Close the connection to the Neo4j database."""
+        """Close the cached sessions and the connection to the Neo4j database."""
+        with self._sessions_lock:
+            sessions, self._sessions = list(self._sessions.values()), {}
+        self._close_sessions(sessions)
+        self._local = threading.local()
         if self.driver:
             self.driver.close()
             logging.info("Neo4j database connection closed")
     
-    def execute_query(self, query: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    def session(self, **config):
+        """Open a session on the shared driver.
+        
+        Use as a context manager to run several queries over one pooled connection:
+        ``with neo4j_driver.session() as session: session.run(...)``.
+        
+        Args:
+            **config: Optional session configuration passed to the Neo4j driver
+            
+        Returns:
+            A Neo4j session
+        """
+        if not self.driver:
+            self.connect()
+        config.setdefault("database", NEO4J_DATABASE)
+        return self.driver.session(**config)
+    
+    @staticmethod
+    def _close_sessions(sessions):
+        for session in sessions:
+            try:
+                session.close()
+            except Exception:
+                pass
+    
+    def _get_session(self):
+        """Return this thread's cached session, opening it on first use.
+        
+        Opening one also closes the sessions left behind by threads that have exited.
+        """
+        session = getattr(self._local, "session", None)
+        if session is None or session.closed():
+            session = self.session()
+            self._local.session = session
+            with self._sessions_lock:
+                dead = [thread for thread in self._sessions if not thread.is_alive()]
+                orphaned = [self._sessions.pop(thread) for thread in dead]
+                self._sessions[threading.current_thread()] = session
+            # Safe from this thread: a session's owner is gone once its thread has exited
+            self._close_sessions(orphaned)
+        return session
+    
+    def execute_query(self, query: str, params: Optional[Dict[str, Any]] = None,
+                      write: Optional[bool] = None) -> List[Dict[str, Any]]:
         """Execute a Cypher query and return the results.
         
+        The query runs as a managed (retried) transaction on this thread's cached
+        session. Queries using CALL { ... } IN TRANSACTIONS run in auto-commit mode,
+        which they require.
+        
         Args:
             query: The Cypher query to execute
             params: Optional parameters for the query
+            write: Whether the query writes; detected from its clauses if None
             
         Returns:
             List of dictionaries containing the query results
         """
         if not self.driver:
             self.connect()
+        
+        def _run(tx):
+            return [record.data() for record in tx.run(query, params or {})]
             
         try:
-            with self.driver.session() as session:
-                result = session.run(query, params or {})
-                return [record.data() for record in result]
+            session = self._get_session()
+            if _AUTO_COMMIT_RE.search(query):
+                self._schema_cache = None
+                return [record.data() for record in session.run(query, params or {})]
+            if write is None:
+                write = bool(_WRITE_QUERY_RE.search(query))
+            if write:
+                self._schema_cache = None
+                return session.execute_write(_run)
+            return session.execute_read(_run)
         except Exception as e:
             logging.error(f"Error executing query: {str(e)}\nQuery: {query}\nParams: {params}")
             raise
     
-    def perform_vector_search(self, embedding: List[float], node_label: str = VECTOR_NODE_LABEL, 
+    def execute_batch(self, query: str, rows: List[Dict[str, Any]], batch_size: int = 1000) -> int:
+        """Execute a write query once per slice of rows, bound as the `$rows` parameter.
+        
+        The query is expected to ``UNWIND $rows AS ...``. All slices run on this thread's
+        cached session, and each slice is committed in its own write transaction.
+        
+        Args:
+            query: The Cypher query to execute
+            rows: List of row dictionaries
+            batch_size: Number of rows sent per transaction
+            
+        Returns:
+            Number of rows written
+        """
+        if not self.driver:
+            self.connect()
+        
+        def _write(tx, batch):
+            tx.run(query, rows=batch).consume()
+        
+        try:
+            session = self._get_session()
+            self._schema_cache = None
+            for start in range(0, len(rows), batch_size):
+                session.execute_write(_write, rows[start:start + batch_size])
+            return len(rows)
+        except Exception as e:
+            logging.error(f"Error executing batch query: {str(e)}\nQuery: {query}\nRows: {len(rows)}")
+            raise
+    
+    def perform_vector_search(self, embedding: Sequence[float], node_label: str = VECTOR_NODE_LABEL, 
                      property_name: str = VECTOR_PROPERTY, limit: int = 5, 
                      similarity_threshold: float = 0.5) -> List[Dict[str, Any]]:
         """Perform a vector similarity search in the Neo4j database.
         
         Args:
-            embedding: The query embedding vector
+            embedding: The query embedding vector, as a list of floats or a 1-D NumPy array
             node_label: Label of nodes to search (default from config)
             property_name: Name of the property containing embeddings (default from config)
             limit: Maximum number of results to return
@@ -99,77 +317,114 @@ class Neo4jDriver:
             self.logger.error(f"Error in vector search: {str(e)}")
             raise
     
-    def get_schema_info(self) -> Dict[str, Any]:
-        """Retrieve the database schema information.
+    def perform_vector_search_batch(self, embeddings: Sequence[Sequence[float]], node_label: str = VECTOR_NODE_LABEL, 
+                                    property_name: str = VECTOR_PROPERTY, limit: int = 5, 
+                                    similarity_threshold: float = 0.5) -> List[List[Dict[str, Any]]]:
+        """Perform several vector similarity searches in one database round trip.
         
+        Args:
+            embeddings: The query embedding vectors, as lists of floats or a 2-D NumPy array
+            node_label: Label of nodes to search (default from config)
+            property_name: Name of the property containing embeddings (default from config)
+            limit: Maximum number of results to return per query
+            similarity_threshold: Minimum similarity score to include in results
+            
         Returns:
-            Dictionary containing node labels, relationship types, and properties
-        """
-        # Query to get node labels and their properties
-        node_query = """
-        CALL db.schema.nodeTypeProperties() 
-        YIELD nodeType, propertyName
-        RETURN nodeType, collect(propertyName) AS properties
+            One list of dictionaries containing nodes and their similarity scores per query
         """
+        try:
+            return self.vector_search.search_batch(
+                embeddings=embeddings,
+                node_label=node_label,
+                property_name=property_name,
+                limit=limit,
+                similarity_threshold=similarity_threshold
+            )
+        except Exception as e:
+            self.logger.error(f"Error in batched vector search: {str(e)}")
+            raise
+    
+    def get_schema_info(self, refresh: bool = False) -> Dict[str, Any]:
+        """Retrieve the database schema information.
         
-        # Query to get relationship types and their properties
-        rel_query = """
-        CALL db.schema.relTypeProperties()
-        YIELD relType, propertyName
-        RETURN relType, collect(propertyName) AS properties
+        The result is reused for NEO4J_SCHEMA_CACHE_TTL seconds, and until the next
+        write through this driver, so it must not be modified by callers.
+        
+        Args:
+            refresh: Query the database even if a cached schema is available
+            
+        Returns:
+            Dictionary containing node labels, relationship types, and properties
         """
+        cached = self._schema_cache
+        if cached is not None and not refresh and cached[0] > time.monotonic():
+            return cached[1]
         
         try:
-            nodes = self.execute_query(node_query)
-            relationships = self.execute_query(rel_query)
+            # Node and relationship types in one round trip (write=False: the CALL
+            # subqueries only read)
+            record = self.execute_query(_SCHEMA_QUERY, write=False)[0]
             
-            return {
-                "nodes": {node["nodeType"]: node["properties"] for node in nodes},
-                "relationships": {rel["relType"]: rel["properties"] for rel in relationships}
+            schema_info = {
+                "nodes": dict(record["nodes"]),
+                "relationships": dict(record["relationships"])
             }
+            if NEO4J_SCHEMA_CACHE_TTL > 0:
+                self._schema_cache = (time.monotonic() + NEO4J_SCHEMA_CACHE_TTL, schema_info)
+            return schema_info
         except Exception as e:
             logging.error(f"Error retrieving schema info: {str(e)}")
             raise
     
-    def store_vector_embedding(self, node_label: str, properties: Dict[str, Any], embedding: List[float]):
+    def _embedding_store_query(self, node_label: str, batched: bool) -> str:
+        """Return the cached Cypher statement creating `node_label` nodes with embeddings.
+        
+        The statements return nothing, so the server only sends back an acknowledgement.
+        
+        Args:
+            node_label: The label for the nodes
+            batched: Whether the statement takes a list of rows ($rows) or one node
+            
+        Returns:
+            The Cypher query text
+        """
+        key = (node_label, batched)
+        query = self._store_queries.get(key)
+        if query is None:
+            if EMBEDDING_STORE_INT8:
+                fields = "n.embedding_q8 = {0}embedding_q8, n.embedding_scale = {0}embedding_scale"
+            else:
+                fields = "n.embedding = {0}embedding"
+            if batched:
+                query = f"UNWIND $rows AS row CREATE (n:{node_label}) SET n = row.properties, " + fields.format("row.")
+            else:
+                query = f"CREATE (n:{node_label}) SET n = $properties, " + fields.format("$")
+            self._store_queries[key] = query
+        return query
+    
+    def store_vector_embedding(self, node_label: str, properties: Dict[str, Any], embedding: Sequence[float]):
         """Store a vector embedding in the Neo4j database.
         
         Args:
             node_label: The label for the node
             properties: Dictionary of node properties
-            embedding: Vector embedding as a list of floats
+            embedding: Vector embedding as a list of floats or a NumPy row
         """
-        import json as pyjson
-
-        def sanitize_props(props):
-            sanitized = {}
-            for k, v in props.items():
-                if isinstance(v, dict):
-                    sanitized[k] = pyjson.dumps(v)
-                elif isinstance(v, list):
-                    sanitized_list = []
-                    for item in v:
-                        if isinstance(item, dict):
-                            sanitized_list.append(pyjson.dumps(item))
-                        else:
-                            sanitized_list.append(item)
-                    sanitized[k] = sanitized_list
-                else:
-                    sanitized[k] = v
-            return sanitized
-
-        sanitized_properties = sanitize_props(properties)
+        sanitized_properties = _sanitize_props(properties)
+        query = self._embedding_store_query(node_label, batched=False)
 
-        query = f"""
-        CREATE (n:{node_label} $properties)
-        SET n.embedding = $embedding
-        RETURN n
-        """
-        
-        params = {
-            "properties": sanitized_properties,
-            "embedding": embedding
-        }
+        if EMBEDDING_STORE_INT8:
+            q8, scales = quantize_embeddings([embedding])
+            params = {
+                "properties": sanitized_properties,
+                "embedding_q8": q8[0],
+                "embedding_scale": scales[0]
+            }
+        else:
+            params = {
+                "properties": sanitized_properties,
+                "embedding": as_vector_param(embedding)
+            }
         
         try:
             self.execute_query(query, params)
@@ -178,6 +433,38 @@ class Neo4jDriver:
             logging.error(f"Error storing vector embedding: {str(e)}")
             raise
     
+    def store_vector_embeddings(self, node_label: str, properties: List[Dict[str, Any]], embeddings: Sequence[Sequence[float]]) -> int:
+        """Store many nodes with vector embeddings using batched UNWIND writes.
+        
+        Args:
+            node_label: The label for the nodes
+            properties: Node properties, one dictionary per node
+            embeddings: Embedding per node, as lists of floats or a 2-D NumPy array
+            
+        Returns:
+            Number of nodes written
+        """
+        query = self._embedding_store_query(node_label, batched=True)
+        if EMBEDDING_STORE_INT8:
+            q8, scales = quantize_embeddings(embeddings)
+            rows = [
+                {"properties": _sanitize_props(props), "embedding_q8": values, "embedding_scale": scale}
+                for props, values, scale in zip(properties, q8, scales)
+            ]
+        else:
+            embeddings = as_vector_param(embeddings)
+            rows = [
+                {"properties": _sanitize_props(props), "embedding": embedding}
+                for props, embedding in zip(properties, embeddings)
+            ]
+        try:
+            written = self.execute_batch(query, rows)
+            logging.info(f"Stored {written} vector embeddings for {node_label} nodes")
+            return written
+        except Exception as e:
+            logging.error(f"Error storing vector embeddings: {str(e)}")
+            raise
+    
     # Note: The vector_search functionality has been moved to the VectorSearch class
     # and is now accessed through the perform_vector_search method
 
@@ -1,6 +1,126 @@
+import itertools
 import logging
-from typing import List, Dict, Any, Optional
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
 import numpy as np
+from cache.semantic_index import SemanticIndex
+from config import (
+    EMBEDDING_DIMENSION,
+    EMBEDDING_STORE_INT8,
+    VECTOR_QUERY_CACHE_SIZE,
+    VECTOR_QUERY_CACHE_THRESHOLD,
+    VECTOR_QUERY_CACHE_TTL,
+    VECTOR_SEARCH_OVERFETCH
+)
+
+# Parameter-only Cypher statements, kept as constants so the server reuses their plans
+_QUERY_NODES_CYPHER = """
+CALL db.index.vector.queryNodes($index_name, $k, $embedding)
+YIELD node, score
+RETURN node, score
+"""
+_QUERY_NODES_BATCH_CYPHER = """
+UNWIND range(0, size($queries) - 1) AS i
+CALL db.index.vector.queryNodes($index_name, $k, $queries[i])
+YIELD node, score
+WHERE score >= $threshold
+RETURN i, node, score
+"""
+_CREATE_INDEX_CYPHER = """
+CALL db.index.vector.createNodeIndex(
+    $index_name,
+    $node_label,
+    $property_name,
+    $dimension,
+    $similarity_metric
+)
+"""
+_DROP_INDEX_CYPHER = "CALL db.index.vector.deleteNodeIndex($index_name)"
+_LIST_INDEXES_CYPHER = """
+CALL db.index.vector.list()
+YIELD name, type, labelsOrTypes, properties, dimension, similarityFunction
+RETURN name, type, labelsOrTypes, properties, dimension, similarityFunction
+"""
+
+def as_vector_param(embedding: Union[Sequence[float], np.ndarray]) -> Sequence[float]:
+    """Prepare an embedding (or a 2-D batch of them) for use as a query parameter.
+    
+    Arrays are cast to float32 and converted to (nested) lists. The Neo4j driver
+    packs an ndarray element by element like any other sequence, so passing the
+    array itself is no faster than a list. Lists are passed through unchanged.
+    """
+    if isinstance(embedding, np.ndarray):
+        return np.asarray(embedding, dtype=np.float32).tolist()
+    return embedding
+
+class QueryVectorCache:
+    """Cache of recent vector search results, looked up by query embedding similarity.
+    
+    Queries tend to repeat with small variations, so a search whose embedding is
+    within `threshold` cosine similarity of a recent one reuses that search's results
+    instead of round-tripping to the vector index. Embeddings are matched with a
+    SemanticIndex per set of search parameters; entries expire after `ttl` seconds
+    and the least recently used are evicted beyond `max_size`.
+    """
+    
+    def __init__(self, dimension: int, max_size: int, threshold: float, ttl: float):
+        """Initialize the QueryVectorCache.
+        
+        Args:
+            dimension: Dimension of the query embeddings
+            max_size: Maximum number of cached searches
+            threshold: Minimum cosine similarity for a cached search to be reused
+            ttl: Seconds after which a cached search is no longer reused
+        """
+        self.dimension = dimension
+        self.max_size = max_size
+        self.threshold = threshold
+        self.ttl = ttl
+        self._indexes: Dict[tuple, SemanticIndex] = {}
+        # Entry key -> (search parameters, results, expiry time), in LRU order
+        self._entries: "OrderedDict[str, Tuple[tuple, List[Dict[str, Any]], float]]" = OrderedDict()
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+    
+    def get(self, params: tuple, embedding: Union[List[float], np.ndarray]) -> Optional[List[Dict[str, Any]]]:
+        """Return the results of a cached search close enough to `embedding`, if any."""
+        with self._lock:
+            index = self._indexes.get(params)
+            match = index.search(embedding) if index is not None else None
+            if match is None:
+                return None
+            key = match[0]
+            _, results, expires = self._entries[key]
+            if expires < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return list(results)
+    
+    def put(self, params: tuple, embedding: Union[List[float], np.ndarray], results: List[Dict[str, Any]]):
+        """Cache the results of a search."""
+        with self._lock:
+            key = str(next(self._ids))
+            index = self._indexes.get(params)
+            if index is None:
+                index = self._indexes[params] = SemanticIndex(self.dimension, threshold=self.threshold)
+            index.add(key, embedding)
+            self._entries[key] = (params, results, time.monotonic() + self.ttl)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+    
+    def _remove(self, key: str):
+        params, _, _ = self._entries.pop(key)
+        self._indexes[params].remove(key)
+    
+    def clear(self):
+        """Drop every cached search, e.g. after documents were added or removed."""
+        with self._lock:
+            self._indexes.clear()
+            self._entries.clear()
 
 class VectorSearch:
     """
@@ -18,51 +138,87 @@ class VectorSearch:
         """
         self.logger = logging.getLogger(__name__)
         self.driver = neo4j_driver
+        self.query_cache = QueryVectorCache(
+            EMBEDDING_DIMENSION,
+            max_size=VECTOR_QUERY_CACHE_SIZE,
+            threshold=VECTOR_QUERY_CACHE_THRESHOLD,
+            ttl=VECTOR_QUERY_CACHE_TTL
+        ) if VECTOR_QUERY_CACHE_SIZE > 0 else None
     
-    def search(self, embedding: List[float], node_label: str = "Document", 
+    def search(self, embedding: Union[List[float], np.ndarray], node_label: str = "Document", 
                property_name: str = "embedding", limit: int = 5, 
-               similarity_threshold: float = 0.5) -> List[Dict[str, Any]]:
+               similarity_threshold: float = 0.5, normalized: bool = True) -> List[Dict[str, Any]]:
         """Perform a vector similarity search in the Neo4j database.
         
         Args:
-            embedding: The query embedding vector
+            embedding: The query embedding vector, as a list of floats or a 1-D NumPy array
             node_label: Label of nodes to search (default: "Document")
             property_name: Name of the property containing embeddings (default: "embedding")
             limit: Maximum number of results to return (default: 5)
             similarity_threshold: Minimum similarity score to include in results (default: 0.5)
+            normalized: Whether `embedding` is already L2-normalized, as EmbeddingGenerator
+                output is; otherwise it is normalized once here before querying
             
         Returns:
             List of dictionaries containing nodes and their similarity scores
         """
+        if not normalized:
+            embedding = np.asarray(embedding, dtype=np.float32)
+            embedding = embedding / (np.linalg.norm(embedding) + 1e-12)
+        
+        cache_params = (node_label, property_name, limit, similarity_threshold)
+        if self.query_cache is not None:
+            cached = self.query_cache.get(cache_params, embedding)
+            if cached is not None:
+                self.logger.info(f"Vector search served {len(cached)} results from the query cache")
+                return cached
+        
         try:
             # Construct the Cypher query for vector search
-            cypher_query = f"""
-            CALL db.index.vector.queryNodes($index_name, $k, $embedding)
-            YIELD node, score
-            WHERE score >= $threshold
-            RETURN node, score
-            LIMIT $limit
-            """
+            if EMBEDDING_STORE_INT8:
+                # int8 embeddings are not covered by the vector index; cosine is scale
+                # invariant, so the quantized values are compared without dequantizing
+                cypher_query = f"""
+                MATCH (node:{node_label})
+                WHERE node.{property_name}_q8 IS NOT NULL
+                WITH node, vector.similarity.cosine(node.{property_name}_q8, $embedding) AS score
+                WHERE score >= $threshold
+                RETURN node, score
+                ORDER BY score DESC
+                LIMIT $limit
+                """
+            else:
+                # The threshold is applied below, on the k neighbours the index returns
+                cypher_query = _QUERY_NODES_CYPHER
             
             # Prepare parameters
             params = {
                 "index_name": f"{node_label}_{property_name}_index",
-                "k": limit * 2,  # Request more results than needed to filter by threshold
-                "embedding": embedding,
+                # Size of the ANN candidate list; the threshold only trims the tail of the
+                # top-k, so k = limit is enough unless over-fetching is configured
+                "k": max(limit, math.ceil(limit * VECTOR_SEARCH_OVERFETCH)),
+                "embedding": as_vector_param(embedding),
                 "threshold": similarity_threshold,
                 "limit": limit
             }
             
             # Execute the query
-            results = self.driver.execute_query(cypher_query, params)
+            results = self.driver.execute_query(cypher_query, params, write=False)
             
-            # Format the results
+            # Format the results (neighbours arrive ordered by descending score)
             formatted_results = []
             for record in results:
+                if record["score"] < similarity_threshold:
+                    break
                 formatted_results.append({
-                    "node": dict(record["node"]),
+                    "node": record["node"],  # already a plain property dict (Record.data())
                     "similarity": record["score"]
                 })
+                if len(formatted_results) == limit:
+                    break
+            
+            if self.query_cache is not None:
+                self.query_cache.put(cache_params, embedding, formatted_results)
             
             self.logger.info(f"Vector search returned {len(formatted_results)} results")
             return formatted_results
@@ -71,11 +227,94 @@ class VectorSearch:
             self.logger.error(f"Error performing vector search: {str(e)}")
             raise
     
+    def search_batch(self, embeddings: Union[List[List[float]], np.ndarray], node_label: str = "Document", 
+                     property_name: str = "embedding", limit: int = 5, 
+                     similarity_threshold: float = 0.5, normalized: bool = True) -> List[List[Dict[str, Any]]]:
+        """Run several vector similarity searches in a single Cypher call.
+        
+        Useful for multi-query retrieval (sub-questions, query rewrites): the query
+        vectors are sent together and searched with one UNWIND, so there is one round
+        trip and one plan for all of them. Queries answered by the query cache are
+        not sent.
+        
+        Args:
+            embeddings: Query embedding vectors, as lists of floats or a 2-D NumPy array
+            node_label: Label of nodes to search (default: "Document")
+            property_name: Name of the property containing embeddings (default: "embedding")
+            limit: Maximum number of results to return per query (default: 5)
+            similarity_threshold: Minimum similarity score to include in results (default: 0.5)
+            normalized: Whether the embeddings are already L2-normalized
+            
+        Returns:
+            One list of result dictionaries (as returned by `search`) per query, in order
+        """
+        queries = np.asarray(embeddings, dtype=np.float32)
+        if queries.ndim != 2:
+            raise ValueError(f"Expected a 2-D array of query embeddings, got shape {queries.shape}")
+        if not normalized:
+            queries = queries / (np.linalg.norm(queries, axis=1, keepdims=True) + 1e-12)
+        
+        cache_params = (node_label, property_name, limit, similarity_threshold)
+        batch_results: List[Optional[List[Dict[str, Any]]]] = [None] * len(queries)
+        if self.query_cache is not None:
+            for i, query in enumerate(queries):
+                batch_results[i] = self.query_cache.get(cache_params, query)
+        pending = [i for i, results in enumerate(batch_results) if results is None]
+        if not pending:
+            return batch_results
+        
+        try:
+            if EMBEDDING_STORE_INT8:
+                cypher_query = f"""
+                UNWIND range(0, size($queries) - 1) AS i
+                MATCH (node:{node_label})
+                WHERE node.{property_name}_q8 IS NOT NULL
+                WITH i, node, vector.similarity.cosine(node.{property_name}_q8, $queries[i]) AS score
+                WHERE score >= $threshold
+                WITH i, node, score ORDER BY score DESC
+                WITH i, collect({{node: node, score: score}})[..$limit] AS hits
+                UNWIND hits AS hit
+                RETURN i, hit.node AS node, hit.score AS score
+                """
+            else:
+                cypher_query = _QUERY_NODES_BATCH_CYPHER
+            
+            params = {
+                "index_name": f"{node_label}_{property_name}_index",
+                "k": max(limit, math.ceil(limit * VECTOR_SEARCH_OVERFETCH)),
+                "queries": as_vector_param(queries[pending]),
+                "threshold": similarity_threshold,
+                "limit": limit
+            }
+            records = self.driver.execute_query(cypher_query, params, write=False)
+            
+            # Rows of all queries come back interleaved; group them per query
+            grouped: List[List[Dict[str, Any]]] = [[] for _ in pending]
+            for record in records:
+                grouped[record["i"]].append({"node": record["node"], "similarity": record["score"]})
+            for slot, results in zip(pending, grouped):
+                results.sort(key=lambda result: result["similarity"], reverse=True)
+                del results[limit:]
+                batch_results[slot] = results
+                if self.query_cache is not None:
+                    self.query_cache.put(cache_params, queries[slot], results)
+            
+            self.logger.info(f"Batched vector search ran {len(pending)} of {len(queries)} queries in one call")
+            return batch_results
+        
+        except Exception as e:
+            self.logger.error(f"Error performing batched vector search: {str(e)}")
+            raise
+    
     def create_vector_index(self, node_label: str = "Document", 
                            property_name: str = "embedding", 
                            dimension: int = 384) -> bool:
         """Create a vector index in the Neo4j database.
         
+        Embeddings are expected to be L2-normalized before they are stored (EmbeddingGenerator
+        always normalizes), so the cosine score of the index equals the plain dot product and
+        no client-side re-normalization is needed at search time.
+        
         Args:
             node_label: Label of nodes to index (default: "Document")
             property_name: Name of the property containing embeddings (default: "embedding")
@@ -85,17 +324,6 @@ class VectorSearch:
             Boolean indicating success
         """
         try:
-            # Construct the Cypher query for creating a vector index
-            cypher_query = f"""
-            CALL db.index.vector.createNodeIndex(
-                $index_name,
-                $node_label,
-                $property_name,
-                $dimension,
-                $similarity_metric
-            )
-            """
-            
             # Prepare parameters
             params = {
                 "index_name": f"{node_label}_{property_name}_index",
@@ -106,7 +334,7 @@ class VectorSearch:
             }
             
             # Execute the query
-            self.driver.execute_query(cypher_query, params)
+            self.driver.execute_query(_CREATE_INDEX_CYPHER, params, write=True)
             
             self.logger.info(f"Created vector index for {node_label}.{property_name}")
             return True
@@ -127,18 +355,13 @@ class VectorSearch:
             Boolean indicating success
         """
         try:
-            # Construct the Cypher query for dropping a vector index
-            cypher_query = f"""
-            CALL db.index.vector.deleteNodeIndex($index_name)
-            """
-            
             # Prepare parameters
             params = {
                 "index_name": f"{node_label}_{property_name}_index"
             }
             
             # Execute the query
-            self.driver.execute_query(cypher_query, params)
+            self.driver.execute_query(_DROP_INDEX_CYPHER, params, write=True)
             
             self.logger.info(f"Dropped vector index for {node_label}.{property_name}")
             return True
@@ -154,15 +377,8 @@ class VectorSearch:
             List of dictionaries containing index information
         """
         try:
-            # Construct the Cypher query for listing vector indexes
-            cypher_query = """
-            CALL db.index.vector.list()
-            YIELD name, type, labelsOrTypes, properties, dimension, similarityFunction
-            RETURN name, type, labelsOrTypes, properties, dimension, similarityFunction
-            """
-            
             # Execute the query
-            results = self.driver.execute_query(cypher_query)
+            results = self.driver.execute_query(_LIST_INDEXES_CYPHER, write=False)
             
             # Format the results
             formatted_results = []
@@ -1,4 +1,4 @@
-from .query_translator import QueryTranslator
-from .answer_generator import AnswerGenerator
+from .query_translator import QueryTranslator, get_query_translator
+from .answer_generator import AnswerGenerator, get_answer_generator
 
-__all__ = ['QueryTranslator', 'AnswerGenerator']
+__all__ = ['QueryTranslator', 'AnswerGenerator', 'get_query_translator', 'get_answer_generator']
@@ -0,0 +1,67 @@
+import asyncio
+import weakref
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import OPENROUTER_CONNECT_TIMEOUT, OPENROUTER_READ_TIMEOUT
+
+try:
+    import httpx
+except ImportError:  # httpx is optional; only the async API needs it
+    httpx = None
+
+# (connect, read) timeout for OpenRouter API calls
+HTTP_TIMEOUT = (OPENROUTER_CONNECT_TIMEOUT, OPENROUTER_READ_TIMEOUT)
+
+def _create_session() -> requests.Session:
+    """Create the HTTP session shared by all LLM clients.
+
+    Connections are kept alive and pooled, so consecutive API calls skip the TCP
+    and TLS handshakes. Rate limiting and transient server errors are retried with
+    backoff; once retries are exhausted the last response is returned so callers'
+    ``raise_for_status`` error handling still applies.
+    """
+    retry = Retry(
+        total=2,
+        backoff_factor=0.2,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("POST",),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+http_session = _create_session()
+
+# httpx connection pools are bound to the event loop they were created on
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+def get_async_client() -> "httpx.AsyncClient":
+    """Return the shared AsyncClient of the running event loop, creating it on first use.
+
+    HTTP/2 is used when the h2 package is installed, so concurrent requests are
+    multiplexed over a single TLS connection.
+
+    Raises:
+        RuntimeError: If httpx is not installed or no event loop is running
+    """
+    if httpx is None:
+        raise RuntimeError("httpx is required for async LLM calls. Install it with: pip install httpx[http2]")
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        try:
+            import h2  # noqa: F401
+            http2 = True
+        except ImportError:
+            http2 = False
+        client = httpx.AsyncClient(
+            http2=http2,
+            timeout=httpx.Timeout(OPENROUTER_READ_TIMEOUT, connect=OPENROUTER_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=32)
+        )
+        _async_clients[loop] = client
+    return client
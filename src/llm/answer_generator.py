@@ -1,8 +1,92 @@
 import logging
-from typing import Dict, List, Any, Optional
+import threading
+from typing import Dict, Iterator, List, Any, Optional, Tuple
 import json
 import requests
-from config import OPENROUTER_API_KEY, OPENROUTER_BASE_URL, ANSWER_GENERATOR_MODEL  # Changed from relative to absolute import
+import json_utils
+from llm._http import http_session, HTTP_TIMEOUT, get_async_client, httpx
+from config import OPENROUTER_API_KEY, OPENROUTER_BASE_URL, ANSWER_GENERATOR_MODEL, VECTOR_PROPERTY  # Changed from relative to absolute import
+
+# Query result records included in the prompt; only these are serialized
+MAX_PROMPT_RECORDS = 40
+# Bytes of serialized records included in the prompt; records past it are left out whole
+MAX_PROMPT_RESULT_BYTES = 8192
+# Characters kept of a string value (e.g. a document's text), so one record cannot fill the budget
+MAX_PROMPT_STRING = 2000
+# Numeric lists longer than this (embedding-like vectors) are dropped from the records
+MAX_PROMPT_NUMBER_LIST = 32
+# Stored embedding properties, meaningless to the answer model: float, int8 and its scale
+_EMBEDDING_KEYS = frozenset((VECTOR_PROPERTY, f"{VECTOR_PROPERTY}_q8", f"{VECTOR_PROPERTY}_scale"))
+_DROP = object()
+
+def _prompt_value(value: Any) -> Any:
+    """Strip embeddings and other long numeric lists from a query result value,
+    and shorten long strings.
+    
+    Returns _DROP for a value to leave out entirely.
+    """
+    if isinstance(value, str):
+        return value if len(value) <= MAX_PROMPT_STRING else value[:MAX_PROMPT_STRING] + "..."
+    if isinstance(value, dict):
+        slim = {}
+        for key, item in value.items():
+            if key in _EMBEDDING_KEYS:
+                continue
+            item = _prompt_value(item)
+            if item is not _DROP:
+                slim[key] = item
+        return slim
+    if isinstance(value, (list, tuple)):
+        if len(value) > MAX_PROMPT_NUMBER_LIST and all(
+                isinstance(item, (int, float)) and not isinstance(item, bool) for item in value):
+            return _DROP
+        return [item for item in map(_prompt_value, value) if item is not _DROP]
+    return value
+
+def _format_records(query_results: List[Dict[str, Any]]) -> Tuple[str, int]:
+    """Serialize query results for the prompt within the record and byte budgets.
+    
+    Records are added whole, so the output is always a valid JSON array.
+    
+    Args:
+        query_results: Results from the Cypher query execution
+        
+    Returns:
+        Tuple of (JSON array text, number of records included)
+    """
+    parts: List[bytes] = []
+    size = 0
+    for record in query_results[:MAX_PROMPT_RECORDS]:
+        part = json_utils.dumps(_prompt_value(record), indent=True).replace(b"\n", b"\n  ")
+        if parts and size + len(part) > MAX_PROMPT_RESULT_BYTES:
+            break
+        parts.append(part)
+        size += len(part)
+    if not parts:
+        return "[]", 0
+    return ("[\n  " + ",\n  ".join(p.decode("utf-8") for p in parts) + "\n]"), len(parts)
+
+# Static parts of the prompt; only the question, query, results and vector context vary per call
+_SYSTEM_PROMPT = "You are a helpful assistant that explains graph database query results."
+_PROMPT_HEADER = """You are an expert in explaining Neo4j graph database query results in natural language.
+Your task is to generate a clear, concise, and informative answer based on the following information:
+
+"""
+_VECTOR_CONTEXT_BLOCK = """
+ADDITIONAL CONTEXT FROM SIMILAR DOCUMENTS:
+{vector_context}
+"""
+_PROMPT_INSTRUCTIONS = """
+INSTRUCTIONS:
+1. Generate a comprehensive answer to the user's question based on the query results.
+2. Explain the relationships and patterns found in the data.
+3. If the query returned no results or insufficient information, explain this clearly.
+4. Use a conversational and helpful tone.
+5. Do not mention the Cypher query or technical details unless relevant to the answer.
+6. Structure your answer in a readable format with paragraphs and bullet points if appropriate.
+
+ANSWER:
+"""
 
 class AnswerGenerator:
     """Generates natural language answers from graph query results using LLMs via OpenRouter API.
@@ -47,9 +131,12 @@ class AnswerGenerator:
             logging.error(f"Error generating answer: {str(e)}")
             raise
     
-    def _prepare_prompt(self, question: str, query_results: List[Dict[str, Any]], 
-                         cypher_query: str, vector_context: Optional[str] = None) -> str:
-        """Prepare the prompt for the LLM to generate an answer.
+    def generate_answer_stream(self, question: str, query_results: List[Dict[str, Any]], 
+                               cypher_query: str, vector_context: Optional[str] = None) -> Iterator[str]:
+        """Generate the answer incrementally, yielding text as the LLM produces it.
+        
+        Lets UIs show the first words after one token's latency instead of waiting
+        for the whole answer; joining the yielded pieces gives the full answer.
         
         Args:
             question: The original natural language question
@@ -57,54 +144,82 @@ class AnswerGenerator:
             cypher_query: The Cypher query that was executed
             vector_context: Optional context from vector search results
             
-        Returns:
-            Formatted prompt string
-        """
-        # Format the query results for the prompt
-        # Limit the size to avoid token limits
-        results_str = json.dumps(query_results, indent=2)[:2000]  # Truncate if too large
-        
-        # Base prompt
-        prompt = f"""
-        You are an expert in explaining Neo4j graph database query results in natural language.
-        Your task is to generate a clear, concise, and informative answer based on the following information:
-        
-        USER QUESTION:
-        {question}
-        
-        CYPHER QUERY EXECUTED:
-        ```cypher
-        {cypher_query}
-        ```
-        
-        QUERY RESULTS:
-        ```json
-        {results_str}
-        ```
+        Yields:
+            Consecutive pieces of the generated answer
         """
+        prompt = self._prepare_prompt(question, query_results, cypher_query, vector_context)
         
-        # Add vector context if available
-        if vector_context:
-            prompt += f"""
-            
-            ADDITIONAL CONTEXT FROM SIMILAR DOCUMENTS:
-            {vector_context}
-            """
+        try:
+            yield from self._stream_openrouter(prompt)
+            logging.info("Generated answer successfully")
+        except Exception as e:
+            logging.error(f"Error generating answer: {str(e)}")
+            raise
+    
+    async def generate_answer_async(self, question: str, query_results: List[Dict[str, Any]], 
+                                    cypher_query: str, vector_context: Optional[str] = None) -> str:
+        """Async variant of generate_answer that does not block the event loop.
         
-        prompt += """
+        Args:
+            question: The original natural language question
+            query_results: Results from the Cypher query execution
+            cypher_query: The Cypher query that was executed
+            vector_context: Optional context from vector search results
+            
+        Returns:
+            Generated natural language answer as a string
+        """
+        prompt = self._prepare_prompt(question, query_results, cypher_query, vector_context)
         
-        INSTRUCTIONS:
-        1. Generate a comprehensive answer to the user's question based on the query results.
-        2. Explain the relationships and patterns found in the data.
-        3. If the query returned no results or insufficient information, explain this clearly.
-        4. Use a conversational and helpful tone.
-        5. Do not mention the Cypher query or technical details unless relevant to the answer.
-        6. Structure your answer in a readable format with paragraphs and bullet points if appropriate.
+        try:
+            response = await self._call_openrouter_async(prompt)
+            
+            logging.info("Generated answer successfully")
+            return response
+        except Exception as e:
+            logging.error(f"Error generating answer: {str(e)}")
+            raise
+    
+    def _prepare_prompt(self, question: str, query_results: List[Dict[str, Any]], 
+                         cypher_query: str, vector_context: Optional[str] = None) -> str:
+        """Prepare the prompt for the LLM to generate an answer.
         
-        ANSWER:
+        Args:
+            question: The original natural language question
+            query_results: Results from the Cypher query execution
+            cypher_query: The Cypher query that was executed
+            vector_context: Optional context from vector search results
+            
+        Returns:
+            Formatted prompt string
         """
+        # Format the query results for the prompt, without embeddings and within the
+        # record and byte budgets to avoid token limits
+        results_str, shown = _format_records(query_results)
+        results_note = ""
+        if len(query_results) > shown:
+            results_note = f"NOTE: Showing first {shown} of {len(query_results)} records.\n"
         
-        return prompt
+        vector_block = _VECTOR_CONTEXT_BLOCK.format(vector_context=vector_context) if vector_context else ""
+        return (
+            f"{_PROMPT_HEADER}"
+            f"USER QUESTION:\n{question}\n\n"
+            f"CYPHER QUERY EXECUTED:\n```cypher\n{cypher_query}\n```\n\n"
+            f"QUERY RESULTS:\n```json\n{results_str}\n```\n{results_note}"
+            f"{vector_block}{_PROMPT_INSTRUCTIONS}"
+        )
+    
+    def _request_data(self, prompt: str) -> Dict[str, Any]:
+        """Build the chat completion request body for `prompt`."""
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": _SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.7,  # Slightly higher temperature for more creative answers
+            "max_tokens": 1000
+        }
     
     def _call_openrouter(self, prompt: str) -> str:
         """Call the OpenRouter API to generate a response.
@@ -123,21 +238,14 @@ class AnswerGenerator:
             "Content-Type": "application/json"
         }
         
-        data = {
-            "model": self.model,
-            "messages": [
-                {"role": "system", "content": "You are a helpful assistant that explains graph database query results."},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.7,  # Slightly higher temperature for more creative answers
-            "max_tokens": 1000
-        }
+        data = self._request_data(prompt)
         
         try:
-            response = requests.post(
+            response = http_session.post(
                 self.base_url,
                 headers=headers,
-                json=data
+                json=data,
+                timeout=HTTP_TIMEOUT
             )
             response.raise_for_status()
             
@@ -159,6 +267,127 @@ class AnswerGenerator:
             error_msg = f"Invalid response from OpenRouter API: {str(e)}"
             logging.error(error_msg)
             raise ValueError(error_msg)
+    
+    def _stream_openrouter(self, prompt: str) -> Iterator[str]:
+        """Call the OpenRouter API with streaming enabled and yield the content deltas.
+        
+        The response is read as server-sent events: one ``data: {...}`` chunk per
+        delta, comment lines as keep-alives and ``data: [DONE]`` at the end.
+        
+        Args:
+            prompt: The formatted prompt string
+            
+        Yields:
+            Pieces of the generated text response
+            
+        Raises:
+            ValueError: If the API call fails with a detailed error message
+        """
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        data = {**self._request_data(prompt), "stream": True}
+        
+        try:
+            with http_session.post(self.base_url, headers=headers, json=data,
+                                   timeout=HTTP_TIMEOUT, stream=True) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line.startswith(b"data:"):
+                        continue
+                    payload = line[5:].strip()
+                    if payload == b"[DONE]":
+                        break
+                    chunk = json_utils.loads(payload)
+                    if "error" in chunk:
+                        error_msg = f"OpenRouter API stream failed: {chunk['error']}"
+                        logging.error(error_msg)
+                        raise ValueError(error_msg)
+                    # Frames without choices (e.g. a final usage-only frame) carry no text
+                    choices = chunk.get("choices")
+                    if not choices:
+                        continue
+                    content = choices[0].get("delta", {}).get("content")
+                    if content:
+                        yield content
+        except requests.exceptions.HTTPError as e:
+            error_msg = f"OpenRouter API request failed: {str(e)}"
+            if e.response is not None and e.response.status_code == 404:
+                error_msg = "OpenRouter API endpoint not found. Please check your OPENROUTER_BASE_URL configuration."
+            elif e.response is not None and e.response.status_code == 401:
+                error_msg = "Invalid OpenRouter API key. Please check your OPENROUTER_API_KEY configuration."
+            logging.error(error_msg)
+            raise ValueError(error_msg)
+        except requests.exceptions.RequestException as e:
+            error_msg = f"Network error while calling OpenRouter API: {str(e)}"
+            logging.error(error_msg)
+            raise ValueError(error_msg)
+        except (KeyError, IndexError, json.JSONDecodeError) as e:
+            error_msg = f"Invalid response from OpenRouter API: {str(e)}"
+            logging.error(error_msg)
+            raise ValueError(error_msg)
+    
+    async def _call_openrouter_async(self, prompt: str) -> str:
+        """Call the OpenRouter API without blocking the event loop.
+        
+        Uses the shared httpx.AsyncClient of the running loop, so concurrent calls
+        (e.g. via asyncio.gather) are multiplexed over pooled connections.
+        
+        Args:
+            prompt: The formatted prompt string
+            
+        Returns:
+            Generated text response from the LLM
+            
+        Raises:
+            ValueError: If the API call fails with a detailed error message
+        """
+        client = get_async_client()
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        
+        try:
+            response = await client.post(self.base_url, headers=headers, json=self._request_data(prompt))
+            response.raise_for_status()
+            
+            result = response.json()
+            return result["choices"][0]["message"]["content"]
+        except httpx.HTTPStatusError as e:
+            error_msg = f"OpenRouter API request failed: {str(e)}"
+            if e.response.status_code == 404:
+                error_msg = "OpenRouter API endpoint not found. Please check your OPENROUTER_BASE_URL configuration."
+            elif e.response.status_code == 401:
+                error_msg = "Invalid OpenRouter API key. Please check your OPENROUTER_API_KEY configuration."
+            logging.error(error_msg)
+            raise ValueError(error_msg)
+        except httpx.RequestError as e:
+            error_msg = f"Network error while calling OpenRouter API: {str(e)}"
+            logging.error(error_msg)
+            raise ValueError(error_msg)
+        except (KeyError, IndexError, json.JSONDecodeError) as e:
+            error_msg = f"Invalid response from OpenRouter API: {str(e)}"
+            logging.error(error_msg)
+            raise ValueError(error_msg)
+
+# The singleton is created on first use rather than at import, so importing this
+# module does not require OPENROUTER_API_KEY
+_instance: Optional[AnswerGenerator] = None
+_instance_lock = threading.Lock()
+
+def get_answer_generator() -> AnswerGenerator:
+    """Return the shared AnswerGenerator, creating it on first use."""
+    global _instance
+    if _instance is None:
+        with _instance_lock:
+            if _instance is None:
+                _instance = AnswerGenerator()
+    return _instance
 
-# Create a singleton instance
-answer_generator = AnswerGenerator()
+def __getattr__(name):
+    # PEP 562: `from llm.answer_generator import answer_generator` keeps working
+    if name == "answer_generator":
+        return get_answer_generator()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
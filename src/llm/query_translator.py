@@ -1,7 +1,254 @@
+import hashlib
 import logging
-from typing import Dict, Any, Optional
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Dict, Any, Iterable, List, Optional, Pattern, Tuple
+import json
 import requests
-from config import OPENROUTER_API_KEY, OPENROUTER_BASE_URL, QUERY_TRANSLATOR_MODEL  # Changed from relative to absolute import
+import json_utils
+from llm._http import http_session, HTTP_TIMEOUT, get_async_client, httpx
+from config import (  # Changed from relative to absolute import
+    OPENROUTER_API_KEY,
+    OPENROUTER_BASE_URL,
+    QUERY_TRANSLATOR_MODEL,
+    CYPHER_CACHE_SIZE,
+    CYPHER_CACHE_TTL,
+    CYPHER_TEMPLATES_ENABLED
+)
+
+# First fenced code block; a language tag (```cypher, ```sql) on the fence line is skipped,
+# and an unterminated block runs to the end of the response
+_CODE_BLOCK_RE = re.compile(r"```(?:[\w+-]*[ \t]*\n|cypher\b)?(.*?)(?:```|\Z)", re.DOTALL | re.IGNORECASE)
+
+# Static parts of the prompt; only the schema, question and vector context vary per call
+_SYSTEM_PROMPT = "You are a Neo4j Cypher query generator."
+_PROMPT_HEADER = """You are an expert in translating natural language questions into Neo4j Cypher queries.
+Your task is to generate a valid Cypher query based on the following information:
+
+"""
+_VECTOR_CONTEXT_BLOCK = """
+ADDITIONAL CONTEXT FROM SIMILAR DOCUMENTS:
+{vector_context}
+"""
+_PROMPT_INSTRUCTIONS = """
+INSTRUCTIONS:
+1. Generate a valid Neo4j Cypher query that answers the user's question.
+2. Use only the node labels, relationship types, and properties defined in the schema.
+3. Return ONLY the Cypher query without any explanations or markdown formatting.
+4. Ensure the query is optimized and follows Neo4j best practices.
+5. If the question cannot be answered with the given schema, return a simple query that explains the limitation.
+"""
+_PROMPT_FOOTER = """
+CYPHER QUERY:
+"""
+# Added to the instructions when a generated query used names outside the schema
+_SCHEMA_RETRY_NOTE = """6. Do NOT invent labels or relationship types. A previous attempt used {unknown}, which the schema does not define.
+   Valid node labels: {labels}. Valid relationship types: {rel_types}.
+"""
+
+# String literals, blanked out before looking for labels so their contents are ignored
+_STRING_LITERAL_RE = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NAME = r"(?:`(?:[^`]|``)+`|\w+)"
+# Labels of a node pattern: "(n:Person:Employee", "(:`Person`"
+_NODE_LABELS_RE = re.compile(rf"\(\s*\w*\s*((?::\s*{_NAME}\s*)+)")
+# Types of a relationship pattern: "[r:KNOWS|WORKS_AT", "[:`KNOWS`"
+_REL_TYPES_RE = re.compile(rf"\[\s*\w*\s*:\s*({_NAME}(?:\s*\|\s*:?\s*{_NAME})*)")
+
+# Tokens scanned when lifting literals into parameters: a string literal (the only group
+# replaced), or a comment / quoted identifier whose quotes must not be mistaken for one
+_LITERAL_TOKEN_RE = re.compile(
+    r"('(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\")|//[^\n]*|/\*.*?\*/|`(?:[^`]|``)*`",
+    re.DOTALL
+)
+_STRING_ESCAPE_RE = re.compile(r"\\(u[0-9a-fA-F]{4}|U[0-9a-fA-F]{8}|.)", re.DOTALL)
+_STRING_ESCAPES = {"\\": "\\", "'": "'", '"': '"', "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+def _unescape_string(literal: str) -> str:
+    """Decode a quoted Cypher string literal; raises ValueError on an invalid escape."""
+    def _escape(match):
+        code = match.group(1)
+        if len(code) > 1:
+            return chr(int(code[1:], 16))
+        if code not in _STRING_ESCAPES:
+            raise ValueError(f"Invalid escape sequence \\{code} in Cypher string literal")
+        return _STRING_ESCAPES[code]
+    return _STRING_ESCAPE_RE.sub(_escape, literal[1:-1])
+
+def parameterize_cypher(cypher_query: str) -> Tuple[str, Dict[str, Any]]:
+    """Lift the string literals of a query into $e0, $e1, ... parameters.
+    
+    Neo4j caches execution plans by query text, so questions that differ only in the
+    entity they ask about ("... {name: 'Alice'}" vs "... {name: 'Bob'}") then share
+    one plan instead of each being parsed and planned again.
+    
+    Args:
+        cypher_query: Cypher query with inline string literals
+        
+    Returns:
+        Tuple of (query with parameter placeholders, parameter values). The query is
+        returned unchanged with no parameters if a literal cannot be decoded.
+    """
+    params: Dict[str, Any] = {}
+    
+    def _lift(match):
+        if match.group(1) is None:
+            return match.group(0)
+        name = f"e{len(params)}"
+        params[name] = _unescape_string(match.group(1))
+        return "$" + name
+    
+    try:
+        return _LITERAL_TOKEN_RE.sub(_lift, cypher_query), params
+    except ValueError as e:
+        logging.warning(f"Executing Cypher query without lifting literals: {str(e)}")
+        return cypher_query, {}
+
+# Rows returned by the local "list"/"find" templates
+TEMPLATE_RESULT_LIMIT = 100
+
+def _quote_name(name: str) -> str:
+    """Quote a label or property name as a Cypher identifier."""
+    return "`" + name.replace("`", "``") + "`"
+
+# A backtick-quoted or plain name inside a schema type such as ":`Person`" or ":`A`:`B`"
+_SCHEMA_NAME_RE = re.compile(r"`((?:[^`]|``)+)`|(\w+)")
+
+def _schema_names(types: Dict[str, Any]) -> Dict[str, Dict[str, None]]:
+    """Map the plain labels (or relationship types) of a schema section to their properties.
+    
+    db.schema.nodeTypeProperties() reports node types as ":`Person`", or ":`A`:`B`" for
+    nodes with several labels; these keys are split into the names used in Cypher.
+    
+    Args:
+        types: The "nodes" or "relationships" section of the schema information
+        
+    Returns:
+        Dictionary of name -> ordered set (dict keys) of its property names
+    """
+    names: Dict[str, Dict[str, None]] = {}
+    for key, props in types.items():
+        for quoted, plain in _SCHEMA_NAME_RE.findall(key):
+            name = quoted.replace("``", "`") if quoted else plain
+            names.setdefault(name, {}).update(dict.fromkeys(prop for prop in props if isinstance(prop, str)))
+    return names
+
+def _unknown_names(cypher_query: str, schema_info: Dict[str, Any]) -> List[str]:
+    """List the node labels and relationship types of a query's patterns that the schema lacks.
+    
+    A schema section without entries (e.g. an empty database) is not checked.
+    
+    Args:
+        cypher_query: The generated Cypher query
+        schema_info: Database schema information
+        
+    Returns:
+        Unknown names formatted as ":Label" / "[:TYPE]", in order of appearance
+    """
+    text = _STRING_LITERAL_RE.sub("''", cypher_query)
+    unknown: Dict[str, None] = {}
+    for pattern, section, template in ((_NODE_LABELS_RE, "nodes", ":{}"),
+                                       (_REL_TYPES_RE, "relationships", "[:{}]")):
+        known = _schema_names(schema_info.get(section, {}))
+        if not known:
+            continue
+        for names in pattern.findall(text):
+            for quoted, plain in _SCHEMA_NAME_RE.findall(names):
+                name = quoted.replace("``", "`") if quoted else plain
+                if name not in known:
+                    unknown[template.format(name)] = None
+    return list(unknown)
+
+def _resolve_name(word: str, names: Iterable[str]) -> Optional[str]:
+    """Map a word of the question onto exactly one schema name.
+    
+    Compares case-insensitively, also trying the singular forms of plurals
+    ("persons" -> Person, "companies" -> Company).
+    
+    Args:
+        word: Word taken from the question
+        names: Candidate labels or property names
+        
+    Returns:
+        The matching name, or None when there is no match or more than one
+    """
+    word = word.casefold()
+    forms = {word}
+    if word.endswith("ies"):
+        forms.add(word[:-3] + "y")
+    if word.endswith("es"):
+        forms.add(word[:-2])
+    if word.endswith("s"):
+        forms.add(word[:-1])
+    matches = [name for name in names if name.casefold() in forms]
+    return matches[0] if len(matches) == 1 else None
+
+def _count_template(match, schema_info: Dict[str, Any]) -> Optional[str]:
+    """'How many X' -> count of the nodes with label X."""
+    label = _resolve_name(match.group("label"), _schema_names(schema_info.get("nodes", {})))
+    if label is None:
+        return None
+    return f"MATCH (n:{_quote_name(label)}) RETURN count(n) AS count"
+
+def _filter_template(match, schema_info: Dict[str, Any]) -> Optional[str]:
+    """'Find X with P V' -> nodes with label X whose property P equals V."""
+    nodes = _schema_names(schema_info.get("nodes", {}))
+    label = _resolve_name(match.group("label"), nodes)
+    if label is None:
+        return None
+    prop = _resolve_name(match.group("prop"), nodes[label])
+    if prop is None:
+        return None
+    # A JSON string is a valid Cypher string literal; toString() also matches numeric properties
+    value = json.dumps(match.group("value"), ensure_ascii=False)
+    return (f"MATCH (n:{_quote_name(label)}) WHERE toString(n.{_quote_name(prop)}) = {value} "
+            f"RETURN n LIMIT {TEMPLATE_RESULT_LIMIT}")
+
+def _list_template(match, schema_info: Dict[str, Any]) -> Optional[str]:
+    """'List all X' -> nodes with label X."""
+    label = _resolve_name(match.group("label"), _schema_names(schema_info.get("nodes", {})))
+    if label is None:
+        return None
+    return f"MATCH (n:{_quote_name(label)}) RETURN n LIMIT {TEMPLATE_RESULT_LIMIT}"
+
+_RETRIEVE = r"(?:list|show(?: me)?|get|find|return)(?: all)?(?: the)?"
+_IN_GRAPH = r"(?: in the (?:database|graph))?"
+
+# Structural questions translated without the LLM. Each pattern must match the whole
+# (whitespace-normalized) question; the builder returns None unless every name it
+# needs resolves to exactly one schema entry, in which case the LLM is used instead.
+_TEMPLATES: List[Tuple[Pattern, Callable[..., Optional[str]]]] = [
+    (re.compile(rf"(?:how many|count(?: all| the)?|(?:what is )?the number of) (?P<label>\w+)"
+                rf"(?: are there| exist| do we have)?{_IN_GRAPH}", re.IGNORECASE), _count_template),
+    (re.compile(rf"{_RETRIEVE} (?P<label>\w+) (?:with|where|whose) (?P<prop>\w+)"
+                rf"(?: is| =| equals| equal to| of)? [\"']?(?P<value>[^\"']+?)[\"']?", re.IGNORECASE), _filter_template),
+    (re.compile(rf"{_RETRIEVE} (?P<label>\w+){_IN_GRAPH}", re.IGNORECASE), _list_template),
+]
+
+@lru_cache(maxsize=8)
+def _render_schema(schema_json: bytes) -> str:
+    """Render the schema section of the prompt.
+    
+    Keyed by the serialized schema, so the rendering is done once per schema
+    version instead of once per question.
+    
+    Args:
+        schema_json: JSON serialization of the schema information
+        
+    Returns:
+        The "DATABASE SCHEMA" section of the prompt
+    """
+    schema_info = json_utils.loads(schema_json)
+    nodes_str = "\n".join(f"- {label}: {', '.join(props)}"
+                          for label, props in schema_info.get("nodes", {}).items())
+    relationships_str = "\n".join(f"- {rel_type}: {', '.join(props)}"
+                                  for rel_type, props in schema_info.get("relationships", {}).items())
+    return (
+        f"DATABASE SCHEMA:\nNode Labels and Properties:\n{nodes_str}\n\n"
+        f"Relationship Types and Properties:\n{relationships_str}"
+    )
 
 class QueryTranslator:
     """Translates natural language questions into Cypher queries using LLMs via OpenRouter API.
@@ -16,6 +263,13 @@ class QueryTranslator:
         self.base_url = OPENROUTER_BASE_URL
         self.model = QUERY_TRANSLATOR_MODEL
         
+        # TTL LRU of cache key -> (Cypher query, expiry time)
+        self._cypher_cache: "OrderedDict[bytes, Tuple[str, float]]" = OrderedDict()
+        self._cypher_cache_size = CYPHER_CACHE_SIZE
+        self._cypher_cache_ttl = CYPHER_CACHE_TTL
+        self._cache_lock = threading.Lock()
+        self.templates_enabled = CYPHER_TEMPLATES_ENABLED
+        
         if not self.api_key:
             logging.error("OpenRouter API key not found. Please set OPENROUTER_API_KEY environment variable.")
             raise ValueError("OpenRouter API key not found")
@@ -32,6 +286,17 @@ class QueryTranslator:
         Returns:
             Generated Cypher query as a string
         """
+        cypher_query = self._match_template(question, schema_info)
+        if cypher_query is not None:
+            logging.info(f"Generated Cypher query from a local template: {cypher_query}")
+            return cypher_query
+        
+        key = self._cache_key(question, schema_info, vector_context)
+        cached = self._cache_get(key)
+        if cached is not None:
+            logging.info(f"Reusing cached Cypher query: {cached}")
+            return cached
+        
         # Prepare the prompt for the LLM
         prompt = self._prepare_prompt(question, schema_info, vector_context)
         
@@ -41,6 +306,15 @@ class QueryTranslator:
             
             # Extract and validate the Cypher query
             cypher_query = self._extract_cypher(response)
+            unknown = _unknown_names(cypher_query, schema_info)
+            if unknown:
+                # One retry, so a hallucinated label costs an LLM call instead of a failed Neo4j query
+                logging.warning(f"Generated Cypher uses names outside the schema ({', '.join(unknown)}); retrying")
+                response = self._call_openrouter(self._prepare_prompt(question, schema_info, vector_context, unknown))
+                cypher_query = self._extract_cypher(response)
+                unknown = _unknown_names(cypher_query, schema_info)
+            if not unknown:
+                self._cache_put(key, cypher_query)
             
             logging.info(f"Generated Cypher query: {cypher_query}")
             return cypher_query
@@ -48,62 +322,156 @@ class QueryTranslator:
             logging.error(f"Error generating Cypher query: {str(e)}")
             raise
     
-    def _prepare_prompt(self, question: str, schema_info: Dict[str, Any], 
-                         vector_context: Optional[str] = None) -> str:
-        """Prepare the prompt for the LLM to generate a Cypher query.
+    async def generate_cypher_async(self, question: str, schema_info: Dict[str, Any], 
+                                    vector_context: Optional[str] = None) -> str:
+        """Async variant of generate_cypher that does not block the event loop.
         
         Args:
             question: The natural language question
-            schema_info: Database schema information
+            schema_info: Database schema information (node labels, relationship types, properties)
             vector_context: Optional context from vector search results
             
         Returns:
-            Formatted prompt string
+            Generated Cypher query as a string
         """
-        # Format the schema information for the prompt
-        nodes_str = "\n".join([f"- {label}: {', '.join(props)}" 
-                           for label, props in schema_info.get("nodes", {}).items()])
+        cypher_query = self._match_template(question, schema_info)
+        if cypher_query is not None:
+            logging.info(f"Generated Cypher query from a local template: {cypher_query}")
+            return cypher_query
         
-        relationships_str = "\n".join([f"- {rel_type}: {', '.join(props)}" 
-                                  for rel_type, props in schema_info.get("relationships", {}).items()])
+        key = self._cache_key(question, schema_info, vector_context)
+        cached = self._cache_get(key)
+        if cached is not None:
+            logging.info(f"Reusing cached Cypher query: {cached}")
+            return cached
         
-        # Base prompt
-        prompt = f"""
-        You are an expert in translating natural language questions into Neo4j Cypher queries.
-        Your task is to generate a valid Cypher query based on the following information:
+        prompt = self._prepare_prompt(question, schema_info, vector_context)
         
-        DATABASE SCHEMA:
-        Node Labels and Properties:
-        {nodes_str}
+        try:
+            response = await self._call_openrouter_async(prompt)
+            cypher_query = self._extract_cypher(response)
+            unknown = _unknown_names(cypher_query, schema_info)
+            if unknown:
+                logging.warning(f"Generated Cypher uses names outside the schema ({', '.join(unknown)}); retrying")
+                response = await self._call_openrouter_async(
+                    self._prepare_prompt(question, schema_info, vector_context, unknown))
+                cypher_query = self._extract_cypher(response)
+                unknown = _unknown_names(cypher_query, schema_info)
+            if not unknown:
+                self._cache_put(key, cypher_query)
+            
+            logging.info(f"Generated Cypher query: {cypher_query}")
+            return cypher_query
+        except Exception as e:
+            logging.error(f"Error generating Cypher query: {str(e)}")
+            raise
+    
+    def _match_template(self, question: str, schema_info: Dict[str, Any]) -> Optional[str]:
+        """Translate a structural question with a local template, without calling the LLM.
         
-        Relationship Types and Properties:
-        {relationships_str}
+        Args:
+            question: The natural language question
+            schema_info: Database schema information
+            
+        Returns:
+            The Cypher query, or None if no template matches the question and schema
+        """
+        if not self.templates_enabled:
+            return None
+        normalized = " ".join(question.split()).rstrip("?.!")
+        for pattern, build in _TEMPLATES:
+            match = pattern.fullmatch(normalized)
+            if match:
+                cypher_query = build(match, schema_info)
+                if cypher_query is not None:
+                    return cypher_query
+        return None
+    
+    def _cache_key(self, question: str, schema_info: Dict[str, Any],
+                   vector_context: Optional[str]) -> bytes:
+        """Key generated queries by normalized question, schema fingerprint and vector context.
         
-        USER QUESTION:
-        {question}
+        The question is case-folded with whitespace collapsed; the schema is reduced to
+        its sorted labels and property names, so equal schemas match regardless of order.
         """
+        schema = tuple(
+            (kind, label, tuple(sorted(prop for prop in props if isinstance(prop, str))))
+            for kind in ("nodes", "relationships")
+            for label, props in sorted(schema_info.get(kind, {}).items())
+        )
+        key = hashlib.blake2b(digest_size=16)
+        key.update(" ".join(question.casefold().split()).encode("utf-8"))
+        key.update(b"\0" + repr(schema).encode("utf-8"))
+        key.update(b"\0" + (vector_context or "").encode("utf-8"))
+        return key.digest()
+    
+    def _cache_get(self, key: bytes) -> Optional[str]:
+        """Return the cached query for `key` unless it is missing or expired."""
+        if not self._cypher_cache_size:
+            return None
+        with self._cache_lock:
+            entry = self._cypher_cache.get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                del self._cypher_cache[key]
+                return None
+            self._cypher_cache.move_to_end(key)
+            return entry[0]
+    
+    def _cache_put(self, key: bytes, cypher_query: str):
+        """Cache a generated query, evicting the least recently used entries."""
+        if not self._cypher_cache_size:
+            return
+        with self._cache_lock:
+            self._cypher_cache[key] = (cypher_query, time.monotonic() + self._cypher_cache_ttl)
+            self._cypher_cache.move_to_end(key)
+            while len(self._cypher_cache) > self._cypher_cache_size:
+                self._cypher_cache.popitem(last=False)
+    
+    def _prepare_prompt(self, question: str, schema_info: Dict[str, Any], 
+                         vector_context: Optional[str] = None, unknown: Optional[List[str]] = None) -> str:
+        """Prepare the prompt for the LLM to generate a Cypher query.
         
-        # Add vector context if available
-        if vector_context:
-            prompt += f"""
+        Args:
+            question: The natural language question
+            schema_info: Database schema information
+            vector_context: Optional context from vector search results
+            unknown: Names outside the schema used by a previous attempt, to warn against
             
-            ADDITIONAL CONTEXT FROM SIMILAR DOCUMENTS:
-            {vector_context}
-            """
-        
-        prompt += """
-        
-        INSTRUCTIONS:
-        1. Generate a valid Neo4j Cypher query that answers the user's question.
-        2. Use only the node labels, relationship types, and properties defined in the schema.
-        3. Return ONLY the Cypher query without any explanations or markdown formatting.
-        4. Ensure the query is optimized and follows Neo4j best practices.
-        5. If the question cannot be answered with the given schema, return a simple query that explains the limitation.
-        
-        CYPHER QUERY:
+        Returns:
+            Formatted prompt string
         """
+        # The serialized schema is both the cache key and, unlike a sorted fingerprint,
+        # preserves the label order of the rendered section
+        schema_str = _render_schema(json_utils.dumps(schema_info))
         
-        return prompt
+        vector_block = _VECTOR_CONTEXT_BLOCK.format(vector_context=vector_context) if vector_context else ""
+        retry_note = ""
+        if unknown:
+            retry_note = _SCHEMA_RETRY_NOTE.format(
+                unknown=", ".join(unknown),
+                labels=", ".join(_schema_names(schema_info.get("nodes", {}))) or "none",
+                rel_types=", ".join(_schema_names(schema_info.get("relationships", {}))) or "none"
+            )
+        return (
+            f"{_PROMPT_HEADER}"
+            f"{schema_str}\n\n"
+            f"USER QUESTION:\n{question}\n"
+            f"{vector_block}{_PROMPT_INSTRUCTIONS}{retry_note}{_PROMPT_FOOTER}"
+        )
+    
+    def _request_data(self, prompt: str) -> Dict[str, Any]:
+        """Build the chat completion request body for `prompt`."""
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": _SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.1,  # Low temperature for more deterministic outputs
+            "max_tokens": 500
+        }
     
     def _call_openrouter(self, prompt: str) -> str:
         """Call the OpenRouter API to generate a response.
@@ -122,21 +490,14 @@ class QueryTranslator:
             "Content-Type": "application/json"
         }
         
-        data = {
-            "model": self.model,
-            "messages": [
-                {"role": "system", "content": "You are a Neo4j Cypher query generator."},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.1,  # Low temperature for more deterministic outputs
-            "max_tokens": 500
-        }
+        data = self._request_data(prompt)
         
         try:
-            response = requests.post(
+            response = http_session.post(
                 self.base_url,
                 headers=headers,
-                json=data
+                json=data,
+                timeout=HTTP_TIMEOUT
             )
             response.raise_for_status()
             
@@ -159,6 +520,50 @@ class QueryTranslator:
             logging.error(error_msg)
             raise ValueError(error_msg)
     
+    async def _call_openrouter_async(self, prompt: str) -> str:
+        """Call the OpenRouter API without blocking the event loop.
+        
+        Uses the shared httpx.AsyncClient of the running loop, so concurrent calls
+        (e.g. via asyncio.gather) are multiplexed over pooled connections.
+        
+        Args:
+            prompt: The formatted prompt string
+            
+        Returns:
+            Generated text response from the LLM
+            
+        Raises:
+            ValueError: If the API call fails with a detailed error message
+        """
+        client = get_async_client()
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        
+        try:
+            response = await client.post(self.base_url, headers=headers, json=self._request_data(prompt))
+            response.raise_for_status()
+            
+            result = response.json()
+            return result["choices"][0]["message"]["content"]
+        except httpx.HTTPStatusError as e:
+            error_msg = f"OpenRouter API request failed: {str(e)}"
+            if e.response.status_code == 404:
+                error_msg = "OpenRouter API endpoint not found. Please check your OPENROUTER_BASE_URL configuration."
+            elif e.response.status_code == 401:
+                error_msg = "Invalid OpenRouter API key. Please check your OPENROUTER_API_KEY configuration."
+            logging.error(error_msg)
+            raise ValueError(error_msg)
+        except httpx.RequestError as e:
+            error_msg = f"Network error while calling OpenRouter API: {str(e)}"
+            logging.error(error_msg)
+            raise ValueError(error_msg)
+        except (KeyError, IndexError, json.JSONDecodeError) as e:
+            error_msg = f"Invalid response from OpenRouter API: {str(e)}"
+            logging.error(error_msg)
+            raise ValueError(error_msg)
+    
     def _extract_cypher(self, response: str) -> str:
         """Extract and validate the Cypher query from the LLM response.
         
@@ -168,18 +573,26 @@ class QueryTranslator:
         Returns:
             Cleaned Cypher query string
         """
-        # Remove any markdown code block formatting if present
-        if "```" in response:
-            # Extract content between code blocks
-            parts = response.split("```")
-            for part in parts:
-                if part.strip().lower().startswith("cypher"):
-                    return part.strip()[6:].strip()  # Remove 'cypher' and whitespace
-                elif not part.strip().startswith("```") and len(part.strip()) > 0:
-                    return part.strip()
-        
-        # If no code blocks, return the response as is
-        return response.strip()
-
-# Create a singleton instance
-query_translator = QueryTranslator()
+        # Take the first markdown code block if present, dropping its language tag
+        match = _CODE_BLOCK_RE.search(response)
+        return (match.group(1) if match else response).strip()
+
+# The singleton is created on first use rather than at import, so importing this
+# module does not require OPENROUTER_API_KEY
+_instance: Optional[QueryTranslator] = None
+_instance_lock = threading.Lock()
+
+def get_query_translator() -> QueryTranslator:
+    """Return the shared QueryTranslator, creating it on first use."""
+    global _instance
+    if _instance is None:
+        with _instance_lock:
+            if _instance is None:
+                _instance = QueryTranslator()
+    return _instance
+
+def __getattr__(name):
+    # PEP 562: `from llm.query_translator import query_translator` keeps working
+    if name == "query_translator":
+        return get_query_translator()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
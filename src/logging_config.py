@@ -0,0 +1,26 @@
+import logging
+from config import LOG_LEVEL
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_configured = False
+
+def configure_logging(level: str = LOG_LEVEL):
+    """Configure the root logger once per process.
+
+    Later calls are no-ops, so entry points (Streamlit app, CLIs) can call this
+    unconditionally without stacking duplicate handlers.
+
+    Args:
+        level: Log level name, defaults to LOG_LEVEL from config
+    """
+    global _configured
+    if _configured:
+        return
+    logging.basicConfig(
+        level=getattr(logging, str(level).upper(), logging.INFO),
+        format=LOG_FORMAT,
+        datefmt=LOG_DATE_FORMAT
+    )
+    _configured = True
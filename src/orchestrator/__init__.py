@@ -1,3 +1,3 @@
-from .orchestrator import Orchestrator
+from .orchestrator import Orchestrator, get_orchestrator
 
-__all__ = ['Orchestrator']
+__all__ = ['Orchestrator', 'get_orchestrator']
@@ -1,16 +1,31 @@
+import asyncio
+import re
+import threading
 import time
 import logging
-from typing import Dict, Any, Optional
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+import numpy as np
 from database.neo4j_driver import Neo4jDriver
-from llm.query_translator import QueryTranslator
-from llm.answer_generator import AnswerGenerator
+from llm.query_translator import get_query_translator, parameterize_cypher
+from llm.answer_generator import get_answer_generator
 from utils.error_handler import error_handler
 from utils.monitoring import monitoring
 from data_ingestion.preprocessor import document_preprocessor
-from data_ingestion.embedding import embedding_generator
+from data_ingestion.embedding import embedding_generator, EmbeddingBatcher
 from database.neo4j_driver import neo4j_driver
 from cache.response_cache import response_cache
 
+# Aggregate and schema questions answered from the graph structure alone; for these
+# (when short) the vector search over documents adds no useful context
+_STRUCTURAL_QUESTION_RE = re.compile(
+    r"^\s*(?:count|how many|number of|list|show(?: me)? all|what (?:labels|node labels|relationship types|relationships) )\b",
+    re.IGNORECASE
+)
+# Longer questions usually carry content words worth retrieving documents for
+RETRIEVAL_SKIP_MAX_WORDS = 8
+
 class Orchestrator:
     """Central orchestrator for the GraphRAG system.
     
@@ -18,43 +33,82 @@ class Orchestrator:
     database interaction, and answer generation.
     """
     
+    # Fixed field set of a long-lived singleton; slots make the per-question attribute reads cheaper
+    __slots__ = ("logger", "_query_translator", "_answer_generator", "db_driver", "cache",
+                 "preprocessor", "embedding_generator", "embedding_batcher", "_executor", "__weakref__")
+    
     def __init__(self):
-        """Initialize the Orchestrator."""
+        """Initialize the Orchestrator.
+        
+        The LLM clients are created on first use, so pages that only read the cache
+        or the dashboard do not pay for (or require the configuration of) them.
+        """
         self.logger = logging.getLogger(__name__)
-        self.query_translator = QueryTranslator()
-        self.answer_generator = AnswerGenerator()
+        self._query_translator = None
+        self._answer_generator = None
         self.db_driver = neo4j_driver
         self.cache = response_cache
         self.preprocessor = document_preprocessor
         self.embedding_generator = embedding_generator
+        # Groups the question embeddings of concurrent async requests into shared batches
+        self.embedding_batcher = EmbeddingBatcher(embedding_generator)
+        # Runs the schema lookup while the vector search runs on the calling thread
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="orchestrator")
+        # Release the worker threads when an instance is dropped (e.g. a Streamlit reload
+        # re-creating the orchestrator) instead of keeping them until interpreter exit
+        weakref.finalize(self, self._executor.shutdown, wait=False)
+    
+    @property
+    def query_translator(self):
+        """The shared QueryTranslator, created on first use."""
+        if self._query_translator is None:
+            self._query_translator = get_query_translator()
+        return self._query_translator
+    
+    @property
+    def answer_generator(self):
+        """The shared AnswerGenerator, created on first use."""
+        if self._answer_generator is None:
+            self._answer_generator = get_answer_generator()
+        return self._answer_generator
     
     @error_handler.with_error_handling()
     @monitoring.time_function("process_question")
-    def process_question(self, question: str) -> Dict[str, Any]:
+    def process_question(self, question: str, check_cache: bool = True,
+                         question_embedding: Optional[np.ndarray] = None) -> Dict[str, Any]:
         """Process a natural language question and generate an answer.
         
+        Exact-key cache hits are returned before the question is embedded. Otherwise
+        it is embedded once, and the same embedding serves the semantic cache lookup,
+        the vector search and the cache entry written at the end.
+        
         Args:
             question: The natural language question from the user
+            check_cache: Whether to look the question up in the response cache first.
+                Callers that already missed the cache pass False to skip a second lookup.
+            question_embedding: Embedding from embed_question, if the caller already has it
             
         Returns:
             Dictionary containing the answer and additional information
         """
+        start_time = time.perf_counter()
+        
         # Log the activity
         monitoring.log_activity("question_received", {"question": question})
         
-        # Check cache for existing results
-        cached_result = self.cache.get(question)
+        # Check cache for existing results: exact match first, then similar questions
+        cached_result = self._lookup_exact(question, check_cache)
         if cached_result:
-            monitoring.log_activity("cache_hit", {"question": question})
             return cached_result
         
-        monitoring.log_activity("cache_miss", {"question": question})
+        if question_embedding is None:
+            question_embedding = self.embed_question(question)
         
-        # Get schema information from the database
-        schema_info = self.db_driver.get_schema_info()
+        cached_result = self._lookup_similar(question, question_embedding, check_cache)
+        if cached_result:
+            return cached_result
         
-        # Perform vector search if applicable
-        vector_context = self._perform_vector_search(question)
+        schema_info, vector_context = self._gather_context(question, question_embedding)
         
         # Generate Cypher query
         cypher_query = self.query_translator.generate_cypher(
@@ -63,15 +117,7 @@ class Orchestrator:
             vector_context=vector_context
         )
         
-        monitoring.log_activity("cypher_generated", {"cypher_query": cypher_query})
-        
-        # Execute Cypher query
-        query_results = self.db_driver.execute_query(cypher_query)
-        
-        monitoring.log_activity("query_executed", {
-            "cypher_query": cypher_query,
-            "result_count": len(query_results)
-        })
+        query_results = self._execute_cypher(cypher_query)
         
         # Generate answer
         answer = self.answer_generator.generate_answer(
@@ -81,6 +127,237 @@ class Orchestrator:
             vector_context=vector_context
         )
         
+        return self._store_result(question, answer, cypher_query, query_results,
+                                  question_embedding, start_time)
+    
+    @error_handler.with_error_handling()
+    @monitoring.time_function("process_question")
+    async def process_question_async(self, question: str, check_cache: bool = True,
+                                     question_embedding: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """Async variant of process_question, so one event loop can serve many questions at once.
+        
+        The LLM calls are awaited on the shared async HTTP client. Embedding and the
+        Neo4j queries are blocking and run in worker threads, with the schema lookup
+        and the vector search running concurrently.
+        
+        Args:
+            question: The natural language question from the user
+            check_cache: Whether to look the question up in the response cache first
+            question_embedding: Embedding from embed_question, if the caller already has it
+            
+        Returns:
+            Dictionary containing the answer and additional information
+        """
+        start_time = time.perf_counter()
+        
+        monitoring.log_activity("question_received", {"question": question})
+        
+        cached_result = self._lookup_exact(question, check_cache)
+        if cached_result:
+            return cached_result
+        
+        if question_embedding is None:
+            question_embedding = await self.embed_question_async(question)
+        
+        cached_result = self._lookup_similar(question, question_embedding, check_cache)
+        if cached_result:
+            return cached_result
+        
+        schema_info, vector_context = await asyncio.to_thread(
+            self._gather_context, question, question_embedding)
+        
+        cypher_query = await self.query_translator.generate_cypher_async(
+            question=question,
+            schema_info=schema_info,
+            vector_context=vector_context
+        )
+        
+        query_results = await asyncio.to_thread(self._execute_cypher, cypher_query)
+        
+        answer = await self.answer_generator.generate_answer_async(
+            question=question,
+            query_results=query_results,
+            cypher_query=cypher_query,
+            vector_context=vector_context
+        )
+        
+        return self._store_result(question, answer, cypher_query, query_results,
+                                  question_embedding, start_time)
+    
+    def process_question_stream(self, question: str, check_cache: bool = True,
+                                question_embedding: Optional[np.ndarray] = None
+                                ) -> Tuple[Dict[str, Any], Optional[Iterator[str]]]:
+        """Streaming variant of process_question, for showing the answer as it is generated.
+        
+        Everything up to the answer runs before this returns; the answer itself is
+        generated while the returned stream is consumed. Unlike process_question,
+        errors are raised instead of being returned as an error response.
+        
+        Args:
+            question: The natural language question from the user
+            check_cache: Whether to look the question up in the response cache first
+            question_embedding: Embedding from embed_question, if the caller already has it
+            
+        Returns:
+            Tuple of (result, answer stream). On a cache hit the result is complete and
+            the stream is None. Otherwise the stream yields the pieces of the answer;
+            once it is exhausted, result["answer"] holds the full answer and the
+            result has been cached.
+        """
+        start_time = time.perf_counter()
+        
+        monitoring.log_activity("question_received", {"question": question})
+        
+        cached_result = self._lookup_exact(question, check_cache)
+        if cached_result:
+            return cached_result, None
+        
+        if question_embedding is None:
+            question_embedding = self.embed_question(question)
+        
+        cached_result = self._lookup_similar(question, question_embedding, check_cache)
+        if cached_result:
+            return cached_result, None
+        
+        schema_info, vector_context = self._gather_context(question, question_embedding)
+        
+        cypher_query = self.query_translator.generate_cypher(
+            question=question,
+            schema_info=schema_info,
+            vector_context=vector_context
+        )
+        
+        query_results = self._execute_cypher(cypher_query)
+        
+        result = {
+            "question": question,
+            "cypher_query": cypher_query,
+            "query_results": query_results
+        }
+        return result, self._stream_answer(result, vector_context, question_embedding, start_time)
+    
+    def _stream_answer(self, result: Dict[str, Any], vector_context: Optional[str],
+                       question_embedding: Optional[np.ndarray], start_time: float) -> Iterator[str]:
+        """Yield the answer for a result from process_question_stream, then complete and cache it.
+        
+        An answer whose stream is abandoned part-way is not cached.
+        """
+        pieces = []
+        for piece in self.answer_generator.generate_answer_stream(
+            question=result["question"],
+            query_results=result["query_results"],
+            cypher_query=result["cypher_query"],
+            vector_context=vector_context
+        ):
+            pieces.append(piece)
+            yield piece
+        
+        result.update(self._store_result(result["question"], "".join(pieces), result["cypher_query"],
+                                         result["query_results"], question_embedding, start_time))
+    
+    # Pipeline steps shared by the process_question variants; the
+    # blocking ones are run in worker threads by the async variant
+    
+    def _lookup_exact(self, question: str, check_cache: bool) -> Optional[Dict[str, Any]]:
+        """Return the result cached under the question's exact key, or None.
+        
+        Cheap enough to run before the question is embedded.
+        
+        Args:
+            question: The natural language question
+            check_cache: Whether to look the question up at all
+            
+        Returns:
+            The cached result dictionary, or None on a miss
+        """
+        if check_cache:
+            cached_result = self.cache.get_exact(question)
+            if cached_result:
+                monitoring.log_activity("cache_hit", {"question": question})
+                return cached_result
+        return None
+    
+    def _lookup_similar(self, question: str, question_embedding: Optional[np.ndarray],
+                        check_cache: bool) -> Optional[Dict[str, Any]]:
+        """Return the result cached for a similar question, or None (logging the miss).
+        
+        Args:
+            question: The natural language question
+            question_embedding: The question's embedding, for the semantic lookup
+            check_cache: Whether to look the question up at all
+            
+        Returns:
+            The cached result dictionary, or None on a miss
+        """
+        if check_cache:
+            cached_result = self.cache.get_similar(question, question_embedding)
+            if cached_result:
+                monitoring.log_activity("cache_hit", {"question": question})
+                return cached_result
+        
+        monitoring.log_activity("cache_miss", {"question": question})
+        return None
+    
+    def _gather_context(self, question: str,
+                        question_embedding: Optional[np.ndarray]) -> Tuple[Dict[str, Any], Optional[str]]:
+        """Fetch the schema information and, if useful for the question, the vector context.
+        
+        Args:
+            question: The natural language question
+            question_embedding: The question's embedding, for the vector search
+            
+        Returns:
+            Tuple of (schema information, vector search context or None)
+        """
+        if not self._needs_retrieval(question):
+            monitoring.log_activity("retrieval_skipped", {"question": question})
+            return self.db_driver.get_schema_info(), None
+        
+        # Get schema information from the database, overlapped with the vector search
+        # (the driver keeps one session per thread, so both can run at once)
+        schema_future = self._executor.submit(self.db_driver.get_schema_info)
+        
+        # Perform vector search if applicable
+        vector_context = self._perform_vector_search(question_embedding)
+        return schema_future.result(), vector_context
+    
+    def _execute_cypher(self, cypher_query: str) -> List[Dict[str, Any]]:
+        """Execute a generated Cypher query and log it.
+        
+        Args:
+            cypher_query: The generated Cypher query
+            
+        Returns:
+            List of result records
+        """
+        monitoring.log_activity("cypher_generated", {"cypher_query": cypher_query})
+        
+        # Execute Cypher query, with its literals bound as parameters so Neo4j can
+        # reuse one cached plan for questions that differ only in their values
+        query_results = self.db_driver.execute_query(*parameterize_cypher(cypher_query))
+        
+        monitoring.log_activity("query_executed", {
+            "cypher_query": cypher_query,
+            "result_count": len(query_results)
+        })
+        return query_results
+    
+    def _store_result(self, question: str, answer: str, cypher_query: str,
+                      query_results: List[Dict[str, Any]], question_embedding: Optional[np.ndarray],
+                      start_time: float) -> Dict[str, Any]:
+        """Assemble the result of a processed question and cache it.
+        
+        Args:
+            question: The natural language question
+            answer: The generated answer
+            cypher_query: The executed Cypher query
+            query_results: The query's result records
+            question_embedding: The question's embedding, stored with the cache entry
+            start_time: perf_counter() value when processing started
+            
+        Returns:
+            Dictionary containing the answer and additional information
+        """
         monitoring.log_activity("answer_generated", {"question": question})
         
         # Prepare result
@@ -92,27 +369,77 @@ class Orchestrator:
             "timestamp": time.time()
         }
         
-        # Cache the result
-        self.cache.set(question, result)
+        # Cache the result, weighted by how long it took to produce
+        self.cache.set(question, result, embedding=question_embedding,
+                       cost=time.perf_counter() - start_time)
         
         return result
     
-    def _perform_vector_search(self, question: str) -> Optional[str]:
-        """Perform vector search to find similar documents.
+    def embed_question(self, question: str) -> Optional[np.ndarray]:
+        """Embed a question the way document chunks are embedded.
         
         Args:
             question: The natural language question
             
         Returns:
-            String containing context from similar documents, or None if not applicable
+            The question embedding, or None if it could not be computed
         """
         try:
             # Preprocess the question
             processed_question = self.preprocessor.preprocess(question)[0]
             
             # Generate embedding for the question
-            question_embedding = self.embedding_generator.generate_embedding(processed_question["text"])
+            return self.embedding_generator.generate_embedding(processed_question["text"])
+        except Exception as e:
+            self.logger.error(f"Error embedding question: {str(e)}")
+            return None
+    
+    async def embed_question_async(self, question: str) -> Optional[np.ndarray]:
+        """Async variant of embed_question that batches with concurrent requests.
+        
+        Args:
+            question: The natural language question
             
+        Returns:
+            The question embedding, or None if it could not be computed
+        """
+        try:
+            processed_question = self.preprocessor.preprocess(question)[0]
+            return await self.embedding_batcher.embed(processed_question["text"])
+        except Exception as e:
+            self.logger.error(f"Error embedding question: {str(e)}")
+            return None
+    
+    @staticmethod
+    def _needs_retrieval(question: str) -> bool:
+        """Whether document retrieval can contribute to answering `question`.
+        
+        Short aggregate or schema questions ("how many X", "list all Y") are
+        answered from the graph alone, so the vector search is skipped for them.
+        
+        Args:
+            question: The natural language question
+            
+        Returns:
+            False for short structural questions, True otherwise
+        """
+        if len(question.split()) > RETRIEVAL_SKIP_MAX_WORDS:
+            return True
+        return not _STRUCTURAL_QUESTION_RE.match(question)
+    
+    def _perform_vector_search(self, question_embedding: Optional[np.ndarray]) -> Optional[str]:
+        """Perform vector search to find similar documents.
+        
+        Args:
+            question_embedding: Embedding of the question, from embed_question
+            
+        Returns:
+            String containing context from similar documents, or None if not applicable
+        """
+        if question_embedding is None:
+            return None
+        
+        try:
             # Perform vector search in Neo4j
             search_results = self.db_driver.perform_vector_search(
                 embedding=question_embedding,
@@ -124,23 +451,32 @@ class Orchestrator:
             if not search_results:
                 return None
             
-            # Format the context from similar documents
-            context_parts = []
-            for i, result in enumerate(search_results):
-                node = result["node"]
-                similarity = result["similarity"]
-                
-                # Note: We're already filtering by similarity_threshold in perform_vector_search
-                
-                context_parts.append(f"Document {i+1} (Similarity: {similarity:.2f}):\n{node.get('text', '')}\n")
-            
-            if not context_parts:
-                return None
-            
-            return "\n".join(context_parts)
+            # Format the context from similar documents in one pass (results are
+            # already filtered by similarity_threshold in perform_vector_search)
+            return "\n".join(
+                f"Document {i+1} (Similarity: {result['similarity']:.2f}):\n{result['node'].get('text', '')}\n"
+                for i, result in enumerate(search_results)
+            )
         except Exception as e:
             self.logger.error(f"Error performing vector search: {str(e)}")
             return None
 
-# Create a singleton instance
-orchestrator = Orchestrator()
+# The singleton is created on first use rather than at import, so importing this
+# module does not start worker threads or require the LLM configuration
+_instance: Optional[Orchestrator] = None
+_instance_lock = threading.Lock()
+
+def get_orchestrator() -> Orchestrator:
+    """Return the shared Orchestrator, creating it on first use."""
+    global _instance
+    if _instance is None:
+        with _instance_lock:
+            if _instance is None:
+                _instance = Orchestrator()
+    return _instance
+
+def __getattr__(name):
+    # PEP 562: `from orchestrator.orchestrator import orchestrator` keeps working
+    if name == "orchestrator":
+        return get_orchestrator()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,10 +2,43 @@ import streamlit as st
 import pandas as pd
 import altair as alt
 import time
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 import json
 import logging
+import reprlib
+import numpy as np
+from utils.monitoring import iso_now
+
+# Activities kept for the "Recent Activity" tab
+ACTIVITY_LOG_SIZE = 100
+# Characters of an activity's details shown in the log table
+ACTIVITY_DETAILS_WIDTH = 50
+
+class _DetailsRepr(reprlib.Repr):
+    """reprlib.Repr that keeps dict insertion order, matching str() of the details."""
+    
+    def repr_dict(self, x, level):
+        if not x:
+            return "{}"
+        if level <= 0:
+            return "{...}"
+        pieces = [f"{self.repr1(key, level - 1)}: {self.repr1(value, level - 1)}"
+                  for key, value in list(x.items())[:self.maxdict]]
+        if len(x) > self.maxdict:
+            pieces.append("...")
+        return "{" + ", ".join(pieces) + "}"
+
+# Bounded repr for those details: large payloads (query results) are abbreviated rather
+# than rendered in full just to be cut down, while staying exact over the shown width
+_DETAILS_REPR = _DetailsRepr()
+_DETAILS_REPR.maxlevel = 6
+_DETAILS_REPR.maxstring = _DETAILS_REPR.maxother = 2 * ACTIVITY_DETAILS_WIDTH + 10
+_DETAILS_REPR.maxdict = _DETAILS_REPR.maxlist = _DETAILS_REPR.maxtuple = _DETAILS_REPR.maxset = ACTIVITY_DETAILS_WIDTH // 2
+
+# Response times kept for the trend chart (oldest overwritten first); the average covers all of them
+RESPONSE_TIME_HISTORY = 4096
 
 class MonitoringDashboard:
     """
@@ -15,18 +48,55 @@ class MonitoringDashboard:
     of system performance, query history, and component status.
     """
     
+    __slots__ = ("logger", "metrics", "_act_ts", "_act_types", "_act_details",
+                 "_rt_values", "_rt_ts", "_rt_n", "_rt_sum")
+    
     def __init__(self):
         """Initialize the MonitoringDashboard."""
         self.logger = logging.getLogger(__name__)
         self.metrics = {
-            "response_times": [],
             "cache_hits": 0,
             "cache_misses": 0,
             "total_queries": 0,
             "error_count": 0,
             "component_status": {}
         }
-        self.activity_log = []
+        # Activity log as parallel columns, bounded: appending past ACTIVITY_LOG_SIZE drops
+        # the oldest entry in O(1), and rendering builds the DataFrame column by column
+        self._act_ts = deque(maxlen=ACTIVITY_LOG_SIZE)
+        self._act_types = deque(maxlen=ACTIVITY_LOG_SIZE)
+        self._act_details = deque(maxlen=ACTIVITY_LOG_SIZE)
+        
+        # Response times as a ring buffer of parallel arrays plus running totals, so
+        # recording is O(1) and rendering needs no per-entry Python work
+        self._rt_values = np.empty(RESPONSE_TIME_HISTORY, dtype=np.float32)
+        self._rt_ts = np.empty(RESPONSE_TIME_HISTORY, dtype="datetime64[ms]")
+        self._rt_n = 0
+        self._rt_sum = 0.0
+    
+    def _response_time_series(self) -> pd.DataFrame:
+        """Return the retained response times in chronological order."""
+        n = self._rt_n
+        if n <= RESPONSE_TIME_HISTORY:
+            return pd.DataFrame({"timestamp": self._rt_ts[:n], "value": self._rt_values[:n]})
+        # The buffer has wrapped; the oldest entry sits at the next write position
+        head = n % RESPONSE_TIME_HISTORY
+        return pd.DataFrame({
+            "timestamp": np.concatenate((self._rt_ts[head:], self._rt_ts[:head])),
+            "value": np.concatenate((self._rt_values[head:], self._rt_values[:head]))
+        })
+    
+    def _response_time_percentiles(self) -> Tuple[float, float, float]:
+        """Return the median, 95th percentile and maximum of the retained response times.
+        
+        Nearest-rank percentiles; a single np.partition (introselect, linear time)
+        places all three order statistics, and the buffer order does not matter.
+        """
+        values = self._rt_values[:min(self._rt_n, RESPONSE_TIME_HISTORY)]
+        n = len(values)
+        p50, p95 = (max(int(np.ceil(q * n)) - 1, 0) for q in (0.5, 0.95))
+        ranked = np.partition(values, sorted({p50, p95, n - 1}))
+        return float(ranked[p50]), float(ranked[p95]), float(ranked[n - 1])
     
     def update_metrics(self, metric_type: str, value: Any):
         """Update dashboard metrics.
@@ -37,10 +107,11 @@ class MonitoringDashboard:
         """
         try:
             if metric_type == "response_time":
-                self.metrics["response_times"].append({
-                    "timestamp": datetime.now().isoformat(),
-                    "value": value
-                })
+                slot = self._rt_n % RESPONSE_TIME_HISTORY
+                self._rt_values[slot] = value
+                self._rt_ts[slot] = np.datetime64(datetime.now(), "ms")
+                self._rt_n += 1
+                self._rt_sum += value
             elif metric_type == "cache_hit":
                 self.metrics["cache_hits"] += 1
                 self.metrics["total_queries"] += 1
@@ -64,16 +135,10 @@ class MonitoringDashboard:
             details: Dictionary with activity details
         """
         try:
-            self.activity_log.append({
-                "timestamp": datetime.now().isoformat(),
-                "type": activity_type,
-                "details": details
-            })
+            self._act_ts.append(iso_now())
+            self._act_types.append(activity_type)
+            self._act_details.append(details)
             
-            # Keep log at a reasonable size
-            if len(self.activity_log) > 100:
-                self.activity_log = self.activity_log[-100:]
-                
             self.logger.debug(f"Logged activity: {activity_type}")
         except Exception as e:
             self.logger.error(f"Error logging activity: {str(e)}")
@@ -89,10 +154,7 @@ class MonitoringDashboard:
             if total_queries > 0:
                 cache_hit_rate = (self.metrics["cache_hits"] / total_queries) * 100
                 
-            avg_response_time = 0
-            if self.metrics["response_times"]:
-                response_times = [item["value"] for item in self.metrics["response_times"]]
-                avg_response_time = sum(response_times) / len(response_times)
+            avg_response_time = self._rt_sum / self._rt_n if self._rt_n else 0
             
             # Display metrics
             col1, col2, col3 = st.columns(3)
@@ -104,10 +166,18 @@ class MonitoringDashboard:
                 st.metric(label="Total Queries", value=total_queries)
             
             # Create response time chart if we have data
-            if self.metrics["response_times"]:
+            if self._rt_n:
+                p50, p95, slowest = self._response_time_percentiles()
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric(label="Median Response Time", value=f"{p50:.2f}s")
+                with col2:
+                    st.metric(label="P95 Response Time", value=f"{p95:.2f}s")
+                with col3:
+                    st.metric(label="Max Response Time", value=f"{slowest:.2f}s")
+                
                 # Convert to DataFrame for charting
-                df = pd.DataFrame(self.metrics["response_times"])
-                df["timestamp"] = pd.to_datetime(df["timestamp"])
+                df = self._response_time_series()
                 
                 # Create chart
                 chart = alt.Chart(df).mark_line().encode(
@@ -129,18 +199,23 @@ class MonitoringDashboard:
         try:
             st.subheader("Recent Activity")
             
-            if not self.activity_log:
+            if not self._act_types:
                 st.info("No activity recorded yet.")
                 return
             
             # Convert to DataFrame for display
-            df = pd.DataFrame(self.activity_log)
-            df["timestamp"] = pd.to_datetime(df["timestamp"])
+            df = pd.DataFrame({
+                "timestamp": pd.to_datetime(list(self._act_ts)),
+                "type": list(self._act_types),
+                "details": list(self._act_details)
+            })
             
             # Format for display
             display_df = df.copy()
             display_df["timestamp"] = display_df["timestamp"].dt.strftime("%Y-%m-%d %H:%M:%S")
-            display_df["details"] = display_df["details"].apply(lambda x: str(x)[:50] + "..." if len(str(x)) > 50 else str(x))
+            details = display_df["details"].map(_DETAILS_REPR.repr)
+            shown = details.str.slice(0, ACTIVITY_DETAILS_WIDTH)
+            display_df["details"] = shown.where(details.str.len() <= ACTIVITY_DETAILS_WIDTH, shown + "...")
             
             st.dataframe(display_df[["timestamp", "type", "details"]], use_container_width=True)
             
@@ -1,11 +1,38 @@
+import inspect
 import logging
+import re
+import reprlib
 from typing import Callable, Any, Dict, Optional
-import traceback
 from functools import wraps
 
+# ValueError messages with a dedicated user-facing explanation
+_VALUE_ERROR_MESSAGES = [
+    ("OpenRouter API key not found",
+     "The OpenRouter API key is missing. Please add your API key to the .env file."),
+    ("OpenRouter API endpoint not found",
+     "Unable to connect to OpenRouter API. Please check your API configuration."),
+    ("Invalid OpenRouter API key",
+     "Your OpenRouter API key appears to be invalid. Please check your API key configuration."),
+]
+# One scan of the message finds whichever of the phrases occurs; the group name is its index
+_VALUE_ERROR_RE = re.compile("|".join(
+    f"(?P<m{i}>{re.escape(phrase)})" for i, (phrase, _) in enumerate(_VALUE_ERROR_MESSAGES)
+))
+
+# Bounded repr for the call arguments recorded with an error, so large payloads
+# (embeddings, query results) are summarized instead of stringified in full
+_ARGS_REPR = reprlib.Repr()
+_ARGS_REPR.maxstring = 200
+_ARGS_REPR.maxother = 200
+_ARGS_REPR.maxlist = 5
+_ARGS_REPR.maxtuple = 5
+_ARGS_REPR.maxdict = 5
+
 class ErrorHandler:
     """Centralized error handling for the GraphRAG system."""
     
+    __slots__ = ("logger",)
+    
     def __init__(self):
         """Initialize the ErrorHandler."""
         self.logger = logging.getLogger(__name__)
@@ -22,27 +49,23 @@ class ErrorHandler:
         """
         error_type = type(error).__name__
         error_message = str(error)
-        stack_trace = traceback.format_exc()
         
-        # Log the full error details
-        self.logger.error(f"Error type: {error_type}")
-        self.logger.error(f"Error message: {error_message}")
-        self.logger.error(f"Stack trace: {stack_trace}")
-        if context:
-            self.logger.error(f"Error context: {context}")
+        # Log the full error details; the traceback is only rendered by handlers that emit the record
+        self.logger.error("Error: %s: %s | context=%s", error_type, error_message, context or {}, exc_info=error)
         
         return {
             "status": "error",
             "error_type": error_type,
             "error_message": error_message,
             "user_message": self.get_user_friendly_message(error_type, error_message),
-            "context": context or {},
-            "stack_trace": stack_trace
+            "context": context or {}
         }
 
     def with_error_handling(self, fallback_return: Any = None):
         """Decorator for functions that need standardized error handling.
         
+        Coroutine functions are supported; their wrapper is a coroutine function too.
+        
         Args:
             fallback_return: Value to return if an error occurs
             
@@ -50,17 +73,29 @@ class ErrorHandler:
             Decorated function with error handling
         """
         def decorator(func: Callable):
+            def on_error(e: Exception, args, kwargs):
+                error_response = self.handle_error(e, {
+                    "function": func.__name__,
+                    "args": _ARGS_REPR.repr(args),
+                    "kwargs": _ARGS_REPR.repr(kwargs)
+                })
+                return fallback_return if fallback_return is not None else error_response
+            
+            if inspect.iscoroutinefunction(func):
+                @wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    try:
+                        return await func(*args, **kwargs)
+                    except Exception as e:
+                        return on_error(e, args, kwargs)
+                return async_wrapper
+            
             @wraps(func)
             def wrapper(*args, **kwargs):
                 try:
                     return func(*args, **kwargs)
                 except Exception as e:
-                    error_response = self.handle_error(e, {
-                        "function": func.__name__,
-                        "args": str(args),
-                        "kwargs": str(kwargs)
-                    })
-                    return fallback_return if fallback_return is not None else error_response
+                    return on_error(e, args, kwargs)
             return wrapper
         return decorator
 
@@ -80,12 +115,9 @@ class ErrorHandler:
             return "The system received an unexpected response. Please try again or contact support if the issue persists."
             
         if error_type == "ValueError":
-            if "OpenRouter API key not found" in error_message:
-                return "The OpenRouter API key is missing. Please add your API key to the .env file."
-            elif "OpenRouter API endpoint not found" in error_message:
-                return "Unable to connect to OpenRouter API. Please check your API configuration."
-            elif "Invalid OpenRouter API key" in error_message:
-                return "Your OpenRouter API key appears to be invalid. Please check your API key configuration."
+            match = _VALUE_ERROR_RE.search(error_message)
+            if match:
+                return _VALUE_ERROR_MESSAGES[int(match.lastgroup[1:])][1]
             return f"Invalid input or configuration: {error_message}"
             
         if error_type == "ConnectionError":
@@ -0,0 +1,52 @@
+import logging
+from config import METRICS_PORT
+
+try:
+    from prometheus_client import Counter, Histogram, start_http_server
+except ImportError:  # prometheus_client is optional
+    Counter = Histogram = start_http_server = None
+
+logger = logging.getLogger(__name__)
+
+class _NoopMetric:
+    """Stand-in used when prometheus_client is not installed."""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount: float = 1):
+        pass
+
+    def observe(self, amount: float):
+        pass
+
+if Counter is not None:
+    REQ_LATENCY = Histogram(
+        "graphrag_request_latency_seconds",
+        "End-to-end latency of answering a question",
+        ["cache"]
+    )
+    CACHE_HIT = Counter("graphrag_cache_hits_total", "Questions answered from the response cache")
+    CACHE_MISS = Counter("graphrag_cache_misses_total", "Questions answered by the full pipeline")
+    ERRORS = Counter("graphrag_errors_total", "Questions that failed with an error")
+else:
+    REQ_LATENCY = CACHE_HIT = CACHE_MISS = ERRORS = _NoopMetric()
+
+def start_metrics_server(port: int = METRICS_PORT) -> bool:
+    """Expose the metrics on an HTTP endpoint for Prometheus to scrape.
+
+    Args:
+        port: Port to listen on; 0 disables the endpoint
+
+    Returns:
+        True if the endpoint was started, False otherwise
+    """
+    if start_http_server is None or not port:
+        return False
+    try:
+        start_http_server(port)
+        logger.info(f"Serving Prometheus metrics on port {port}")
+        return True
+    except OSError as e:
+        logger.warning(f"Could not start metrics endpoint on port {port}: {str(e)}")
+        return False
@@ -1,9 +1,51 @@
+import inspect
 import logging
 import time
 from typing import Dict, Any, Optional, Callable
 from functools import wraps
-import json
 from datetime import datetime
+import json_utils
+from logging_config import configure_logging
+
+# (epoch second, its ISO string) for the most recently formatted second; swapped as one tuple
+_iso_cache = (0, datetime.fromtimestamp(0).isoformat())
+
+def _iso_second(seconds: int) -> str:
+    """ISO-format a whole epoch second, reusing the string while the second is unchanged."""
+    global _iso_cache
+    cached = _iso_cache
+    if cached[0] != seconds:
+        cached = _iso_cache = (seconds, datetime.fromtimestamp(seconds).isoformat())
+    return cached[1]
+
+def iso_now() -> str:
+    """Current local time in ISO format at one-second resolution.
+    
+    Activity events come in bursts (several per question), so they share one
+    formatted string instead of building a datetime each.
+    """
+    return _iso_second(int(time.time()))
+
+class _ActivityEntry:
+    """Activity log entry that is serialized to JSON only when a handler formats it.
+    
+    Values JSON cannot represent (e.g. datetimes in the details) are logged as their str().
+    """
+    
+    # One is created per logged activity
+    __slots__ = ("timestamp", "activity_type", "details")
+    
+    def __init__(self, timestamp: int, activity_type: str, details: Dict[str, Any]):
+        self.timestamp = timestamp
+        self.activity_type = activity_type
+        self.details = details
+    
+    def __str__(self) -> str:
+        return json_utils.dumps({
+            "timestamp": _iso_second(self.timestamp),
+            "activity_type": self.activity_type,
+            "details": self.details
+        }, default=str).decode("utf-8")
 
 class Monitoring:
     """Monitoring and logging for the GraphRAG system.
@@ -12,6 +54,8 @@ class Monitoring:
     and monitoring the performance of the system.
     """
     
+    __slots__ = ("logger", "metrics")
+    
     def __init__(self):
         """Initialize the Monitoring system."""
         self.logger = logging.getLogger(__name__)
@@ -20,12 +64,8 @@ class Monitoring:
     
     def setup_logging(self):
         """Set up logging configuration."""
-        # Configure logging format and level
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
+        # Shared, idempotent configuration so repeated imports don't stack handlers
+        configure_logging()
     
     def log_activity(self, activity_type: str, details: Dict[str, Any]):
         """Log an activity with details.
@@ -34,14 +74,10 @@ class Monitoring:
             activity_type: Type of activity (e.g., 'query', 'answer', 'error')
             details: Dictionary with activity details
         """
-        log_entry = {
-            "timestamp": datetime.now().isoformat(),
-            "activity_type": activity_type,
-            "details": details
-        }
-        
-        # Log as JSON for easier parsing
-        self.logger.info(f"ACTIVITY: {json.dumps(log_entry)}")
+        if self.logger.isEnabledFor(logging.INFO):
+            # Log as JSON for easier parsing; the entry (and its timestamp) is only
+            # formatted if the record is actually emitted
+            self.logger.info("ACTIVITY: %s", _ActivityEntry(int(time.time()), activity_type, details))
         
         # Update metrics
         self._update_metrics(activity_type, details)
@@ -89,6 +125,9 @@ class Monitoring:
     def time_function(self, activity_name: Optional[str] = None):
         """Decorator to measure and log function execution time.
         
+        Uses the monotonic high-resolution clock, and also logs calls that raise.
+        Coroutine functions are timed until they complete.
+        
         Args:
             activity_name: Name of the activity for logging
             
@@ -96,22 +135,32 @@ class Monitoring:
             Decorated function with timing
         """
         def decorator(func: Callable):
-            @wraps(func)
-            def wrapper(*args, **kwargs):
-                start_time = time.time()
-                result = func(*args, **kwargs)
-                end_time = time.time()
-                
-                execution_time = end_time - start_time
-                activity = activity_name or func.__name__
-                
+            activity = activity_name or func.__name__
+            
+            def record(start_ns: int):
+                # Recorded for failed calls too; the log entry carries its own timestamp
                 self.log_activity("timing", {
                     "activity": activity,
-                    "execution_time": execution_time,
-                    "timestamp": datetime.now().isoformat()
+                    "execution_time": (time.perf_counter_ns() - start_ns) / 1e9
                 })
-                
-                return result
+            
+            if inspect.iscoroutinefunction(func):
+                @wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    start_ns = time.perf_counter_ns()
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        record(start_ns)
+                return async_wrapper
+            
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                start_ns = time.perf_counter_ns()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    record(start_ns)
             return wrapper
         return decorator
     